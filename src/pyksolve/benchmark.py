@@ -0,0 +1,365 @@
+"""
+Provides a reproducible benchmark of the solve methods and the DeferredSolver
+over a fixed corpus of seeds. Run it with ``python -m pyksolve.benchmark``.
+"""
+
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from . import deferred
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+FORMAT_VERSION = 1
+MODES = ('fast', 'minimal', 'multithreaded', 'stream', 'deferred')
+FAST_SHIFTS = ((0, 0), (1, 1), (2, 4))
+SOLVED = (solver.SolveResult.SolvedMinimal.value,
+          solver.SolveResult.SolvedMayNotBeMinimal.value)
+
+Report = Dict[str, Any]
+
+
+def corpus(deals: int, corpus_seed: int = 0) -> List[int]:
+    """
+    The fixed corpus of seeds to benchmark.
+
+    Args:
+        deals: ``int`` -> number of seeds.
+        corpus_seed: ``int`` -> seed of the generator that picks the seeds.
+
+    Returns:
+        ``List[int]`` -> seeds to pass to
+        :meth:`pyksolve.solver.Solitaire.shuffle1`.
+    """
+    rng = random.Random(corpus_seed)
+    return [rng.randint(0, deferred.MAX_SEED) for _ in range(deals)]
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize a latency distribution.
+
+    Args:
+        latencies: ``Sequence[float]`` -> latencies in seconds.
+
+    Returns:
+        ``Dict[str, float]`` -> `mean`, `min`, `p50`, `p90`, `p99` and `max`.
+    """
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+    last = len(ordered) - 1
+    summary = {'mean': sum(ordered) / len(ordered), 'min': ordered[0]}
+    for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        summary[name] = ordered[min(last, round(fraction * last))]
+    summary['max'] = ordered[-1]
+    return summary
+
+
+def bench_solve(seeds: Sequence[int], draw_count: int, mode: str,
+                max_closed: int, **kwargs: int) -> Report:
+    """
+    Solve every seed of the corpus once with one solve method.
+
+    Args:
+        seeds: ``Sequence[int]`` -> the corpus.
+        draw_count: ``int`` -> draw count to solve with.
+        mode: ``str`` -> `"fast"`, `"minimal"` or `"multithreaded"`.
+        max_closed: ``int`` -> max_closed_count of each solve.
+        kwargs: two_shift and three_shift for `"fast"`, num_threads for
+            `"multithreaded"`.
+
+    Returns:
+        ``Dict[str, Any]`` -> the case report.
+    """
+    sol = solver.Solitaire()
+    if mode == 'fast':
+        solve = functools.partial(sol.solve_fast, kwargs['two_shift'],
+                                  kwargs['three_shift'], max_closed)
+    elif mode == 'minimal':
+        solve = functools.partial(sol.solve_minimal, max_closed)
+    elif mode == 'multithreaded':
+        solve = functools.partial(sol.solve_minimal_multithreaded,
+                                  kwargs['num_threads'], max_closed)
+    else:
+        raise ValueError(f'Unknown solve mode "{mode}".')
+    latencies = []
+    results = {}
+    solved = closed = 0
+    for seed in seeds:
+        sol.shuffle1(seed)
+        sol.reset_game(draw_count)
+        start = time.perf_counter()
+        res = solve().value
+        latencies.append(time.perf_counter() - start)
+        results[res] = results.get(res, 0) + 1
+        solved += res in SOLVED
+        closed += sol.last_stats.closed_count
+    total = sum(latencies)
+    return {
+        'mode': mode,
+        'draw_count': draw_count,
+        'params': dict(kwargs, max_closed=max_closed),
+        'deals': len(seeds),
+        'solved_rate': solved / len(seeds) if seeds else 0.0,
+        'results': {solver.SolveResult(k).name: v
+                    for k, v in sorted(results.items())},
+        'latency': latency_summary(latencies),
+        'states_per_second': closed / total if total else 0.0,
+    }
+
+
+def bench_stream(seeds: Sequence[int], draw_count: int, threads: int,
+                 max_closed: int) -> Report:
+    """
+    Solve the corpus with :func:`pyksolve.solver.solve_stream`.
+
+    Args:
+        seeds: ``Sequence[int]`` -> the corpus.
+        draw_count: ``int`` -> draw count to solve with.
+        threads: ``int`` -> total number of threads.
+        max_closed: ``int`` -> max_closed_count of each deal.
+
+    Returns:
+        ``Dict[str, Any]`` -> the case report, `latency` is the search time of
+        each deal.
+    """
+    latencies = []
+    results = {}
+    solved = 0
+    start = time.perf_counter()
+    for deal in solver.solve_stream(seeds, draw_count, solver.SolveMode.Fast,
+                                    max_closed, threads):
+        latencies.append(deal.elapsed)
+        res = deal.result.value
+        results[res] = results.get(res, 0) + 1
+        solved += res in SOLVED
+    total = time.perf_counter() - start
+    return {
+        'mode': 'stream',
+        'draw_count': draw_count,
+        'params': {'threads': threads, 'max_closed': max_closed},
+        'deals': len(seeds),
+        'solved_rate': solved / len(seeds) if seeds else 0.0,
+        'results': {solver.SolveResult(k).name: v
+                    for k, v in sorted(results.items())},
+        'latency': latency_summary(latencies),
+        'deals_per_second': len(seeds) / total if total else 0.0,
+    }
+
+
+def bench_deferred(draw_count: int, threads: int, games: int,
+                   max_closed: int) -> Report:
+    """
+    Measure the refill rate of a DeferredSolver and the latency of
+    :meth:`pyksolve.deferred.DeferredSolver.get_solved` while draining it.
+
+    Args:
+        draw_count: ``int`` -> draw count of the cache.
+        threads: ``int`` -> number of workers.
+        games: ``int`` -> size of the cache and number of games taken.
+        max_closed: ``int`` -> max_closed of the workers.
+
+    Returns:
+        ``Dict[str, Any]`` -> the case report.
+    """
+    start = time.perf_counter()
+    d = deferred.DeferredSolver(draw_counts=(draw_count,), cache_num=games,
+                                threads=threads, max_closed=max_closed)
+    try:
+        d.wait_filled()
+        fill = time.perf_counter() - start
+        latencies = []
+        for _ in range(games):
+            start = time.perf_counter()
+            d.get_solved(draw_count)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        d.stop()
+    return {
+        'mode': 'deferred',
+        'draw_count': draw_count,
+        'params': {'threads': threads, 'max_closed': max_closed},
+        'deals': games,
+        'refill_per_second': games / fill if fill else 0.0,
+        'latency': latency_summary(latencies),
+        'workers': d.metrics(),
+    }
+
+
+def run(deals: int = 10, corpus_seed: int = 0,
+        draw_counts: Sequence[int] = (1, 2, 3),
+        modes: Sequence[str] = MODES, max_closed: int = 250_000,
+        thread_counts: Sequence[int] = (2, 4),
+        progress: Optional[Any] = None) -> Report:
+    """
+    Run the benchmark.
+
+    Args:
+        deals: ``int`` -> number of seeds in the corpus, also the cache size
+            of the DeferredSolver cases.
+        corpus_seed: ``int`` -> see :func:`corpus`.
+        draw_counts: ``Sequence[int]`` -> draw counts to cover.
+        modes: ``Sequence[str]`` -> subset of :data:`MODES` to cover.
+        max_closed: ``int`` -> max_closed_count of each solve.
+        thread_counts: ``Sequence[int]`` -> thread counts for the
+            `"multithreaded"`, `"stream"` and `"deferred"` cases.
+        progress: ``Optional[TextIO]`` -> stream to log finished cases to.
+
+    Returns:
+        ``Dict[str, Any]`` -> the report, with one entry per case in `cases`.
+    """
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(f'Expected modes to be in {MODES}.')
+    seeds = corpus(deals, corpus_seed)
+    cases = []
+
+    def add(name, report):
+        report['name'] = name
+        cases.append(report)
+        if progress is not None:
+            print(f'{name}: p50 {report["latency"].get("p50", 0):.4f}s',
+                  file=progress)
+
+    for draw_count in draw_counts:
+        if 'fast' in modes:
+            for two_shift, three_shift in FAST_SHIFTS:
+                add(f'fast-dc{draw_count}-s{two_shift}.{three_shift}',
+                    bench_solve(seeds, draw_count, 'fast', max_closed,
+                                two_shift=two_shift, three_shift=three_shift))
+        if 'minimal' in modes:
+            add(f'minimal-dc{draw_count}',
+                bench_solve(seeds, draw_count, 'minimal', max_closed))
+        if 'multithreaded' in modes:
+            for threads in thread_counts:
+                add(f'multithreaded-dc{draw_count}-t{threads}',
+                    bench_solve(seeds, draw_count, 'multithreaded', max_closed,
+                                num_threads=threads))
+        if 'stream' in modes:
+            for threads in thread_counts:
+                add(f'stream-dc{draw_count}-t{threads}',
+                    bench_stream(seeds, draw_count, threads, max_closed))
+        if 'deferred' in modes:
+            for threads in thread_counts:
+                add(f'deferred-dc{draw_count}-t{threads}',
+                    bench_deferred(draw_count, threads, deals, max_closed))
+    return {
+        'format_version': FORMAT_VERSION,
+        'pyksolve_version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.time(),
+        'corpus': {'deals': deals, 'corpus_seed': corpus_seed},
+        'cases': cases,
+    }
+
+
+def compare(baseline: Report, current: Report) -> List[Dict[str, Any]]:
+    """
+    Compare two reports case by case.
+
+    Args:
+        baseline: ``Dict[str, Any]`` -> report of the reference build.
+        current: ``Dict[str, Any]`` -> report of the build under test.
+
+    Returns:
+        ``List[Dict[str, Any]]`` -> for each case present in both reports, the
+        `name`, the `p50_ratio` and `mean_ratio` of current over baseline
+        latency (above 1 is slower) and the change of the `solved_rate`.
+    """
+    if baseline.get('corpus') != current.get('corpus'):
+        raise ValueError('Reports were made with different corpora.')
+    base_cases = {case['name']: case for case in baseline['cases']}
+    rows = []
+    for case in current['cases']:
+        base = base_cases.get(case['name'])
+        if base is None:
+            continue
+        row = {'name': case['name']}
+        for key in ('p50', 'mean'):
+            old = base['latency'].get(key, 0)
+            row[f'{key}_ratio'] = case['latency'].get(key, 0) / old if old \
+                else None
+        if 'solved_rate' in case:
+            row['solved_rate_change'] = (case['solved_rate']
+                                         - base['solved_rate'])
+        rows.append(row)
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog='python -m pyksolve.benchmark',
+        description='Benchmark the solve methods and the DeferredSolver.')
+    parser.add_argument('--deals', type=int, default=10,
+                        help='number of seeds in the corpus (default: 10)')
+    parser.add_argument('--corpus-seed', type=int, default=0,
+                        help='seed that picks the corpus (default: 0)')
+    parser.add_argument('--draw-counts', type=int, nargs='+',
+                        default=[1, 2, 3], help='default: 1 2 3')
+    parser.add_argument('--modes', nargs='+', choices=MODES,
+                        default=list(MODES), help='default: all')
+    parser.add_argument('--max-closed', type=int, default=250_000,
+                        help='max_closed_count per solve (default: 250000)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[2, 4],
+                        help='thread counts (default: 2 4)')
+    parser.add_argument('-o', '--output',
+                        help='write the JSON report to this file instead of '
+                             'stdout')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='print a comparison against a previous report')
+    args = parser.parse_args(argv)
+    report = run(args.deals, args.corpus_seed, args.draw_counts, args.modes,
+                 args.max_closed, args.threads, progress=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for row in compare(baseline, report):
+            print(json.dumps(row), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
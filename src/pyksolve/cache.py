@@ -0,0 +1,158 @@
+"""
+Provides the SolutionCache class, that shares solve results between deals
+that are the same game up to the names of the suits.
+"""
+
+import collections
+import threading
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+CACHED = (solver.SolveResult.SolvedMinimal,
+          solver.SolveResult.SolvedMayNotBeMinimal,
+          solver.SolveResult.Impossible)
+
+# result, packed moves of the canonical deal, found by a minimal search
+_Entry = Tuple[solver.SolveResult, bytes, bool]
+
+
+class SolutionCache:
+    """
+    Cache of solve results keyed by the canonical deal (see
+    :func:`pyksolve.solver.canonical_deal`) and draw count, so that a deal
+    whose suits are renamed by one of
+    :data:`pyksolve.solver.SUIT_PERMUTATIONS` reuses the result of the other,
+    with the foundations of the moves renamed to match.
+
+    Only results of the :data:`CACHED` kinds are kept. A
+    :attr:`pyksolve.solver.SolveResult.SolvedMinimal` or
+    :attr:`pyksolve.solver.SolveResult.Impossible` result of a minimal search
+    replaces other results of the same deal and answers both kinds of
+    lookups, any other result only answers lookups that don't ask for a
+    minimal one. The least recently used deals are evicted once `max_entries`
+    are cached. The methods are thread safe.
+
+    Set as :attr:`pyksolve.solver.Solitaire.solution_cache` to have the solve
+    methods consult it.
+
+    Args:
+        max_entries: ``int`` -> number of deals to keep results for.
+    """
+    def __init__(self, max_entries: int = 65536) -> None:
+        if max_entries < 1:
+            raise ValueError('Expected positive value for argument '
+                             'max_entries.')
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._max_entries = max_entries
+        self._metrics = {'hits': 0, 'misses': 0}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def lookup(self, deal: bytes, draw_count: int, minimal: bool = False
+               ) -> Optional[Tuple[solver.SolveResult, bytes]]:
+        """
+        Cached result of a deal.
+
+        Args:
+            deal: ``bytes-like`` -> deal in the format of
+                :meth:`pyksolve.solver.Solitaire.deal_array`.
+            draw_count: ``int`` -> the draw count.
+            minimal: ``bool`` -> only accept results of a minimal search.
+
+        Returns:
+            ``Optional[Tuple[SolveResult, bytes]]`` -> the result and the
+            packed moves of the solution for `deal`, empty if the deal is
+            :attr:`pyksolve.solver.SolveResult.Impossible`, or `None` if no
+            result is cached.
+        """
+        canonical, perm = solver.canonical_deal(deal)
+        key = canonical, draw_count
+        with self._lock:
+            entry: Optional[_Entry] = self._entries.get(key)
+            if entry is None or (minimal and not entry[2]):
+                self._metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+        result, moves, _ = entry
+        return result, solver.permute_moves(moves, perm, inverse=True)
+
+    def add(self, deal: bytes, draw_count: int, result: solver.SolveResult,
+            moves: bytes, minimal: bool = False) -> bool:
+        """
+        Cache the result of a deal.
+
+        Args:
+            deal: ``bytes-like`` -> deal in the format of
+                :meth:`pyksolve.solver.Solitaire.deal_array`.
+            draw_count: ``int`` -> the draw count.
+            result: :class:`pyksolve.solver.SolveResult` -> the result.
+            moves: ``bytes-like`` -> packed moves of the solution.
+            minimal: ``bool`` -> whether the result is of a minimal search,
+                e.g. :meth:`pyksolve.solver.Solitaire.solve_minimal`.
+
+        Returns:
+            ``bool`` -> whether the result was added, `False` if it is not of
+            the :data:`CACHED` kinds or a result answering minimal lookups is
+            present.
+        """
+        result = solver.SolveResult(result)
+        if result not in CACHED:
+            return False
+        minimal = minimal \
+            and result != solver.SolveResult.SolvedMayNotBeMinimal
+        canonical, perm = solver.canonical_deal(deal)
+        if result == solver.SolveResult.Impossible:
+            moves = b''
+        else:
+            moves = solver.permute_moves(moves, perm)
+        key = canonical, draw_count
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[2] or not minimal):
+                self._entries.move_to_end(key)
+                return False
+            self._entries[key] = result, moves, minimal
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Number of lookups answered from the cache since init.
+
+        Returns:
+            ``Dict[str, int]`` -> `hits` and `misses`.
+        """
+        with self._lock:
+            return dict(self._metrics)
@@ -0,0 +1,255 @@
+"""
+Provides the Catalog class, an index of solved deals by draw count, solve
+result and moves_made_normalized_count that answers difficulty band queries.
+"""
+
+import array
+import bisect
+import random
+import threading
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+MINIMAL = solver.SolveResult.SolvedMinimal.value
+NOT_MINIMAL = solver.SolveResult.SolvedMayNotBeMinimal.value
+MAX_MOVES = 0xffff
+
+# seed, moves_made_normalized_count, solve result
+Deal = Tuple[int, int, int]
+
+
+def _key(normalized_count: int, seed: int) -> int:
+    return normalized_count << 32 | seed
+
+
+class Catalog:
+    """
+    Index of solved deals. Each combination of draw count and solve result
+    (:data:`MINIMAL` or :data:`NOT_MINIMAL`) keeps its deals in an array
+    sorted by (moves_made_normalized_count, seed), so counting, querying and
+    uniformly sampling the deals of a move count band take O(log n). The
+    methods are thread safe.
+
+    A band is given as inclusive `min_moves` and `max_moves`. The optional
+    `minimal` argument restricts a band to deals with a minimal (`True`) or a
+    possibly not minimal (`False`) solution.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[int, int], array.array] = {}
+
+    @classmethod
+    def from_scan(cls, scan_file) -> 'Catalog':
+        """
+        Build a catalog of all solved seeds of a scan file.
+
+        Args:
+            scan_file: :class:`pyksolve.scan.ScanFile` -> the scan results.
+
+        Returns:
+            :class:`Catalog`
+        """
+        catalog = cls()
+        for draw_count in scan_file.draw_counts:
+            results = scan_file.column(draw_count, 'results')
+            normalized = scan_file.column(draw_count, 'normalized_counts')
+            keys = {MINIMAL: [], NOT_MINIMAL: []}
+            for i, result in enumerate(results):
+                if result in keys:
+                    keys[result].append(_key(normalized[i],
+                                             scan_file.start + i))
+            for result, values in keys.items():
+                if values:
+                    catalog._merge(draw_count, result, values)
+        return catalog
+
+    def _merge(self, draw_count: int, result: int,
+               keys: Iterable[int]) -> None:
+        with self._lock:
+            old = self._index.get((draw_count, result), ())
+            merged = array.array('Q', sorted(set(old).union(keys)))
+            self._index[(draw_count, result)] = merged
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._index.values())
+
+    def add(self, seed: int, draw_count: int, result: int,
+            normalized_count: int) -> bool:
+        """
+        Add a solved deal.
+
+        Args:
+            seed: ``int`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1`.
+            draw_count: ``int`` -> draw count the deal was solved with.
+            result: ``int`` -> :data:`MINIMAL` or :data:`NOT_MINIMAL`.
+            normalized_count: ``int`` -> moves_made_normalized_count of the
+                solution.
+
+        Returns:
+            ``bool`` -> whether the deal was added, `False` if it was present.
+        """
+        if result not in (MINIMAL, NOT_MINIMAL):
+            raise ValueError('Expected the result of a solved deal.')
+        key = _key(normalized_count, seed)
+        with self._lock:
+            keys = self._index.setdefault((draw_count, result),
+                                          array.array('Q'))
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return False
+            keys.insert(i, key)
+        return True
+
+    def remove(self, seed: int, draw_count: int, result: int,
+               normalized_count: int) -> bool:
+        """
+        Remove a deal.
+
+        Args: see :meth:`Catalog.add`.
+
+        Returns:
+            ``bool`` -> whether the deal was present.
+        """
+        key = _key(normalized_count, seed)
+        with self._lock:
+            keys = self._index.get((draw_count, result))
+            if keys is None:
+                return False
+            i = bisect.bisect_left(keys, key)
+            if i == len(keys) or keys[i] != key:
+                return False
+            del keys[i]
+        return True
+
+    def _ranges(self, draw_count: int, min_moves: int, max_moves: int,
+                minimal: Optional[bool]) -> List[Tuple[int, array.array, int,
+                                                       int]]:
+        """(result, keys, lo, hi) per index of a band, lock held."""
+        results = (MINIMAL, NOT_MINIMAL) if minimal is None \
+            else (MINIMAL,) if minimal else (NOT_MINIMAL,)
+        ranges = []
+        for result in results:
+            keys = self._index.get((draw_count, result))
+            if not keys:
+                continue
+            lo = bisect.bisect_left(keys, _key(max(min_moves, 0), 0))
+            hi = bisect.bisect_left(keys,
+                                    _key(min(max_moves, MAX_MOVES) + 1, 0))
+            if lo < hi:
+                ranges.append((result, keys, lo, hi))
+        return ranges
+
+    def count(self, draw_count: int, min_moves: int = 0,
+              max_moves: int = MAX_MOVES,
+              minimal: Optional[bool] = None) -> int:
+        """
+        Number of deals in a band.
+
+        Args:
+            draw_count: ``int`` -> the draw count.
+            min_moves: ``int`` -> lowest moves_made_normalized_count.
+            max_moves: ``int`` -> highest moves_made_normalized_count.
+            minimal: ``Optional[bool]`` -> restrict to minimal or not minimal
+                solutions.
+
+        Returns:
+            ``int``
+        """
+        with self._lock:
+            return sum(hi - lo for _, _, lo, hi in
+                       self._ranges(draw_count, min_moves, max_moves, minimal))
+
+    def query(self, draw_count: int, min_moves: int = 0,
+              max_moves: int = MAX_MOVES, minimal: Optional[bool] = None,
+              limit: Optional[int] = None) -> List[Deal]:
+        """
+        Deals in a band, ordered by move count.
+
+        Args:
+            draw_count: ``int`` -> the draw count.
+            min_moves: ``int`` -> lowest moves_made_normalized_count.
+            max_moves: ``int`` -> highest moves_made_normalized_count.
+            minimal: ``Optional[bool]`` -> restrict to minimal or not minimal
+                solutions.
+            limit: ``Optional[int]`` -> maximum number of deals per result.
+
+        Returns:
+            ``List[Tuple[int, int, int]]`` -> (seed, normalized count, result)
+            for each deal.
+        """
+        deals = []
+        with self._lock:
+            for result, keys, lo, hi in self._ranges(draw_count, min_moves,
+                                                     max_moves, minimal):
+                if limit is not None:
+                    hi = min(hi, lo + limit)
+                deals.extend((key & 0xffffffff, key >> 32, result)
+                             for key in keys[lo:hi])
+        deals.sort(key=lambda deal: (deal[1], deal[0]))
+        return deals
+
+    def sample(self, draw_count: int, min_moves: int = 0,
+               max_moves: int = MAX_MOVES, minimal: Optional[bool] = None,
+               remove: bool = False,
+               rng: Optional[random.Random] = None) -> Optional[Deal]:
+        """
+        A uniformly random deal of a band.
+
+        Args:
+            draw_count: ``int`` -> the draw count.
+            min_moves: ``int`` -> lowest moves_made_normalized_count.
+            max_moves: ``int`` -> highest moves_made_normalized_count.
+            minimal: ``Optional[bool]`` -> restrict to minimal or not minimal
+                solutions.
+            remove: ``bool`` -> whether to take the deal out of the catalog.
+            rng: ``Optional[random.Random]`` -> random number generator to use.
+
+        Returns:
+            ``Optional[Tuple[int, int, int]]`` -> (seed, normalized count,
+            result) or `None` if the band is empty.
+        """
+        rng = rng or random
+        with self._lock:
+            ranges = self._ranges(draw_count, min_moves, max_moves, minimal)
+            total = sum(hi - lo for _, _, lo, hi in ranges)
+            if not total:
+                return None
+            pick = rng.randrange(total)
+            for result, keys, lo, hi in ranges:
+                if pick < hi - lo:
+                    key = keys[lo + pick]
+                    if remove:
+                        del keys[lo + pick]
+                    return key & 0xffffffff, key >> 32, result
+                pick -= hi - lo
+        return None
@@ -0,0 +1,53 @@
+# distutils: language = c++
+"""
+Provides Cython header for "deal.h".
+"""
+
+from .cppsolitaire cimport Solitaire
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+
+cdef extern from "deal.h":
+    const int DealSize
+    const int DealSolitaire
+    const int DealPysol
+    const int MoveSize
+    const int MaxMovesMade
+    const unsigned char SuitPermutations[8][4]
+
+    bint IsValidDeal(const unsigned char* deal) nogil
+    void GetDeal(Solitaire& s, unsigned char* deal)
+    void ShuffleDeals(const int* seeds, int count, int method,
+                      unsigned char* deals, int numThreads) nogil
+    bint SetDeal(Solitaire& s, const unsigned char* deal)
+    int ParseDeals(const char* text, size_t size, size_t& pos, int format,
+                   unsigned char* deals, int maxDeals) nogil
+    int FormatDeal(const unsigned char* deal, int format, char* text) nogil
+    int RecordSize(int format) nogil
+    int CanonicalDeal(const unsigned char* deal,
+                      unsigned char* canonical) nogil
+    void DealHashes(const unsigned char* deals, int count,
+                    unsigned long long* hashes) nogil
+    bint IsDealtPosition(Solitaire& s)
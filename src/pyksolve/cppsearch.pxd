@@ -0,0 +1,116 @@
+# distutils: language = c++
+"""
+Provides Cython header for "search.h".
+"""
+
+from libcpp.string cimport string
+
+from .cppsolitaire cimport Solitaire
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+
+cdef extern from "search.h":
+    cdef enum SolveMode "SolveMode":
+        ModeFast = 0,
+        ModeMinimal = 1
+
+    const int SolveTimedOut
+    const int SolveCancelled
+
+    cdef enum ClosedMode "ClosedMode":
+        ClosedExact = 0,
+        ClosedCompact = 1,
+        ClosedCompactConservative = 2
+
+    cdef cppclass SearchArena:
+        SearchArena()
+        int Mode
+        void Release()
+        size_t MemoryUsage()
+        void Trim(long long memoryCap) nogil
+
+    cdef cppclass SearchStats:
+        SearchStats()
+        int ClosedCount
+        int ExpandedCount
+        int OpenCount
+        int PeakOpenCount
+        int HashCapacity
+        int HashSlotsUsed
+        int HashMaxLength
+        int HashCollisions
+        int ClosedLockWaits
+        int OpenLockWaits
+        double Elapsed
+
+    ctypedef int (*ProgressCallback)(void* context,
+                                     const SearchStats& stats) noexcept
+
+    cdef cppclass SearchLimit:
+        SearchLimit()
+        void Cancel() nogil
+        void ResetCancel() nogil
+        void SetTimeout(double seconds)
+        void SetProgress(ProgressCallback progress, void* context,
+                         int interval)
+
+    int SearchFast(Solitaire& s, int maxClosedCount, int twoShift,
+                   int threeShift, SearchArena& arena,
+                   const SearchLimit& limit,
+                   SearchStats& stats) nogil
+    int SearchMinimal(Solitaire& s, int maxClosedCount, SearchArena& arena,
+                      const SearchLimit& limit, SearchStats& stats) nogil
+    int SearchMinimalMultithreaded(Solitaire& s, int numThreads,
+                                   int maxClosedCount, long long memoryBudget,
+                                   int stripes, SearchArena& arena,
+                                   const SearchLimit& limit,
+                                   SearchStats& stats) nogil
+
+    void SolveBatch(const Solitaire& base, const int* seeds,
+                    const unsigned char* deals, int count, int drawCount,
+                    int mode, int maxClosedCount, int twoShift,
+                    int threeShift, int numThreads, signed char* results,
+                    unsigned short* moveCounts,
+                    unsigned short* normalizedCounts, int* closedCounts) nogil
+
+    cdef cppclass EngineResult:
+        EngineResult()
+        int Index
+        int Result
+        int MoveCount
+        int NormalizedCount
+        int ClosedCount
+        int Threads
+        double Elapsed
+        string Moves
+
+    cdef cppclass SolveEngine:
+        SolveEngine(const Solitaire& base, const int* seeds, int count,
+                    int drawCount, int mode, int maxClosedCount, int twoShift,
+                    int threeShift, int numThreads, double stealAfter)
+        void Start()
+        bint Next(EngineResult& result) nogil
+        void Cancel() nogil
+        void Join() nogil
@@ -34,7 +34,10 @@ cdef extern from "Move.cpp":
 
 cdef extern from "Move.h":
     cdef struct Move:
-        pass
+        unsigned char From
+        unsigned char To
+        unsigned char Count
+        unsigned char Extra
 
 cdef extern from "Card.cpp":
     pass
@@ -74,6 +77,10 @@ cdef extern from "Solitaire.h":
         void Shuffle2(int dealNumber)
         void ResetGame()
         void ResetGame(int drawCount)
+        void MakeMove(Move move)
+        void UpdateAvailableMoves()
+        int MovesAvailableCount()
+        Move GetMoveAvailable(int index)
         SolveResult SolveMinimalMultithreaded(int numThreads, int maxClosedCount) nogil
         SolveResult SolveMinimal(int maxClosedCount) nogil
         SolveResult SolveFast(int maxClosedCount, int twoShift, int threeShift) nogil
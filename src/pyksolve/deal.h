@@ -0,0 +1,365 @@
+#ifndef PyksolveDeal_h
+#define PyksolveDeal_h
+/*
+ * Fixed layout byte form of a deal and bulk parsing and formatting of the
+ * text formats of LoadSolitaire and LoadPysol, without a string per deal.
+ *
+ * A deal is DealSize bytes, the Value (Suit * 13 + Rank - 1) of each card in
+ * the order of Solitaire::cards, i.e. as Shuffle1 leaves them for ResetGame.
+ *
+ * Text records, separated by any run of blanks:
+ *   DealSolitaire  the 156 digits of GetSolitaire
+ *   DealPysol      the 8 lines of GetPysol, "Talon:" and 24 cards, then 7
+ *                  tableau lines of 1-7 cards, face down cards in <>
+ */
+#include<cstddef>
+#include<algorithm>
+#include<cstring>
+#include<thread>
+#include<vector>
+#include"state.h"
+using namespace std;
+
+const int DealSize = 52;
+const int DealSolitaire = 0;
+const int DealPysol = 1;
+const int SolitaireRecordSize = 156;
+const int PysolRecordSize = 204;
+const char DealRanks[] = "0A23456789TJQK";
+const char DealSuits[] = "CDSH";
+//A packed move is MoveSize bytes: From, To, Count and Extra of a Move
+const int MoveSize = 4;
+//Capacity of Solitaire::movesMade
+const int MaxMovesMade = 512;
+const int PysolOrder[28] = { 0, 1, 7, 2, 8, 13, 3, 9, 14, 18, 4, 10, 15, 19, 22, 5, 11, 16, 20, 23, 25, 6, 12, 17, 21, 24, 26, 27 };
+
+struct SolitaireCards { typedef Card(Solitaire::*Type)[52]; friend Type Get(SolitaireCards); };
+
+template struct PrivateMember<SolitaireCards, &Solitaire::cards>;
+
+//Checks that deal holds each card once
+inline bool IsValidDeal(unsigned char const * deal) {
+	int used[52] = {};
+	for (int i = 0; i < DealSize; i++) {
+		if (deal[i] >= 52 || used[deal[i]]++ != 0) { return false; }
+	}
+	return true;
+}
+
+//Writes the cards of the last shuffled or loaded card set of s to deal[0..DealSize)
+inline void GetDeal(Solitaire & s, unsigned char * deal) {
+	Card * cards = s.*Get(SolitaireCards());
+	for (int i = 0; i < DealSize; i++) { deal[i] = cards[i].Value; }
+}
+
+//Replaces the card set of s, which ResetGame deals, and returns false if deal is invalid
+inline bool SetDeal(Solitaire & s, unsigned char const * deal) {
+	if (!IsValidDeal(deal)) { return false; }
+	Card * cards = s.*Get(SolitaireCards());
+	for (int i = 0; i < DealSize; i++) { cards[i].Set(deal[i]); }
+	return true;
+}
+
+const int ShuffleLanes = 8;
+
+//One step of the generator of Random, on unsigned ints or on GCC vectors of them, the signed shift is kept
+template<typename Lane, typename SignedLane>
+inline void StepRandom(Lane & value, Lane & mix, Lane & twist) {
+	Lane y = twist - mix;
+	y ^= twist ^ value ^ mix;
+	mix ^= twist ^ value;
+	value ^= twist - mix;
+	twist ^= value ^ y;
+	value ^= (twist << 7) ^ (Lane)((SignedLane)mix >> 16) ^ (y << 8);
+}
+
+//The generator of Random for ShuffleLanes seeds at once, identical to Random::Next1 per lane. The lanes are
+//independent, so their steps overlap, and GCC and Clang run them as vectors
+struct RandomLanes {
+#if defined(__GNUC__)
+	typedef unsigned int Lanes __attribute__((vector_size(ShuffleLanes * 4)));
+	typedef int SignedLanes __attribute__((vector_size(ShuffleLanes * 4)));
+	Lanes Value, Mix, Twist;
+
+	void Step() {
+		StepRandom<Lanes, SignedLanes>(Value, Mix, Twist);
+	}
+#else
+	unsigned int Value[ShuffleLanes], Mix[ShuffleLanes], Twist[ShuffleLanes];
+
+	void Step() {
+		for (int l = 0; l < ShuffleLanes; l++) { StepRandom<unsigned int, int>(Value[l], Mix[l], Twist[l]); }
+	}
+#endif
+	void SetSeeds(int const * seeds) {
+		for (int l = 0; l < ShuffleLanes; l++) {
+			Value[l] = (unsigned int)seeds[l];
+			Mix[l] = 51651237;
+			Twist[l] = 895213268;
+		}
+		for (int i = 0; i < 50; i++) { Step(); }
+		for (int l = 0; l < ShuffleLanes; l++) {
+			Value[l] = 0x9417B3AFU ^ (unsigned int)(seeds[l] ^ (seeds[l] >> 15));
+		}
+		for (int i = 0; i < 950; i++) { Step(); }
+	}
+};
+
+//Writes the Shuffle1 deals of seeds[0..ShuffleLanes) to deals, like Solitaire::Shuffle1
+inline void Shuffle1Lanes(int const * seeds, unsigned char * deals) {
+	//Draw all numbers first, so the generator runs without the swaps in between
+	unsigned int draws[269 * 2][ShuffleLanes];
+	RandomLanes random;
+	random.SetSeeds(seeds);
+	for (int x = 0; x < 269 * 2; ++x) {
+		random.Step();
+		for (int l = 0; l < ShuffleLanes; l++) { draws[x][l] = random.Value[l]; }
+	}
+	for (int l = 0; l < ShuffleLanes; l++) {
+		unsigned char * deal = deals + l * DealSize;
+		for (int i = 0; i < DealSize; i++) { deal[i] = (unsigned char)i; }
+		for (int x = 0; x < 269 * 2; x += 2) {
+			int k = (draws[x][l] & 0x7fffffff) % 52;
+			int j = (draws[x + 1][l] & 0x7fffffff) % 52;
+			unsigned char temp = deal[k];
+			deal[k] = deal[j];
+			deal[j] = temp;
+		}
+	}
+}
+
+//Writes the Shuffle2 deal of seed to deal, like Solitaire::Shuffle2. Random::Next2 only uses the seed,
+//so the warm up of Random::SetSeed is skipped
+inline void Shuffle2Deal(int seed, unsigned char * deal) {
+	unsigned int state = (unsigned int)seed;
+	for (int i = 0; i < 26; i++) { deal[i] = (unsigned char)i; }
+	for (int i = 39; i < 52; i++) { deal[i] = (unsigned char)(i - 13); }
+	for (int i = 26; i < 39; i++) { deal[i] = (unsigned char)(i + 13); }
+	for (int i = 0; i < 7; i++) {
+		for (int j = 0; j < 52; j++) {
+			if (state == 0) { state = 0x12345987; }
+			unsigned int k = state / 127773;
+			state = 16807 * (state - k * 127773) - 2836 * k;
+			if ((int)state < 0) { state += 2147483647; }
+			int r = (int)(state & 0x7fffffff) % 52;
+			unsigned char temp = deal[j];
+			deal[j] = deal[r];
+			deal[r] = temp;
+		}
+	}
+	for (int i = 0, j = 51; i < 26; i++, j--) {
+		unsigned char temp = deal[j];
+		deal[j] = deal[i];
+		deal[i] = temp;
+	}
+}
+
+//Writes the Shuffle1 (method 1) or Shuffle2 (method 2) deal of each of seeds[0..count) to deals, split over numThreads threads
+inline void ShuffleDeals(int const * seeds, int count, int method, unsigned char * deals, int numThreads) {
+	auto run = [=](int start, int end) {
+		if (method == 2) {
+			for (int i = start; i < end; i++) { Shuffle2Deal(seeds[i], deals + i * DealSize); }
+			return;
+		}
+		int i = start;
+		for (; i + ShuffleLanes <= end; i += ShuffleLanes) {
+			Shuffle1Lanes(seeds + i, deals + i * DealSize);
+		}
+		if (i < end) {
+			//Pad the last lanes with the last seed
+			int padded[ShuffleLanes];
+			unsigned char buffer[ShuffleLanes * DealSize];
+			for (int l = 0; l < ShuffleLanes; l++) { padded[l] = seeds[min(i + l, end - 1)]; }
+			Shuffle1Lanes(padded, buffer);
+			memcpy(deals + i * DealSize, buffer, (end - i) * DealSize);
+		}
+	};
+
+	if (numThreads > count) { numThreads = count; }
+	if (numThreads <= 1) {
+		run(0, count);
+		return;
+	}
+	vector<thread> threads;
+	for (int i = 0; i < numThreads; i++) {
+		threads.push_back(thread(run, (int)((long long)count * i / numThreads), (int)((long long)count * (i + 1) / numThreads)));
+	}
+	for (int i = 0; i < numThreads; i++) {
+		threads[i].join();
+	}
+}
+
+//The suit permutations that keep red and black suits apart and thus the rules, SuitPermutations[p][suit] is the new suit
+const unsigned char SuitPermutations[8][4] = {
+	{ CLUBS, DIAMONDS, SPADES, HEARTS }, { SPADES, DIAMONDS, CLUBS, HEARTS },
+	{ CLUBS, HEARTS, SPADES, DIAMONDS }, { SPADES, HEARTS, CLUBS, DIAMONDS },
+	{ DIAMONDS, CLUBS, HEARTS, SPADES }, { HEARTS, CLUBS, DIAMONDS, SPADES },
+	{ DIAMONDS, SPADES, HEARTS, CLUBS }, { HEARTS, SPADES, DIAMONDS, CLUBS }
+};
+
+//Writes the smallest of the deals that deal maps to under SuitPermutations to canonical and returns its permutation
+inline int CanonicalDeal(unsigned char const * deal, unsigned char * canonical) {
+	unsigned char mapped[DealSize];
+	int best = 0;
+	memcpy(canonical, deal, DealSize);
+	for (int p = 1; p < 8; p++) {
+		for (int i = 0; i < DealSize; i++) {
+			mapped[i] = (unsigned char)(SuitPermutations[p][deal[i] / 13] * 13 + deal[i] % 13);
+		}
+		if (memcmp(mapped, canonical, DealSize) < 0) {
+			memcpy(canonical, mapped, DealSize);
+			best = p;
+		}
+	}
+	return best;
+}
+
+//Writes the FNV-1a hash of the canonical form of each of deals[0..count * DealSize) to hashes
+inline void DealHashes(unsigned char const * deals, int count, unsigned long long * hashes) {
+	unsigned char canonical[DealSize];
+	for (int d = 0; d < count; d++) {
+		CanonicalDeal(deals + d * DealSize, canonical);
+		unsigned long long hash = 14695981039346656037ULL;
+		for (int i = 0; i < DealSize; i++) { hash = (hash ^ canonical[i]) * 1099511628211ULL; }
+		hashes[d] = hash;
+	}
+}
+
+//Checks that the piles of s are the start of the game ResetGame deals from its card set
+inline bool IsDealtPosition(Solitaire & s) {
+	Solitaire dealt = s;
+	dealt.ResetGame(s.DrawCount());
+	unsigned char current[StateSize], start[StateSize];
+	GetState(s, current);
+	GetState(dealt, start);
+	return memcmp(current, start, StateSize) == 0;
+}
+
+inline bool IsBlank(char c) {
+	return c == ' ' || c == '\t' || c == '\r' || c == '\n';
+}
+
+//Parses the 156 digits at text[pos..size) into deal and advances pos past them
+inline bool ParseSolitaireRecord(char const * text, size_t size, size_t & pos, unsigned char * deal) {
+	if (size - pos < (size_t)SolitaireRecordSize) { return false; }
+	char const * card = text + pos;
+	for (int i = 0; i < DealSize; i++, card += 3) {
+		int tens = card[0] - '0', ones = card[1] - '0', suit = card[2] - '1';
+		if (tens < 0 || tens > 1 || ones < 0 || ones > 9 || suit < CLUBS || suit > HEARTS) { return false; }
+		int rank = tens * 10 + ones;
+		if (rank < ACE || rank > KING) { return false; }
+		//The default format swaps spades and hearts
+		if (suit >= SPADES) { suit = suit == SPADES ? HEARTS : SPADES; }
+		deal[i] = (unsigned char)(suit * 13 + rank - 1);
+	}
+	pos += SolitaireRecordSize;
+	return true;
+}
+
+//Parses a card like "TH" or "<TH>" at text[pos..size), advances pos past it and returns its Value or -1
+inline int ParsePysolCard(char const * text, size_t size, size_t & pos) {
+	bool down = pos < size && text[pos] == '<';
+	size_t end = pos + (down ? 4 : 2);
+	if (end > size || (down && text[end - 1] != '>')) { return -1; }
+	char const * card = text + pos + (down ? 1 : 0);
+	char const * rank = (char const *)memchr(DealRanks + 1, card[0], 13);
+	char const * suit = (char const *)memchr(DealSuits, card[1], 4);
+	if (rank == NULL || suit == NULL) { return -1; }
+	pos = end;
+	return (int)(suit - DealSuits) * 13 + (int)(rank - DealRanks) - 1;
+}
+
+//Parses the PySol lines at text[pos..size) into deal and advances pos past them
+inline bool ParsePysolRecord(char const * text, size_t size, size_t & pos, unsigned char * deal) {
+	if (size - pos < 6 || memcmp(text + pos, "Talon:", 6) != 0) { return false; }
+	pos += 6;
+	for (int i = 28; i < 52; i++) {
+		size_t start = pos;
+		while (pos < size && (text[pos] == ' ' || text[pos] == '\t')) { pos++; }
+		//The talon cards are separated by blanks and not marked face down
+		if (pos == start || (pos < size && text[pos] == '<')) { return false; }
+		int value = ParsePysolCard(text, size, pos);
+		if (value < 0) { return false; }
+		deal[i] = (unsigned char)value;
+	}
+	for (int line = 0, i = 0; line < 7; line++) {
+		while (pos < size && (text[pos] == ' ' || text[pos] == '\t' || text[pos] == '\r')) { pos++; }
+		if (pos == size || text[pos] != '\n') { return false; }
+		pos++;
+		for (int j = 0; j <= line; j++, i++) {
+			while (pos < size && (text[pos] == ' ' || text[pos] == '\t')) { pos++; }
+			bool down = pos < size && text[pos] == '<';
+			//Only the last card of a line is face up
+			if (down != (j < line)) { return false; }
+			int value = ParsePysolCard(text, size, pos);
+			if (value < 0) { return false; }
+			deal[PysolOrder[i]] = (unsigned char)value;
+		}
+	}
+	return true;
+}
+
+//Parses up to maxDeals records of text[pos..size) into deals, advances pos past them and returns the number parsed.
+//Stops with pos at the start of an invalid record, returns -1 if it is the first one
+inline int ParseDeals(char const * text, size_t size, size_t & pos, int format, unsigned char * deals, int maxDeals) {
+	int count = 0;
+	while (count < maxDeals) {
+		while (pos < size && IsBlank(text[pos])) { pos++; }
+		if (pos == size) { break; }
+		size_t start = pos;
+		unsigned char * deal = deals + count * DealSize;
+		bool parsed = format == DealPysol ? ParsePysolRecord(text, size, pos, deal) : ParseSolitaireRecord(text, size, pos, deal);
+		if (!parsed || (pos < size && !IsBlank(text[pos])) || !IsValidDeal(deal)) {
+			pos = start;
+			return count > 0 ? count : -1;
+		}
+		count++;
+	}
+	return count;
+}
+
+//Writes the record of deal and a trailing newline to text, which must hold RecordSize(format) bytes, and returns the bytes written
+inline int FormatDeal(unsigned char const * deal, int format, char * text) {
+	char * out = text;
+	if (format == DealPysol) {
+		memcpy(out, "Talon:", 6);
+		out += 6;
+		for (int i = 28; i < 52; i++) {
+			*out++ = ' ';
+			*out++ = DealRanks[deal[i] % 13 + 1];
+			*out++ = DealSuits[deal[i] / 13];
+		}
+		for (int line = 0, i = 0; line < 7; line++) {
+			*out++ = '\n';
+			for (int j = 0; j <= line; j++, i++) {
+				unsigned char value = deal[PysolOrder[i]];
+				if (j < line) { *out++ = '<'; }
+				*out++ = DealRanks[value % 13 + 1];
+				*out++ = DealSuits[value / 13];
+				if (j < line) {
+					*out++ = '>';
+					*out++ = ' ';
+				}
+			}
+		}
+		//A blank line separates the records
+		*out++ = '\n';
+	} else {
+		for (int i = 0; i < DealSize; i++) {
+			int rank = deal[i] % 13 + 1;
+			int suit = deal[i] / 13;
+			if (suit >= SPADES) { suit = suit == SPADES ? HEARTS : SPADES; }
+			*out++ = (char)('0' + rank / 10);
+			*out++ = (char)('0' + rank % 10);
+			*out++ = (char)('1' + suit);
+		}
+	}
+	*out++ = '\n';
+	return (int)(out - text);
+}
+
+//Number of bytes FormatDeal writes per deal
+inline int RecordSize(int format) {
+	return (format == DealPysol ? PysolRecordSize + 1 : SolitaireRecordSize) + 1;
+}
+#endif
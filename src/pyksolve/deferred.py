@@ -3,17 +3,30 @@ Provides the DeferredSolver class that generates a number of solvable games for
 faster access to a solvable seed on demand.
 """
 
+import array
+import asyncio
+import collections
+import multiprocessing
+from multiprocessing import connection
+import os
 import queue
 import random
 import threading
-import time
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import Union
 
 from . import solver
+from .cache import SolutionCache
+from .catalog import Catalog
+from .catalog import MAX_MOVES
+from .escalation import EscalationPolicy
+from .escalation import Outcome
+from .store import SolvedStore
 
 __author__ = 'Tiziano Bettio'
 __license__ = 'MIT'
@@ -39,42 +52,389 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE."""
 
 MAX_SEED = 2 ** 31 - 1
+# catalog samples per job before exploring a random seed instead
+_SAMPLE_TRIES = 8
+BACKENDS = ('thread', 'process')
 
+# seed, draw_count, packed moves, solve result, moves_made_count,
+# moves_made_normalized_count (-1 if unknown), deal array of the seed
+_Result = Tuple[int, int, bytes, int, int, int, bytes]
 
-def _worker(exit_e: threading.Event, e_conf: threading.Event,
-            job_q: queue.Queue, res_q: queue.Queue, max_closed: int) -> None:
-    """Worker thread -> consumes jobs that are executed in a Solver thread."""
+
+class _JobState:
+    """
+    Bookkeeping shared between the filler, the workers and
+    :meth:`DeferredSolver.get_solved`. Keeps one bucket of solved games per draw
+    count. Every change that might allow the filler to schedule another job or
+    a caller to take a game is announced through `cond`. Results for a bucket
+    with waiting asyncio futures are handed to the oldest future instead.
+    With a `catalog`, jobs draw their seeds from the deals of the band of
+    their bucket in the catalog that weren't `served` yet, as long as the
+    band holds at least as many of them as the bucket. Otherwise jobs explore
+    random seeds, every solved game with a random seed is added to the
+    catalog and results outside the band only refill it. A deal drawn from
+    the catalog is `taken` until its job is done, it stays in the catalog
+    unchanged. If the deal is in the `store`, its stored solution is served
+    instead of solving it again.
+    """
+    def __init__(self, high: Dict[int, int], low: Dict[int, int],
+                 max_in_flight: int) -> None:
+        self.cond = threading.Condition()
+        self.exit = False
+        self.high = high
+        self.low = low
+        self.max_in_flight = max_in_flight
+        self.solved = {k: collections.deque() for k in high}
+        self.in_flight = {k: 0 for k in high}
+        self.filling = {k: True for k in high}
+        self.waiters = {k: collections.deque() for k in high}
+        self.store_q: Optional[queue.Queue] = None
+        self.catalog: Optional[Catalog] = None
+        self.bands: Dict[int, Tuple[int, int]] = {}
+        self.store: Optional[SolvedStore] = None
+        self.taken: Dict[Tuple[int, int], Tuple[int, int, int]] = {}
+        self.served: Set[Tuple[int, int]] = set()
+        self.served_count = {k: 0 for k in high}
+
+    def next_job(self) -> Optional[int]:
+        """
+        Draw count of the most depleted bucket that needs another job or `None`
+        if no job should be scheduled right now. Must be called with `cond`
+        held.
+        """
+        if sum(self.in_flight.values()) >= self.max_in_flight:
+            return None
+        best = None
+        best_fill = 1.0
+        for draw_count, high in self.high.items():
+            level = len(self.solved[draw_count]) + self.in_flight[draw_count]
+            if level >= high:
+                self.filling[draw_count] = False
+                continue
+            if not self.filling[draw_count]:
+                if level > self.low[draw_count]:
+                    continue
+                self.filling[draw_count] = True
+            fill = level / high
+            if fill < best_fill:
+                best = draw_count
+                best_fill = fill
+        return best
+
+    def in_band(self, draw_count: int, normalized_count: int) -> bool:
+        """Whether a game belongs into the bucket of `draw_count`."""
+        band = self.bands.get(draw_count)
+        return band is None or band[0] <= normalized_count <= band[1]
+
+    def next_seed(self, draw_count: int) -> int:
+        """
+        Seed for a job -> an unserved deal of the band from the catalog or a
+        random seed if the band holds fewer unserved deals than the bucket.
+        """
+        if self.catalog is not None:
+            lo, hi = self.bands.get(draw_count, (0, MAX_MOVES))
+            unserved = self.catalog.count(draw_count, lo, hi) \
+                - self.served_count[draw_count]
+            for _ in range(_SAMPLE_TRIES if unserved >= self.high[draw_count]
+                           else 0):
+                deal = self.catalog.sample(draw_count, lo, hi)
+                if deal is None:
+                    break
+                key = deal[0], draw_count
+                with self.cond:
+                    if key in self.served or key in self.taken:
+                        continue
+                    self.taken[key] = deal
+                return deal[0]
+        return random.randint(0, MAX_SEED)
+
+    def serve(self, seed: int, draw_count: int) -> None:
+        """Count a game handed to the bucket, `cond` held."""
+        if (seed, draw_count) not in self.served:
+            self.served.add((seed, draw_count))
+            self.served_count[draw_count] += 1
+
+    def stored(self, seed: int, draw_count: int) -> Optional[_Result]:
+        """Stored solution of a deal taken from the catalog or `None`."""
+        if self.store is None or (seed, draw_count) not in self.taken:
+            return None
+        record = self.store.get(seed, draw_count)
+        if record is None:
+            return None
+        res, move_count, moves, normalized = record
+        return (seed, draw_count, moves, res, move_count, normalized,
+                bytes(solver.shuffle_deals([seed])))
+
+    def job_done(self, seed: int, draw_count: int,
+                 result: Optional[_Result]) -> None:
+        """Finish one scheduled job and store its result if it was solved."""
+        with self.cond:
+            taken = self.taken.pop((seed, draw_count), None)
+        if result is not None and self.store_q is not None:
+            self.store_q.put(result)
+        if self.catalog is not None and taken is None and result is not None:
+            self.catalog.add(seed, draw_count, result[3], result[5])
+        normalized = taken[1] if taken is not None \
+            else result[5] if result is not None else -1
+        keep = result is not None and self.in_band(draw_count, normalized)
+        with self.cond:
+            self.in_flight[draw_count] -= 1
+            if keep:
+                self.serve(seed, draw_count)
+                self._put(draw_count, result)
+            self.cond.notify_all()
+
+    def _put(self, draw_count: int, result: _Result) -> None:
+        """Hand a result to a waiting future or the bucket, `cond` held."""
+        waiters = self.waiters[draw_count]
+        while waiters:
+            loop, fut = waiters.popleft()
+            if fut.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._deliver, fut, draw_count,
+                                          result)
+            except RuntimeError:  # Event loop is closed
+                continue
+            return
+        self.solved[draw_count].append(result)
+
+    def _deliver(self, fut: asyncio.Future, draw_count: int,
+                 result: _Result) -> None:
+        """Runs in the event loop of `fut`."""
+        if fut.cancelled():
+            with self.cond:
+                self._put(draw_count, result)
+                self.cond.notify_all()
+        else:
+            fut.set_result(result)
+
+    def pop(self, draw_count: int) -> _Result:
+        """Take a solved game from the bucket, blocks until one is available."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.solved[draw_count])
+            result = self.solved[draw_count].popleft()
+            self.cond.notify_all()
+        return result
+
+    def pop_async(self, draw_count: int) -> asyncio.Future:
+        """
+        Take a solved game from the bucket -> future that completes once one
+        is available. Must be called from a running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with self.cond:
+            if self.solved[draw_count]:
+                fut.set_result(self.solved[draw_count].popleft())
+                self.cond.notify_all()
+            else:
+                self.waiters[draw_count].append((loop, fut))
+        return fut
+
+
+def _solve(sol: solver.Solitaire, seed: int, draw_count: int,
+           policy: EscalationPolicy) -> Tuple[Optional[_Result], Outcome]:
+    """
+    Solve a single job up the ladder of `policy` -> result tuple if the game
+    is solvable and the outcome of the stages run.
+    """
+    sol.draw_count = draw_count
+    sol.shuffle1(seed)
+    sol.reset_game()
+    outcome = policy.solve(sol)
+    res = outcome[-1][0].value
+    if abs(res) == 1:
+        return (seed, sol.draw_count, sol.moves_buffer(), res,
+                sol.moves_made_count, sol.moves_made_normalized_count,
+                bytes(sol.deal_array())), outcome
+    return None, outcome
+
+
+def _iter_deals(seeds: List[int],
+                chunk: int = 4096) -> Iterator[Tuple[int, bytes]]:
+    """(seed, deal array) for each seed, the deals generated in chunks."""
+    size = solver.DEAL_SIZE
+    for start in range(0, len(seeds), chunk):
+        part = seeds[start:start + chunk]
+        deals = bytes(solver.shuffle_deals(part))
+        for i, seed in enumerate(part):
+            yield seed, deals[i * size:(i + 1) * size]
+
+
+def _new_metrics() -> Dict[str, float]:
+    return {'jobs': 0, 'solved': 0, 'closed_count': 0, 'expanded_count': 0,
+            'busy_seconds': 0.0, 'memory_usage': 0}
+
+
+def _record(metrics: Dict[str, float], outcome: Outcome,
+            result: Optional[_Result], memory_usage: int) -> None:
+    """Add the statistics of a finished job to the metrics of a worker."""
+    metrics['jobs'] += 1
+    metrics['solved'] += result is not None
+    for _, stats in outcome:
+        metrics['closed_count'] += stats.closed_count
+        metrics['expanded_count'] += stats.expanded_count
+        metrics['busy_seconds'] += stats.elapsed
+    metrics['memory_usage'] = memory_usage
+
+
+def _worker(state: _JobState, job_q: queue.Queue, sol: solver.Solitaire,
+            policy: EscalationPolicy, metrics: Dict[str, float]) -> None:
+    """
+    Worker thread -> consumes jobs that are executed in a Solver thread until
+    it receives `None`.
+    """
+    while True:
+        job = job_q.get()
+        if job is None or state.exit:
+            break
+        result, outcome = _solve(sol, job[0], job[1], policy)
+        _record(metrics, outcome, result, sol.memory_usage)
+        state.job_done(job[0], job[1], result)
+
+
+def _process_worker(exit_e: multiprocessing.Event,
+                    job_q: multiprocessing.Queue,
+                    res_conn: connection.Connection,
+                    policy: EscalationPolicy,
+                    memory_cap: Optional[int], closed_mode: solver.ClosedMode,
+                    parent_pid: int) -> None:
+    """
+    Worker process -> owns a Solver and consumes jobs until it receives `None`
+    or the parent process has gone away. Every finished job is answered over
+    the pipe together with the outcome of its stages, with `None` as result
+    for games that couldn't be solved. The process learns from its own jobs
+    with its copy of `policy`. A running solve is cancelled as soon as
+    `exit_e` is set.
+    """
     sol = solver.Solitaire()
+    sol.memory_cap = memory_cap
+    sol.closed_mode = closed_mode
+
+    def cancel_on_exit():
+        exit_e.wait()
+        sol.cancel()
 
-    while not exit_e.is_set():
+    threading.Thread(target=cancel_on_exit, daemon=True).start()
+
+    while True:
         try:
-            seed, draw_count = job_q.get(timeout=0.001)
+            job = job_q.get(timeout=1.0)
         except queue.Empty:
+            if os.getppid() != parent_pid:
+                break
             continue
-        sol.draw_count = draw_count
-        sol.shuffle1(seed)
-        sol.reset_game()
-        if abs(sol.solve_fast(max_closed).value) == 1:
-            res_q.put((seed, sol.draw_count, sol.moves_made()))
-        job_q.task_done()
-    e_conf.set()
+        if job is None or exit_e.is_set():
+            break
+        result, outcome = _solve(sol, job[0], job[1], policy)
+        res_conn.send((job[0], job[1], result,
+                       [(res.value, tuple(stats)) for res, stats in outcome],
+                       sol.memory_usage))
+    res_conn.close()
+
+
+def _collector(state: _JobState, conns: List[connection.Connection],
+               metrics: List[Dict[str, float]],
+               wake_conn: connection.Connection,
+               policy: EscalationPolicy) -> None:
+    """
+    Collector thread -> hands results from the worker process pipes to the
+    buckets and records the metrics of each worker and the stages run in
+    `policy` until woken up through `wake_conn`.
+    """
+    worker_metrics = dict(zip(conns, metrics))
+    conns = conns + [wake_conn]
+    while True:
+        for conn in connection.wait(conns):
+            if conn is wake_conn:
+                return
+            try:
+                seed, draw_count, result, stages, memory_usage = conn.recv()
+            except EOFError:
+                conns.remove(conn)
+                continue
+            outcome = [(solver.SolveResult(res), solver.SolveStats(*stats))
+                       for res, stats in stages]
+            policy.record(outcome)
+            _record(worker_metrics[conn], outcome, result, memory_usage)
+            state.job_done(seed, draw_count, result)
+
+
+def _filler(state: _JobState, job_q: queue.Queue) -> None:
+    """
+    Filler thread -> keeps the buckets filled between their low and high
+    watermarks, always scheduling for the most depleted bucket first. Sleeps
+    until results are consumed or jobs are finished.
+    """
+    while True:
+        with state.cond:
+            draw_count = None
+            while not state.exit:
+                draw_count = state.next_job()
+                if draw_count is not None:
+                    break
+                state.cond.wait()
+            if state.exit:
+                break
+            state.in_flight[draw_count] += 1
+        seed = state.next_seed(draw_count)
+        result = state.stored(seed, draw_count)
+        if result is not None:
+            state.job_done(seed, draw_count, result)
+        else:
+            job_q.put((seed, draw_count))
 
 
-def _filler(exit_e: threading.Event, e_conf:threading.Event, job_q: queue.Queue,
-            res_q: queue.Queue, target: int,
-            draw_counts: Tuple[int, ...]) -> None:
+def _writer(store: SolvedStore, store_q: queue.Queue) -> None:
     """
-    Filler thread -> keeps the result Queue filled with approximately the right
-    amount of solutions per draw count.
+    Writer thread -> appends new solutions to the store until it receives
+    `None`.
     """
-    job_no = 0
-    mod = len(draw_counts)
-    while not exit_e.is_set():
-        if res_q.qsize() < target * mod and job_q.empty():
-            job_q.put((random.randint(0, MAX_SEED), draw_counts[job_no % mod]))
-            job_no += 1
-        time.sleep(0.001)
-    e_conf.set()
+    while True:
+        result = store_q.get()
+        if result is None:
+            break
+        seed, draw_count, moves, res, move_count, normalized, _ = result
+        store.add(seed, draw_count, res, move_count, moves, normalized)
+    store.flush()
+
+
+def _per_draw_count(value: Union[int, Dict[int, int]],
+                    draw_counts: Tuple[int, ...],
+                    name: str) -> Dict[int, int]:
+    """Expand an int or dict argument to a value for each draw count."""
+    if isinstance(value, int):
+        return {k: value for k in draw_counts}
+    if not isinstance(value, dict):
+        raise TypeError(f'Expected type int or dict for argument {name}.')
+    if set(value) != set(draw_counts):
+        raise ValueError(f'Expected argument {name} to have exactly one entry '
+                         f'per draw count.')
+    for v in value.values():
+        if not isinstance(v, int):
+            raise TypeError(f'Expected int values for argument {name}.')
+    return dict(value)
+
+
+def _bands(move_range: Union[Tuple[int, int], Dict[int, Tuple[int, int]]],
+           draw_counts: Tuple[int, ...]) -> Dict[int, Tuple[int, int]]:
+    """Expand the move_range argument to a band for each draw count."""
+    if isinstance(move_range, tuple):
+        move_range = {k: move_range for k in draw_counts}
+    if not isinstance(move_range, dict):
+        raise TypeError('Expected type tuple or dict for argument move_range.')
+    if not set(move_range) <= set(draw_counts):
+        raise ValueError('Expected the keys of argument move_range to be draw '
+                         'counts.')
+    for band in move_range.values():
+        if not isinstance(band, tuple) or len(band) != 2:
+            raise TypeError('Expected (min_moves, max_moves) tuples for '
+                            'argument move_range.')
+        if not 0 <= band[0] <= band[1]:
+            raise ValueError('Expected 0 <= min_moves <= max_moves in argument '
+                             'move_range.')
+    return dict(move_range)
 
 
 class DeferredSolver:
@@ -83,15 +443,57 @@ class DeferredSolver:
     games for each specified draw count. To properly clean up, call
     :meth:`DeferredSolver.stop` when the `DeferredSolver` is no longer needed.
 
+    Each draw count has its own bucket of solved games. A bucket is refilled
+    once it drops to its low watermark and until it reaches its high watermark
+    (`cache_num`). Free workers are always assigned to the most depleted
+    bucket.
+
     Args:
         draw_counts: ``Tuple[int, ...]`` -> for which draw count a cache is
             generated. Defaults to `(1, 3)`.
-        cache_num: ``int`` -> number of solvable games to cache at any time.
-            Defaults to `5`.
+        cache_num: ``Union[int, Dict[int, int]]`` -> number of solvable games
+            to cache at any time, either for all draw counts or per draw
+            count. Defaults to `5`.
         threads: ``int`` -> number of workers to run solvers. Defaults to `3`.
-        max_closed: ``int`` -> max_closed argument to be passed to the
-            used :meth:`pyksolve.solver.Solitaire.solve_fast` method. Defaults
-            to `1,000,000`.
+        max_closed: ``int`` -> max_closed_count of the last stage of the
+            default escalation policy, see
+            :meth:`pyksolve.escalation.EscalationPolicy.default`. Defaults to
+            `1,000,000`.
+        backend: ``str`` -> either `"thread"` to run the workers as threads in
+            this interpreter or `"process"` to run each worker in its own
+            process with its own solver. Defaults to `"thread"`.
+        low_watermark: ``Optional[Union[int, Dict[int, int]]]`` -> number of
+            cached games at or below which a bucket starts refilling, either
+            for all draw counts or per draw count. Defaults to one less than
+            `cache_num`, which refills as soon as a game is taken.
+        store: ``Optional[str]`` -> path of a
+            :class:`pyksolve.store.SolvedStore` file. If specified, the cache is
+            preloaded with stored games on init and every newly solved game
+            is appended to the store in the background.
+        memory_cap: ``Optional[int]`` -> search memory in bytes each worker
+            keeps between solves, see
+            :attr:`pyksolve.solver.Solitaire.memory_cap`. Defaults to `0`.
+        catalog: ``Optional[Catalog]`` -> a
+            :class:`pyksolve.catalog.Catalog` the workers draw their seeds
+            from. Every newly solved game is added to it.
+        move_range: ``Optional[Union[Tuple[int, int], Dict[int, Tuple[int,
+            int]]]]`` -> band of moves_made_normalized_count (inclusive) the
+            cached games must lie in, either for all draw counts or per draw
+            count. Solved games outside the band are only added to the
+            catalog. Defaults to no restriction.
+        solution_cache: ``Optional[SolutionCache]`` -> a
+            :class:`pyksolve.cache.SolutionCache` the workers look up deals in
+            before solving them and add their results to, only supported by
+            the `"thread"` backend.
+        policy: ``Optional[EscalationPolicy]`` -> a
+            :class:`pyksolve.escalation.EscalationPolicy` that decides which
+            searches the workers run for a deal. With the `"process"` backend
+            each worker process learns with its own copy, while
+            :attr:`DeferredSolver.policy` counts the stages of all workers.
+            Defaults to the policy of `max_closed`.
+        closed_mode: ``ClosedMode`` -> closed set of the searches of each
+            worker, see :attr:`pyksolve.solver.Solitaire.closed_mode`.
+            Defaults to `ClosedMode.Exact`.
 
     .. warning::
         If you don't call :meth:`DeferredSolver.stop`, your program might hang
@@ -99,18 +501,38 @@ class DeferredSolver:
         called, the class is defunct!
     """
     def __init__(self, draw_counts: Tuple[int, ...] = (1, 3),
-                 cache_num:int = 5, threads:int = 3,
+                 cache_num: Union[int, Dict[int, int]] = 5, threads:int = 3,
                  max_closed: int = 1_000_000,
-                 seed: Optional[int] = None) -> None:
+                 seed: Optional[int] = None,
+                 backend: str = 'thread',
+                 low_watermark: Optional[Union[int, Dict[int, int]]] = None,
+                 store: Optional[str] = None,
+                 memory_cap: Optional[int] = 0,
+                 catalog: Optional[Catalog] = None,
+                 move_range: Optional[Union[Tuple[int, int],
+                                            Dict[int, Tuple[int, int]]]] = None,
+                 solution_cache: Optional[SolutionCache] = None,
+                 policy: Optional[EscalationPolicy] = None,
+                 closed_mode: solver.ClosedMode = solver.ClosedMode.Exact
+                 ) -> None:
         if not isinstance(draw_counts, tuple):
             raise TypeError('Expected type tuple for argument draw_counts.')
         for draw_count in draw_counts:
             if not 0 < draw_count < 8:
                 raise ValueError('Expected draw_counts to lie between 1 and 7.')
-        if not isinstance(cache_num, int):
-            raise TypeError('Expected type int for argument cache_num.')
-        if cache_num < 1:
-            raise ValueError('Expected positive value for argument cache_num.')
+        high = _per_draw_count(cache_num, draw_counts, 'cache_num')
+        for value in high.values():
+            if value < 1:
+                raise ValueError('Expected positive value for argument '
+                                 'cache_num.')
+        if low_watermark is None:
+            low = {k: v - 1 for k, v in high.items()}
+        else:
+            low = _per_draw_count(low_watermark, draw_counts, 'low_watermark')
+        for k, value in low.items():
+            if not 0 <= value < high[k]:
+                raise ValueError('Expected low_watermark to lie between 0 and '
+                                 'cache_num - 1.')
         if not isinstance(threads, int):
             raise TypeError('Expected type int for argument threads.')
         if threads < 1:
@@ -121,26 +543,118 @@ class DeferredSolver:
             raise ValueError('Expected positive value for argument max_closed.')
         if seed is not None and not isinstance(seed, int):
             raise TypeError('Expected type int for argument seed.')
-        self._job_queue = queue.Queue()
-        self._result_queue = queue.Queue()
-        self._exit_thread = threading.Event()
-        self._exit_conf = (
-            [threading.Event() for _ in range(threads)],
-            threading.Event()
-        )
-        self._draw_counts = draw_counts
-        self._cache_num = cache_num
-        for i in range(threads):
-            worker = threading.Thread(target=_worker, args=(self._exit_thread,
-                                      self._exit_conf[0][i], self._job_queue,
-                                      self._result_queue, max_closed))
-            worker.start()
-        filler = threading.Thread(target=_filler, args=(self._exit_thread,
-                                  self._exit_conf[1], self._job_queue,
-                                  self._result_queue, cache_num, draw_counts))
-        filler.start()
-        self._solved: Dict[int, List[Tuple[int, str]]] = {}
+        if memory_cap is not None and memory_cap < 0:
+            raise ValueError('Expected non negative value for argument '
+                             'memory_cap.')
+        if backend not in BACKENDS:
+            raise ValueError(f'Expected backend to be one of {BACKENDS}.')
+        if solution_cache is not None and backend == 'process':
+            raise ValueError('Argument solution_cache is not supported by the '
+                             '"process" backend.')
+        closed_mode = solver.ClosedMode(closed_mode)
+        self._backend = backend
+        self._policy = policy or EscalationPolicy.default(max_closed)
+        self._state = _JobState(high, low, threads)
+        self._state.catalog = catalog
+        if move_range is not None:
+            self._state.bands = _bands(move_range, draw_counts)
         self._sol = solver.Solitaire()
+        self._store: Optional[SolvedStore] = None
+        if store is not None:
+            self._store = SolvedStore(store)
+            self._state.store = self._store
+            self._preload(draw_counts, high)
+            self._state.store_q = queue.Queue()
+            self._writer = threading.Thread(target=_writer,
+                                            args=(self._store,
+                                                  self._state.store_q))
+            self._writer.start()
+        self._draw_counts = draw_counts
+        self._cache_num = high
+        self._threads: List[threading.Thread] = []
+        self._solvers: List[solver.Solitaire] = []
+        self._metrics = [_new_metrics() for _ in range(threads)]
+        self._processes: List[multiprocessing.Process] = []
+        if backend == 'process':
+            ctx = multiprocessing.get_context('spawn')
+            self._job_queue = ctx.Queue()
+            self._exit_processes = ctx.Event()
+            conns = []
+            for _ in range(threads):
+                res_r, res_w = ctx.Pipe(duplex=False)
+                worker = ctx.Process(target=_process_worker,
+                                     args=(self._exit_processes,
+                                           self._job_queue, res_w,
+                                           self._policy, memory_cap,
+                                           closed_mode, os.getpid()),
+                                     daemon=True)
+                worker.start()
+                res_w.close()
+                conns.append(res_r)
+                self._processes.append(worker)
+            self._wake_conn = ctx.Pipe(duplex=False)
+            self._collector = threading.Thread(target=_collector,
+                                               args=(self._state, conns,
+                                                     self._metrics,
+                                                     self._wake_conn[0],
+                                                     self._policy))
+            self._collector.start()
+        else:
+            self._job_queue = queue.Queue()
+            for metrics in self._metrics:
+                sol = solver.Solitaire()
+                sol.memory_cap = memory_cap
+                sol.closed_mode = closed_mode
+                sol.solution_cache = solution_cache
+                worker = threading.Thread(target=_worker,
+                                          args=(self._state, self._job_queue,
+                                                sol, self._policy, metrics))
+                worker.start()
+                self._threads.append(worker)
+                self._solvers.append(sol)
+        self._filler_thread = threading.Thread(target=_filler,
+                                               args=(self._state,
+                                                     self._job_queue))
+        self._filler_thread.start()
+
+    def _preload(self, draw_counts: Tuple[int, ...],
+                 high: Dict[int, int]) -> None:
+        """
+        Fill the buckets with stored games. Without a band a random sample
+        is loaded, otherwise all stored games are added to the catalog and
+        the buckets filled with those of the band. Games stored without their
+        moves_made_normalized_count are replayed to find it. The deals of the
+        seeds are generated in bulk.
+        """
+        state = self._state
+        for draw_count in draw_counts:
+            if state.catalog is None and draw_count not in state.bands:
+                seeds = self._store.sample(draw_count, high[draw_count])
+                for seed, deal in _iter_deals(seeds):
+                    res, move_count, moves, normalized = self._store.get(
+                        seed, draw_count)
+                    state.solved[draw_count].append(
+                        (seed, draw_count, moves, res, move_count, normalized,
+                         deal))
+                continue
+            seeds = self._store.seeds(draw_count)
+            random.shuffle(seeds)
+            for seed, deal in _iter_deals(seeds):
+                res, move_count, moves, normalized = self._store.get(
+                    seed, draw_count)
+                if normalized < 0:
+                    self._sol.load_deal_array(deal)
+                    self._sol.reset_game(draw_count)
+                    self._sol.load_moves(moves)
+                    normalized = self._sol.moves_made_normalized_count
+                if state.catalog is not None:
+                    state.catalog.add(seed, draw_count, res, normalized)
+                if len(state.solved[draw_count]) < high[draw_count] \
+                        and state.in_band(draw_count, normalized):
+                    state.serve(seed, draw_count)
+                    state.solved[draw_count].append(
+                        (seed, draw_count, moves, res, move_count, normalized,
+                         deal))
 
     def get_solved(self, draw_count: int) -> Tuple[int, str, str]:
         """
@@ -154,32 +668,172 @@ class DeferredSolver:
         """
         if draw_count not in self._draw_counts:
             raise ValueError(f'Wrong draw_count = {draw_count}')
-        if draw_count not in self._solved:
-            self._solved[draw_count] = []
-        while not len(self._solved[draw_count]):
-            seed, g_draw_count, moves_made = self._result_queue.get()
-            if g_draw_count not in self._solved:
-                self._solved[g_draw_count] = []
-            self._sol.shuffle1(seed)
-            self._sol.reset_game()
-            self._solved[g_draw_count].append((seed, self._sol.game_diagram(),
-                                               moves_made))
-            self._result_queue.task_done()
-        return self._solved[draw_count].pop(0)
+        seed, _, moves, _, _, _, deal = self._state.pop(draw_count)
+        self._sol.load_deal_array(deal)
+        self._sol.reset_game(draw_count)
+        diagram = self._sol.game_diagram()
+        self._sol.load_moves(moves)
+        return seed, diagram, self._sol.moves_made()
+
+    async def get_solved_async(self, draw_count: int) -> Tuple[int, str, str]:
+        """
+        Awaitable variant of :meth:`DeferredSolver.get_solved`. Waits for a
+        solved game without blocking the event loop. Cancelling the call puts
+        a game that arrives afterwards back into the cache.
+
+        Args:
+            draw_count: ``int`` -> valid draw count value as specified on init.
+
+        Returns:
+            Tuple of (seed, game_diagram before solved, moves_made).
+        """
+        if draw_count not in self._draw_counts:
+            raise ValueError(f'Wrong draw_count = {draw_count}')
+        seed, _, moves, _, _, _, deal = await self._state.pop_async(
+            draw_count)
+        self._sol.load_deal_array(deal)
+        self._sol.reset_game(draw_count)
+        diagram = self._sol.game_diagram()
+        self._sol.load_moves(moves)
+        return seed, diagram, self._sol.moves_made()
+
+    def get_solved_state(self, draw_count: int
+                         ) -> Tuple[int, array.array, bytes]:
+        """
+        Get a solved game from cache with the specified draw count as the
+        state of the deal and the packed moves, without building any text.
+
+        Args:
+            draw_count: ``int`` -> valid draw count value as specified on init.
+
+        Returns:
+            Tuple of (seed, state, packed moves), see
+            :meth:`pyksolve.solver.Solitaire.state_array` and
+            :meth:`pyksolve.solver.Solitaire.moves_buffer`.
+        """
+        if draw_count not in self._draw_counts:
+            raise ValueError(f'Wrong draw_count = {draw_count}')
+        seed, _, moves, _, _, _, deal = self._state.pop(draw_count)
+        self._sol.load_deal_array(deal)
+        self._sol.reset_game(draw_count)
+        return seed, self._sol.state_array(), moves
+
+    def get_solved_packed(self, draw_count: int) -> Tuple[int, bytes]:
+        """
+        Get a solved game from cache with the specified draw count, without
+        building the game diagram and moves made strings.
+
+        Args:
+            draw_count: ``int`` -> valid draw count value as specified on init.
+
+        Returns:
+            Tuple of (seed, packed moves), see
+            :meth:`pyksolve.solver.Solitaire.moves_buffer`.
+        """
+        if draw_count not in self._draw_counts:
+            raise ValueError(f'Wrong draw_count = {draw_count}')
+        seed, _, moves, _, _, _, _ = self._state.pop(draw_count)
+        return seed, moves
+
+    async def get_solved_packed_async(self, draw_count: int
+                                      ) -> Tuple[int, bytes]:
+        """
+        Awaitable variant of :meth:`DeferredSolver.get_solved_packed`, see
+        :meth:`DeferredSolver.get_solved_async`.
+
+        Args:
+            draw_count: ``int`` -> valid draw count value as specified on init.
+
+        Returns:
+            Tuple of (seed, packed moves).
+        """
+        if draw_count not in self._draw_counts:
+            raise ValueError(f'Wrong draw_count = {draw_count}')
+        seed, _, moves, _, _, _, _ = await self._state.pop_async(draw_count)
+        return seed, moves
+
+    def wait_filled(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until every bucket holds `cache_num` solved games, e.g. to
+        measure how fast they fill.
+
+        Args:
+            timeout: ``Optional[float]`` -> maximum seconds to wait.
+
+        Returns:
+            ``bool`` -> whether the buckets are filled, `False` if `timeout`
+            expired first.
+        """
+        state = self._state
+        with state.cond:
+            return state.cond.wait_for(
+                lambda: all(len(state.solved[k]) >= v
+                            for k, v in self._cache_num.items()), timeout)
+
+    @property
+    def policy(self) -> EscalationPolicy:
+        """
+        :class:`pyksolve.escalation.EscalationPolicy` -> the escalation policy
+        of the workers, see
+        :meth:`pyksolve.escalation.EscalationPolicy.metrics` for the counts
+        of its stages.
+        """
+        return self._policy
+
+    def metrics(self) -> List[Dict[str, float]]:
+        """
+        Throughput metrics of each worker, accumulated since init.
+
+        Returns:
+            ``List[Dict[str, float]]`` -> one dict per worker with the number
+            of `jobs` run, the number of games `solved`, the summed
+            `closed_count` and `expanded_count` of the searches, the
+            `busy_seconds` spent searching, the resulting `states_per_second`
+            and the `memory_usage` in bytes kept after the last solve.
+        """
+        result = []
+        for metrics in self._metrics:
+            metrics = dict(metrics)
+            busy = metrics['busy_seconds']
+            metrics['states_per_second'] = (metrics['expanded_count'] / busy
+                                            if busy else 0.0)
+            result.append(metrics)
+        return result
 
     def stop(self):
         """
-        Signals all threads to stop.
+        Signals all threads to stop and waits for them to finish. Running
+        solves are cancelled. With the `"process"` backend, worker processes
+        that don't exit in time are terminated.
         """
-        self._exit_thread.set()
-        while True:
-            time.sleep(0.001)
-            if not self._exit_conf[1].is_set():
-                continue
-            clean = True
-            for i in self._exit_conf[0]:
-                if not i.is_set():
-                    clean = False
-                    break
-            if clean:
-                break
+        with self._state.cond:
+            self._state.exit = True
+            self._state.cond.notify_all()
+        self._filler_thread.join()
+        if self._backend == 'process':
+            self._stop_processes()
+        else:
+            for sol in self._solvers:
+                sol.cancel()
+            for _ in self._threads:
+                self._job_queue.put(None)
+            for worker in self._threads:
+                worker.join()
+        if self._store is not None:
+            self._state.store_q.put(None)
+            self._writer.join()
+            self._store.close()
+
+    def _stop_processes(self):
+        self._exit_processes.set()
+        for _ in self._processes:
+            self._job_queue.put(None)
+        for worker in self._processes:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+        self._wake_conn[1].send(None)
+        self._collector.join()
+        self._job_queue.close()
+        self._job_queue.join_thread()
@@ -0,0 +1,244 @@
+"""
+Provides the EscalationPolicy class, that solves a deal with a ladder of
+increasingly expensive searches and learns how far up the ladder it pays to
+go.
+"""
+
+import collections
+import random
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+SOLVED = (solver.SolveResult.SolvedMinimal,
+          solver.SolveResult.SolvedMayNotBeMinimal)
+
+Stage = collections.namedtuple(
+    'Stage', ['mode', 'max_closed', 'two_shift', 'three_shift', 'num_threads'],
+    defaults=(solver.SolveMode.Fast, 1_000_000, 0, 0, 1))
+Stage.__doc__ = """
+One search of an escalation ladder.
+
+Attributes:
+    mode: :class:`pyksolve.solver.SolveMode` -> solve with
+        :meth:`pyksolve.solver.Solitaire.solve_fast` or
+        :meth:`pyksolve.solver.Solitaire.solve_minimal`.
+    max_closed: ``int`` -> max_closed_count of the search.
+    two_shift: ``int`` -> two_shift of a fast search.
+    three_shift: ``int`` -> three_shift of a fast search.
+    num_threads: ``int`` -> threads of a minimal search, more than one uses
+        :meth:`pyksolve.solver.Solitaire.solve_minimal_multithreaded`.
+"""
+
+# result of each stage run with its statistics
+Outcome = List[Tuple[solver.SolveResult, solver.SolveStats]]
+
+
+def _new_counts() -> Dict[str, float]:
+    return {'runs': 0, 'solved': 0, 'impossible': 0, 'could_not_complete': 0,
+            'seconds': 0.0}
+
+
+class EscalationPolicy:
+    """
+    Solves a deal with the first stage of a ladder and escalates to the next
+    stage only while a stage returns
+    :attr:`pyksolve.solver.SolveResult.CouldNotComplete`, so impossible deals
+    don't cost more than the cheap stages and nearly solved deals get a larger
+    budget instead of being discarded.
+
+    The policy counts the runs, results and seconds of each stage. Once each
+    stage ran `min_samples` times, only the stages up to the depth with the
+    highest expected solved deals per search second of a fresh deal are run,
+    a deal that still couldn't be completed is given up in favour of a new
+    one. A share of `explore` deals runs the whole ladder to keep the counts
+    of the skipped stages current. The methods are thread safe.
+
+    Args:
+        stages: ``Sequence[Stage]`` -> the ladder, from cheap to expensive.
+        min_samples: ``int`` -> runs of a stage before it may be skipped.
+        explore: ``float`` -> share of deals that run the whole ladder.
+        rng: ``Optional[random.Random]`` -> random number generator to use.
+    """
+    def __init__(self, stages: Sequence[Stage], min_samples: int = 32,
+                 explore: float = 0.05,
+                 rng: Optional[random.Random] = None) -> None:
+        if not stages:
+            raise ValueError('Expected at least one stage.')
+        for stage in stages:
+            if stage.max_closed < 1 or stage.num_threads < 1:
+                raise ValueError('Expected positive max_closed and num_threads '
+                                 'of each stage.')
+        if min_samples < 1:
+            raise ValueError('Expected positive value for argument '
+                             'min_samples.')
+        if not 0 <= explore <= 1:
+            raise ValueError('Expected explore to lie between 0 and 1.')
+        self._stages = tuple(Stage(*stage) for stage in stages)
+        self._min_samples = min_samples
+        self._explore = explore
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._counts = [_new_counts() for _ in self._stages]
+
+    @classmethod
+    def default(cls, max_closed: int) -> 'EscalationPolicy':
+        """
+        Ladder of a fast search with a tenth of `max_closed` and one with
+        `max_closed`.
+
+        Args:
+            max_closed: ``int`` -> max_closed_count of the last stage.
+
+        Returns:
+            :class:`EscalationPolicy`
+        """
+        return cls([Stage(max_closed=max(max_closed // 10, 1)),
+                    Stage(max_closed=max_closed)])
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def stages(self) -> Tuple[Stage, ...]:
+        """``Tuple[Stage, ...]`` -> the ladder."""
+        return self._stages
+
+    def _depth(self) -> int:
+        """Number of stages that maximizes solved per second, lock held."""
+        best = len(self._stages)
+        best_rate = -1.0
+        reach = 1.0
+        solved = seconds = 0.0
+        for i, counts in enumerate(self._counts):
+            runs = counts['runs']
+            if runs < self._min_samples:
+                return len(self._stages)
+            solved += reach * counts['solved'] / runs
+            seconds += reach * counts['seconds'] / runs
+            rate = solved / seconds if seconds else 0.0
+            if rate > best_rate:
+                best = i + 1
+                best_rate = rate
+            reach *= counts['could_not_complete'] / runs
+        return best
+
+    def depth(self) -> int:
+        """
+        Number of stages a deal currently runs at most, not counting
+        exploration.
+
+        Returns:
+            ``int``
+        """
+        with self._lock:
+            return self._depth()
+
+    def record(self, outcome: Outcome) -> None:
+        """
+        Count the stages run for a deal.
+
+        Args:
+            outcome: ``List[Tuple[SolveResult, SolveStats]]`` -> result and
+                statistics of each stage run, from the first stage up.
+        """
+        with self._lock:
+            for counts, (result, stats) in zip(self._counts, outcome):
+                result = solver.SolveResult(result)
+                counts['runs'] += 1
+                counts['solved'] += result in SOLVED
+                counts['impossible'] += result == solver.SolveResult.Impossible
+                counts['could_not_complete'] += \
+                    result == solver.SolveResult.CouldNotComplete
+                counts['seconds'] += stats.elapsed
+
+    def solve(self, sol: solver.Solitaire) -> Outcome:
+        """
+        Solve the game of `sol` from its current position up the ladder and
+        count the stages run. Each stage starts over from the position after
+        the moves made before the first stage, see
+        :meth:`pyksolve.solver.Solitaire.load_moves`.
+
+        Args:
+            sol: :class:`pyksolve.solver.Solitaire` -> the game to solve.
+
+        Returns:
+            ``List[Tuple[SolveResult, SolveStats]]`` -> result and statistics
+            of each stage run, the result of the last one is the result of
+            the deal.
+        """
+        with self._lock:
+            depth = len(self._stages) if self._rng.random() < self._explore \
+                else self._depth()
+        start = sol.moves_buffer()
+        outcome = []
+        for stage in self._stages[:depth]:
+            if outcome:
+                sol.load_moves(start)
+            if stage.mode == solver.SolveMode.Fast:
+                result = sol.solve_fast(stage.two_shift, stage.three_shift,
+                                        max_closed_count=stage.max_closed)
+            elif stage.num_threads > 1:
+                result = sol.solve_minimal_multithreaded(
+                    stage.num_threads, max_closed_count=stage.max_closed)
+            else:
+                result = sol.solve_minimal(max_closed_count=stage.max_closed)
+            outcome.append((result, sol.last_stats))
+            if result != solver.SolveResult.CouldNotComplete:
+                break
+        self.record(outcome)
+        return outcome
+
+    def metrics(self) -> List[Dict[str, float]]:
+        """
+        Counts of each stage since init.
+
+        Returns:
+            ``List[Dict[str, float]]`` -> one dict per stage with the number
+            of `runs`, how many of them `solved`, found the deal
+            `impossible` or `could_not_complete` it, the `seconds` spent and
+            the resulting `solved_per_second`.
+        """
+        with self._lock:
+            result = []
+            for counts in self._counts:
+                counts = dict(counts)
+                counts['solved_per_second'] = (counts['solved']
+                                               / counts['seconds']
+                                               if counts['seconds'] else 0.0)
+                result.append(counts)
+            return result
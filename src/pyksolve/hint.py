@@ -0,0 +1,273 @@
+"""
+Provides the HintCache class, that answers hint requests for games in
+progress from cached solutions and only searches when a player left every
+known solution.
+"""
+
+import collections
+import threading
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+SOLVED = (solver.SolveResult.SolvedMinimal,
+          solver.SolveResult.SolvedMayNotBeMinimal)
+
+# seed passed to Solitaire.shuffle1 or card set in the default format
+Deal = Union[int, str]
+Move = Tuple[int, int, int, int]
+
+
+class _Entry:
+    """Known solutions of one deal and draw count."""
+    def __init__(self) -> None:
+        self.paths: List[bytes] = []
+        # state_array of each position on a path -> (path index, move index)
+        self.states: Dict[bytes, Tuple[int, int]] = {}
+        self.dead: Set[bytes] = set()
+        # state_array of each position searched from -> set when done
+        self.pending: Dict[bytes, threading.Event] = {}
+
+
+class HintCache:
+    """
+    Cache of solutions that answers which move to make next in a game in
+    progress, given the deal and the packed moves played so far (see
+    :meth:`pyksolve.solver.Solitaire.moves_buffer`).
+
+    A hint is answered, in order of cost:
+
+    1. from a cached solution whose moves start with the moves played,
+    2. from a cached solution that passes through the current position
+       after a different order of moves, found by its
+       :meth:`pyksolve.solver.Solitaire.state_array`,
+    3. by a bounded search from the current position, whose solution is
+       cached for later hints.
+
+    The least recently used deals are evicted once `max_deals` are cached.
+    The methods are thread safe. Searches run without holding the lock, a
+    caller asking for a position that is being searched waits for that
+    search instead of starting another.
+
+    Args:
+        max_deals: ``int`` -> number of deals to keep solutions for.
+        max_closed: ``int`` -> max_closed_count of a search.
+        two_shift: ``int`` -> two_shift of a search, see
+            :meth:`pyksolve.solver.Solitaire.solve_fast`.
+        three_shift: ``int`` -> three_shift of a search.
+        timeout: ``Optional[float]`` -> maximum seconds of a search.
+    """
+    def __init__(self, max_deals: int = 1024, max_closed: int = 250_000,
+                 two_shift: int = 1, three_shift: int = 1,
+                 timeout: Optional[float] = None) -> None:
+        if max_deals < 1:
+            raise ValueError('Expected positive value for argument max_deals.')
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._max_deals = max_deals
+        self._max_closed = max_closed
+        self._two_shift = two_shift
+        self._three_shift = three_shift
+        self._timeout = timeout
+        self._running: Set[solver.Solitaire] = set()
+        self._metrics = {'hits': 0, 'transpositions': 0, 'searches': 0}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _entry(self, deal: Deal, draw_count: int) -> _Entry:
+        """Cached entry of a deal, created if needed, lock held."""
+        key = (deal, draw_count)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry()
+            if len(self._entries) > self._max_deals:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def _load(deal: Deal, draw_count: int,
+              moves: bytes) -> Optional[solver.Solitaire]:
+        """New game at the position after `moves`, `None` if invalid."""
+        sol = solver.Solitaire()
+        if isinstance(deal, str):
+            if not sol.load_solitaire(deal):
+                return None
+        else:
+            sol.shuffle1(deal)
+        sol.reset_game(draw_count)
+        if not sol.load_moves(moves):
+            return None
+        return sol
+
+    def _states(self, deal: Deal, draw_count: int,
+                path: bytes) -> List[bytes]:
+        """state_array of each position along a path before its last move."""
+        sol = self._load(deal, draw_count, b'')
+        states = []
+        for i in range(0, len(path), solver.MOVE_SIZE):
+            states.append(bytes(sol.state_array()))
+            sol.make_moves(path[i:i + solver.MOVE_SIZE])
+        return states
+
+    @staticmethod
+    def _add(entry: _Entry, path: bytes, states: List[bytes]) -> None:
+        """Cache a solution and index the positions along it, lock held."""
+        index = len(entry.paths)
+        entry.paths.append(path)
+        for i, state in enumerate(states):
+            entry.states.setdefault(state, (index, i))
+
+    @staticmethod
+    def _known(entry: _Entry, state: bytes) -> Optional[Move]:
+        """Next move of a cached solution through a position, lock held."""
+        found = entry.states.get(state)
+        if found is None:
+            return None
+        start = found[1] * solver.MOVE_SIZE
+        return tuple(entry.paths[found[0]][start:start + solver.MOVE_SIZE])
+
+    def add_solution(self, deal: Deal, draw_count: int, moves: bytes) -> None:
+        """
+        Cache a known solution, e.g. one served by
+        :meth:`pyksolve.deferred.DeferredSolver.get_solved_packed`.
+
+        Args:
+            deal: ``Union[int, str]`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1` or card set in the
+                format of :meth:`pyksolve.solver.Solitaire.load_solitaire`.
+            draw_count: ``int`` -> the draw count.
+            moves: ``bytes-like`` -> packed moves of the solution.
+        """
+        moves = bytes(moves)
+        sol = self._load(deal, draw_count, moves)
+        if sol is None or sol.foundation_count != 52:
+            raise ValueError('Expected the moves of a solution.')
+        states = self._states(deal, draw_count, moves)
+        with self._lock:
+            entry = self._entry(deal, draw_count)
+            if moves not in entry.paths:
+                self._add(entry, moves, states)
+
+    def hint(self, deal: Deal, draw_count: int,
+             moves: bytes = b'') -> Optional[Move]:
+        """
+        Next move of a solution from the current position.
+
+        Args:
+            deal: ``Union[int, str]`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1` or card set in the
+                format of :meth:`pyksolve.solver.Solitaire.load_solitaire`.
+            draw_count: ``int`` -> the draw count.
+            moves: ``bytes-like`` -> packed moves played so far.
+
+        Returns:
+            ``Optional[Tuple[int, int, int, int]]`` -> (source, destination,
+            count, extra) of the next move, see
+            :func:`pyksolve.solver.encode_moves`, or `None` if the game is
+            finished, the deal or moves are invalid or no solution was found
+            from the current position.
+        """
+        moves = bytes(moves)
+        size = len(moves)
+        if size % solver.MOVE_SIZE:
+            return None
+        with self._lock:
+            # Only deals that loaded before have an entry
+            entry = self._entries.get((deal, draw_count))
+            for path in entry.paths if entry is not None else ():
+                if len(path) > size and path.startswith(moves):
+                    self._entries.move_to_end((deal, draw_count))
+                    self._metrics['hits'] += 1
+                    return tuple(path[size:size + solver.MOVE_SIZE])
+        sol = self._load(deal, draw_count, moves)
+        if sol is None:
+            return None
+        state = bytes(sol.state_array())
+        with self._lock:
+            entry = self._entry(deal, draw_count)
+            move = self._known(entry, state)
+            if move is not None:
+                self._metrics['transpositions'] += 1
+                return move
+            if state in entry.dead or sol.foundation_count == 52:
+                return None
+            done = entry.pending.get(state)
+            search = done is None
+            if search:
+                done = entry.pending[state] = threading.Event()
+                self._running.add(sol)
+                self._metrics['searches'] += 1
+        if not search:
+            done.wait()
+            with self._lock:
+                return self._known(self._entry(deal, draw_count), state)
+        try:
+            res = sol.solve_fast(self._two_shift, self._three_shift,
+                                 self._max_closed, timeout=self._timeout)
+            path = sol.moves_buffer() if res in SOLVED else b''
+            states = self._states(deal, draw_count, path)
+            with self._lock:
+                if path:
+                    self._add(self._entry(deal, draw_count), path, states)
+                elif res == solver.SolveResult.Impossible:
+                    self._entry(deal, draw_count).dead.add(state)
+        finally:
+            with self._lock:
+                del entry.pending[state]
+                self._running.discard(sol)
+            done.set()
+        if len(path) > size:
+            return tuple(path[size:size + solver.MOVE_SIZE])
+        return None
+
+    def cancel(self) -> None:
+        """
+        Cancel the running searches, see
+        :meth:`pyksolve.solver.Solitaire.cancel`. Their hints are `None`.
+        """
+        with self._lock:
+            for sol in self._running:
+                sol.cancel()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Number of hints answered by each way since init.
+
+        Returns:
+            ``Dict[str, int]`` -> `hits` on a cached solution, `transpositions`
+            into a cached solution and `searches`.
+        """
+        with self._lock:
+            return dict(self._metrics)
@@ -0,0 +1,143 @@
+"""
+Provides streaming readers and writers of deal files in the text formats of
+:meth:`pyksolve.solver.Solitaire.load_solitaire` and
+:meth:`pyksolve.solver.Solitaire.load_pysol`. Files are memory mapped and
+parsed in chunks by native code, so memory use does not grow with the file
+size and the chunks can be passed straight to
+:func:`pyksolve.solver.solve_deals`. Converting a file is
+``write_deals(dst, iter_deal_chunks(src, 'pysol'), 'solitaire')``.
+"""
+
+import mmap
+import os
+from typing import Iterable
+from typing import Iterator
+from typing import Union
+
+from . import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+FORMATS = solver.DEAL_FORMATS
+DEAL_SIZE = solver.DEAL_SIZE
+CHUNK_DEALS = 4096
+
+Path = Union[str, os.PathLike]
+
+
+def iter_deal_chunks(path: Path, fmt: str = 'solitaire',
+                     chunk_deals: int = CHUNK_DEALS) -> Iterator[bytes]:
+    """
+    Read the deals of a file in chunks.
+
+    Args:
+        path: ``Union[str, os.PathLike]`` -> the file.
+        fmt: ``str`` -> one of :data:`FORMATS`, see
+            :func:`pyksolve.solver.parse_deals`.
+        chunk_deals: ``int`` -> maximum number of deals per chunk.
+
+    Yields:
+        ``bytes`` -> :data:`DEAL_SIZE` bytes per deal in the format of
+        :meth:`pyksolve.solver.Solitaire.deal_array`.
+
+    Raises:
+        ValueError: at the first record that is not a valid deal, after the
+            deals before it were yielded.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Expected fmt to be in {FORMATS}.')
+    if chunk_deals < 1:
+        raise ValueError('Expected positive value for argument chunk_deals.')
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if hasattr(data, 'madvise'):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+            buf = bytearray(chunk_deals * DEAL_SIZE)
+            offset = 0
+            while True:
+                try:
+                    count, offset = solver.parse_deals(data, buf, fmt, offset)
+                except ValueError as err:
+                    raise ValueError(f'"{path}": invalid {fmt} record at byte '
+                                     f'{err.args[1]}.') from None
+                if not count:
+                    break
+                yield bytes(buf[:count * DEAL_SIZE])
+
+
+def iter_deals(path: Path, fmt: str = 'solitaire') -> Iterator[bytes]:
+    """
+    Read the deals of a file one at a time, see :func:`iter_deal_chunks`.
+
+    Args:
+        path: ``Union[str, os.PathLike]`` -> the file.
+        fmt: ``str`` -> one of :data:`FORMATS`.
+
+    Yields:
+        ``bytes`` -> :data:`DEAL_SIZE` bytes, load them with
+        :meth:`pyksolve.solver.Solitaire.load_deal_array`.
+    """
+    for chunk in iter_deal_chunks(path, fmt):
+        for i in range(0, len(chunk), DEAL_SIZE):
+            yield chunk[i:i + DEAL_SIZE]
+
+
+def write_deals(path: Path, deals: Iterable[bytes], fmt: str = 'solitaire',
+                chunk_deals: int = CHUNK_DEALS) -> int:
+    """
+    Write deals to a file that :func:`iter_deals` reads back.
+
+    Args:
+        path: ``Union[str, os.PathLike]`` -> the file, replaced if it exists.
+        deals: ``Iterable[bytes-like]`` -> deals in the format of
+            :meth:`pyksolve.solver.Solitaire.deal_array`. Each item may hold
+            several deals, e.g. the chunks of :func:`iter_deal_chunks`.
+        fmt: ``str`` -> one of :data:`FORMATS`.
+        chunk_deals: ``int`` -> number of deals formatted per write.
+
+    Returns:
+        ``int`` -> number of deals written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Expected fmt to be in {FORMATS}.')
+    limit = max(chunk_deals, 1) * DEAL_SIZE
+    written = 0
+    pending = bytearray()
+    with open(path, 'wb') as f:
+        for deal in deals:
+            size = memoryview(deal).nbytes
+            if size % DEAL_SIZE:
+                raise ValueError(f'Expected a multiple of {DEAL_SIZE} bytes '
+                                 f'per item.')
+            pending += deal
+            if len(pending) >= limit:
+                f.write(solver.format_deals(pending, fmt))
+                written += len(pending) // DEAL_SIZE
+                pending.clear()
+        if pending:
+            f.write(solver.format_deals(pending, fmt))
+            written += len(pending) // DEAL_SIZE
+    return written
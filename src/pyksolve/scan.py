@@ -0,0 +1,368 @@
+"""
+Provides a resumable scanner that classifies a range of
+:meth:`pyksolve.solver.Solitaire.shuffle1` seeds with
+:func:`pyksolve.solver.solve_batch`, sharded across processes, and the
+ScanFile class to read the resulting columnar file. Run the scanner with
+``python -m pyksolve.scan``.
+"""
+
+import argparse
+import array
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from . import solver
+from .deferred import MAX_SEED
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+MAGIC = b'PYKC'
+FORMAT_VERSION = 1
+# magic, version, number of draw counts, solve mode, start, stop, max closed,
+# two shift, three shift, draw counts
+_HEADER = struct.Struct('<4sHBBIIIBB2x8s')
+# Bytes per seed and draw count: status, moves_made_count and
+# moves_made_normalized_count
+_ENTRY_SIZE = 5
+# Status byte of seeds that were not scanned yet. Scanned seeds store their
+# SolveResult value plus _RESULT_BIAS.
+UNSCANNED = 0
+_RESULT_BIAS = 8
+NOT_SCANNED = UNSCANNED - _RESULT_BIAS
+"""``int`` -> Value of the results column for seeds not scanned yet."""
+_DECODE = bytes((code - _RESULT_BIAS) & 0xff for code in range(256))
+_BLOCK = 1 << 20
+
+Entry = Tuple[int, int, int]
+
+
+def _columns(index: int, count: int) -> Tuple[int, int, int]:
+    """Offsets of the status, move and normalized columns of a draw count."""
+    base = _HEADER.size + index * count * _ENTRY_SIZE
+    return base, base + count, base + 3 * count
+
+
+def _to_bytes(values: array.array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ScanFile:
+    """
+    Read access to a file written by :func:`scan`. The file holds three
+    columns per draw count, each indexed by `seed - start`: the status byte,
+    the moves_made_count and the moves_made_normalized_count, so a lookup is a
+    single offset computation. Seeds that were not scanned yet read as
+    `None`.
+
+    Args:
+        path: ``str`` -> path of the scan file.
+    """
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, num_draw_counts, mode, self.start, self.stop,
+             self.max_closed, self.two_shift, self.three_shift,
+             draw_counts) = _HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f'"{path}" is not a scan file.')
+        self.mode = solver.SolveMode(mode)
+        self.draw_counts = tuple(draw_counts[:num_draw_counts])
+        self._count = self.stop - self.start
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offsets(self, draw_count: int) -> Tuple[int, int, int]:
+        if draw_count not in self.draw_counts:
+            raise ValueError(f'Draw count {draw_count} was not scanned.')
+        return _columns(self.draw_counts.index(draw_count), self._count)
+
+    def get(self, seed: int, draw_count: int) -> Optional[Entry]:
+        """
+        Look up a seed.
+
+        Args:
+            seed: ``int`` -> the seed, must lie in `[start, stop)`.
+            draw_count: ``int`` -> a scanned draw count.
+
+        Returns:
+            ``Optional[Tuple[int, int, int]]`` -> (solve result,
+            moves_made_count, moves_made_normalized_count) or `None` if the
+            seed was not scanned yet.
+        """
+        if not self.start <= seed < self.stop:
+            raise KeyError(seed)
+        status, moves, normalized = self._offsets(draw_count)
+        i = seed - self.start
+        code = self._mmap[status + i]
+        if code == UNSCANNED:
+            return None
+        move_count, = struct.unpack_from('<H', self._mmap, moves + 2 * i)
+        normalized_count, = struct.unpack_from('<H', self._mmap,
+                                               normalized + 2 * i)
+        return code - _RESULT_BIAS, move_count, normalized_count
+
+    def column(self, draw_count: int, name: str) -> array.array:
+        """
+        Copy of a whole column.
+
+        Args:
+            draw_count: ``int`` -> a scanned draw count.
+            name: ``str`` -> `"results"` (solve results,
+                :data:`NOT_SCANNED` for seeds not scanned yet), `"move_counts"`
+                or `"normalized_counts"`.
+
+        Returns:
+            ``array.array`` -> one entry per seed of `[start, stop)`.
+        """
+        offsets = dict(zip(('results', 'move_counts', 'normalized_counts'),
+                           self._offsets(draw_count)))
+        if name not in offsets:
+            raise ValueError(f'Unknown column "{name}".')
+        start = offsets[name]
+        if name == 'results':
+            values = array.array('b')
+            values.frombytes(
+                self._mmap[start:start + self._count].translate(_DECODE))
+            return values
+        values = array.array('H')
+        values.frombytes(self._mmap[start:start + 2 * self._count])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def scanned(self, draw_count: int) -> int:
+        """Number of seeds scanned for a draw count."""
+        status = self._offsets(draw_count)[0]
+        unscanned = 0
+        for lo in range(status, status + self._count, _BLOCK):
+            hi = min(lo + _BLOCK, status + self._count)
+            unscanned += self._mmap[lo:hi].count(UNSCANNED)
+        return self._count - unscanned
+
+    def __iter__(self) -> Iterator[Tuple[int, int, Entry]]:
+        """Iterate over (seed, draw_count, entry) of all scanned seeds."""
+        for draw_count in self.draw_counts:
+            for seed in range(self.start, self.stop):
+                entry = self.get(seed, draw_count)
+                if entry is not None:
+                    yield seed, draw_count, entry
+
+    def close(self) -> None:
+        """Close the file."""
+        self._mmap.close()
+
+
+def _create(path: str, start: int, stop: int, draw_counts: Sequence[int],
+            mode: solver.SolveMode, max_closed: int, two_shift: int,
+            three_shift: int) -> None:
+    """Create a scan file or check that an existing one matches."""
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(draw_counts), mode.value,
+                          start, stop, max_closed, two_shift, three_shift,
+                          bytes(draw_counts))
+    size = _HEADER.size + len(draw_counts) * (stop - start) * _ENTRY_SIZE
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            existing = f.read(_HEADER.size)
+        if existing != header or os.path.getsize(path) != size:
+            raise ValueError(f'"{path}" was started with different '
+                             f'arguments.')
+        return
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.truncate(size)
+
+
+def _pending(path: str, start: int, stop: int, draw_counts: Sequence[int],
+             chunk_size: int) -> List[Tuple[int, int, int]]:
+    """Chunks (draw_count, chunk start, chunk stop) not completely scanned."""
+    chunks = []
+    count = stop - start
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for index, draw_count in enumerate(draw_counts):
+                status = _columns(index, count)[0]
+                for lo in range(start, stop, chunk_size):
+                    hi = min(lo + chunk_size, stop)
+                    offset = status + lo - start
+                    if mm.find(bytes((UNSCANNED,)), offset,
+                               offset + hi - lo) >= 0:
+                        chunks.append((draw_count, lo, hi))
+        finally:
+            mm.close()
+    return chunks
+
+
+def _scan_chunk(job: tuple) -> Tuple[int, int, int, int]:
+    """
+    Solve one chunk and write it to the scan file. The status column is
+    written and synced last, so an interrupted chunk is scanned again.
+    """
+    (path, index, start, stop, draw_count, lo, hi, mode, max_closed, two_shift,
+     three_shift, threads) = job
+    batch = solver.solve_batch(range(lo, hi), draw_count, mode, max_closed,
+                               threads, two_shift, three_shift)
+    status, moves, normalized = _columns(index, stop - start)
+    offset = lo - start
+    codes = bytes(r + _RESULT_BIAS for r in batch.results)
+    with open(path, 'r+b') as f:
+        f.seek(moves + 2 * offset)
+        f.write(_to_bytes(batch.move_counts))
+        f.seek(normalized + 2 * offset)
+        f.write(_to_bytes(batch.normalized_counts))
+        f.flush()
+        os.fsync(f.fileno())
+        f.seek(status + offset)
+        f.write(codes)
+        f.flush()
+        os.fsync(f.fileno())
+    solved = sum(1 for r in batch.results if abs(r) == 1)
+    return draw_count, lo, hi, solved
+
+
+def scan(path: str, start: int, stop: int, draw_counts: Sequence[int] = (1, 3),
+         processes: Optional[int] = None, chunk_size: int = 1000,
+         mode: solver.SolveMode = solver.SolveMode.Fast,
+         max_closed: int = 1_000_000, two_shift: int = 0,
+         three_shift: int = 0, threads: int = 1,
+         progress: Optional[object] = None) -> int:
+    """
+    Scan the seeds `[start, stop)` and write the results to `path`. If `path`
+    already exists and was started with the same arguments, only chunks that
+    were not completed are scanned, so an interrupted scan can be resumed by
+    running it again.
+
+    Args:
+        path: ``str`` -> path of the scan file.
+        start: ``int`` -> first seed.
+        stop: ``int`` -> seed after the last seed.
+        draw_counts: ``Sequence[int]`` -> draw counts to scan.
+        processes: ``Optional[int]`` -> number of worker processes. Defaults
+            to the number of CPUs. With `1`, chunks are scanned in this
+            process.
+        chunk_size: ``int`` -> number of seeds per job and checkpoint.
+        mode: :class:`pyksolve.solver.SolveMode` -> solve method.
+        max_closed: ``int`` -> max_closed_count per seed.
+        two_shift: ``int`` -> see :meth:`pyksolve.solver.Solitaire.solve_fast`.
+        three_shift: ``int`` -> see
+            :meth:`pyksolve.solver.Solitaire.solve_fast`.
+        threads: ``int`` -> native threads of each worker process.
+        progress: ``Optional[TextIO]`` -> stream to log finished chunks to.
+
+    Returns:
+        ``int`` -> number of chunks scanned by this call.
+    """
+    if not 0 <= start < stop <= MAX_SEED + 1:
+        raise ValueError(f'Expected 0 <= start < stop <= {MAX_SEED + 1}.')
+    draw_counts = tuple(draw_counts)
+    if not 0 < len(draw_counts) <= 8 or len(set(draw_counts)) != \
+            len(draw_counts):
+        raise ValueError('Expected 1 to 8 distinct draw counts.')
+    for draw_count in draw_counts:
+        if not 0 < draw_count < 8:
+            raise ValueError('Expected draw_counts to lie between 1 and 7.')
+    if chunk_size < 1:
+        raise ValueError('Expected positive value for argument chunk_size.')
+    mode = solver.SolveMode(mode)
+    _create(path, start, stop, draw_counts, mode, max_closed, two_shift,
+            three_shift)
+    jobs = [(path, draw_counts.index(dc), start, stop, dc, lo, hi, mode,
+             max_closed, two_shift, three_shift, threads)
+            for dc, lo, hi in _pending(path, start, stop, draw_counts,
+                                       chunk_size)]
+    processes = processes or os.cpu_count() or 1
+    begin = time.perf_counter()
+
+    def log(done, result):
+        if progress is not None:
+            draw_count, lo, hi, solved = result
+            print(f'[{done}/{len(jobs)}] draw count {draw_count} seeds '
+                  f'{lo}-{hi - 1}: {solved} solved '
+                  f'({time.perf_counter() - begin:.1f}s)', file=progress)
+
+    if processes == 1:
+        for done, job in enumerate(jobs, 1):
+            log(done, _scan_chunk(job))
+    elif jobs:
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(min(processes, len(jobs))) as pool:
+            for done, result in enumerate(
+                    pool.imap_unordered(_scan_chunk, jobs), 1):
+                log(done, result)
+    return len(jobs)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog='python -m pyksolve.scan',
+        description='Classify a range of shuffle1 seeds. Run the same command '
+                    'again to resume an interrupted scan.')
+    parser.add_argument('path', help='scan file to create or resume')
+    parser.add_argument('--start', type=int, default=0,
+                        help='first seed (default: 0)')
+    parser.add_argument('--stop', type=int, required=True,
+                        help='seed after the last seed')
+    parser.add_argument('--draw-counts', type=int, nargs='+', default=[1, 3],
+                        help='default: 1 3')
+    parser.add_argument('--processes', type=int,
+                        help='worker processes (default: number of CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='seeds per checkpoint (default: 1000)')
+    parser.add_argument('--mode', choices=[m.name.lower()
+                                           for m in solver.SolveMode],
+                        default='fast', help='default: fast')
+    parser.add_argument('--max-closed', type=int, default=1_000_000,
+                        help='max_closed_count per seed (default: 1000000)')
+    parser.add_argument('--two-shift', type=int, default=0)
+    parser.add_argument('--three-shift', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=1,
+                        help='native threads per process (default: 1)')
+    args = parser.parse_args(argv)
+    scan(args.path, args.start, args.stop, args.draw_counts, args.processes,
+         args.chunk_size, solver.SolveMode[args.mode.capitalize()],
+         args.max_closed, args.two_shift, args.three_shift, args.threads,
+         progress=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
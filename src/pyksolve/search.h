@@ -0,0 +1,1163 @@
+#ifndef PyksolveSearch_h
+#define PyksolveSearch_h
+/*
+ * Search routines of Klondike-Solver, ported to only use the public interface
+ * of Solitaire so that the wrapper can extend them (cancellation, statistics,
+ * batches) without patching the upstream sources.
+ */
+#include<algorithm>
+#include<atomic>
+#include<chrono>
+#include<condition_variable>
+#include<cstring>
+#include<deque>
+#include<memory>
+#include<mutex>
+#include<string>
+#include<thread>
+#include<vector>
+#include"Solitaire.h"
+#include"deal.h"
+using namespace std;
+
+enum SolveMode {
+	ModeFast = 0,
+	ModeMinimal = 1
+};
+
+//Result codes of interrupted searches, extending SolveResult
+const int SolveTimedOut = -3;
+const int SolveCancelled = -4;
+
+//Closed set of SearchFast and SearchMinimal, see CompactClosedMap
+enum ClosedMode {
+	ClosedExact = 0,
+	ClosedCompact = 1,
+	ClosedCompactConservative = 2
+};
+
+typedef vector<shared_ptr<MoveNode>> OpenStack;
+
+struct ClosedEntry {
+	HashKey Key;
+	int Value;
+	int Hash;
+	int Next;
+};
+
+//Closed set of a search, a chained hash map like HashMap<int> that keeps its memory when reset
+class ClosedMap {
+private:
+	vector<int> heads;
+	vector<ClosedEntry> entries;
+	int mask, slotsUsed, maxLength;
+
+public:
+	ClosedMap() : mask(0), slotsUsed(0), maxLength(0) {}
+
+	//Empties the map and sizes it to 2^powerOf2 chains, reusing the current memory
+	void Reset(int powerOf2) {
+		int capacity = 1 << powerOf2;
+		if ((int)heads.size() != capacity) {
+			vector<int>(capacity, -1).swap(heads);
+		} else {
+			fill(heads.begin(), heads.end(), -1);
+		}
+		entries.clear();
+		mask = capacity - 1;
+		slotsUsed = 0;
+		maxLength = 0;
+	}
+	void Release() {
+		vector<int>().swap(heads);
+		vector<ClosedEntry>().swap(entries);
+		mask = 0;
+		slotsUsed = 0;
+		maxLength = 0;
+	}
+	int Size() const { return (int)entries.size(); }
+	int Capacity() const { return (int)heads.size(); }
+	int SlotsUsed() const { return slotsUsed; }
+	int MaxLength() const { return maxLength; }
+	size_t MemoryUsage() const { return heads.capacity() * sizeof(int) + entries.capacity() * sizeof(ClosedEntry); }
+	void Reserve(int count) {
+		if ((int)entries.capacity() < count) { entries.reserve(count); }
+	}
+	//Returns the value of key if present, else adds key with value and returns NULL
+	int * Add(HashKey const& key, int value) {
+		return Add(key, key.ComputeHash(), value);
+	}
+	int * Add(HashKey const& key, int hash, int value) {
+		int i = hash;
+		i ^= (hash >> 16);
+		i &= mask;
+
+		int length = 1;
+		for (int index = heads[i]; index >= 0; index = entries[index].Next) {
+			if (entries[index].Hash == hash && key == entries[index].Key) { return &entries[index].Value; }
+			length++;
+		}
+
+		ClosedEntry entry;
+		entry.Key = key;
+		entry.Value = value;
+		entry.Hash = hash;
+		entry.Next = heads[i];
+		if (entry.Next < 0) { slotsUsed++; }
+		heads[i] = (int)entries.size();
+		entries.push_back(entry);
+		if (length > maxLength) { maxLength = length; }
+		return NULL;
+	}
+	//Adds key with value or lowers the value of key, returns whether the state has to be evaluated
+	bool Visit(HashKey const& key, int value) {
+		int * result = Add(key, value);
+		if (result == NULL) { return true; }
+		if (*result <= value) { return false; }
+		*result = value;
+		return true;
+	}
+	int Result(int result) const { return result; }
+};
+
+//Closed set that keeps a 54 bit fingerprint of each key and its value in a single word instead of the key, in an open addressing table with linear probing
+//Keys with the same fingerprint are taken for the same state, so a state can be skipped wrongly with a chance of about Size()^2 / 2^55 per search
+class CompactClosedMap {
+private:
+	static const int ValueBits = 10;
+	static const unsigned long long ValueMask = (1ULL << ValueBits) - 1;
+	vector<unsigned long long> slots;
+	unsigned int capacity;
+	int size, homeCount, maxLength;
+
+	static unsigned long long Fingerprint(HashKey const& key) {
+		unsigned long long words[3] = {};
+		memcpy(words, key.Key, KEYSIZE);
+		unsigned long long hash = 0x9e3779b97f4a7c15ULL;
+		for (int i = 0; i < 3; i++) {
+			hash = (hash ^ words[i]) * 0xff51afd7ed558ccdULL;
+			hash ^= hash >> 32;
+		}
+		hash *= 0xc4ceb9fe1a85ec53ULL;
+		return hash ^ (hash >> 29);
+	}
+	//Maps the top 32 bits of a fingerprint onto [0, capacity)
+	unsigned int Home(unsigned long long word) const {
+		return (unsigned int)(((word >> 32) * capacity) >> 32);
+	}
+	//Places word in the first free slot from its home slot
+	void Place(unsigned long long word) {
+		unsigned int i = Home(word);
+		int length = 1;
+		while (slots[i] != 0) {
+			if (++i == capacity) { i = 0; }
+			length++;
+		}
+		slots[i] = word;
+		if (length == 1) { homeCount++; }
+		if (length > maxLength) { maxLength = length; }
+	}
+	//Grows the table by half once it is 80% full
+	void Grow() {
+		vector<unsigned long long> old(capacity + capacity / 2, 0);
+		old.swap(slots);
+		capacity = (unsigned int)slots.size();
+		homeCount = 0;
+		maxLength = 0;
+		for (size_t i = 0; i < old.size(); i++) {
+			if (old[i] != 0) { Place(old[i]); }
+		}
+	}
+
+public:
+	bool Conservative;
+
+	CompactClosedMap() : capacity(0), size(0), homeCount(0), maxLength(0), Conservative(false) {}
+
+	//Empties the map, reusing the current memory
+	void Reset() {
+		if (slots.empty()) {
+			vector<unsigned long long>(1 << 12, 0).swap(slots);
+		} else {
+			fill(slots.begin(), slots.end(), 0);
+		}
+		capacity = (unsigned int)slots.size();
+		size = 0;
+		homeCount = 0;
+		maxLength = 0;
+	}
+	void Release() {
+		vector<unsigned long long>().swap(slots);
+		capacity = 0;
+		size = 0;
+		homeCount = 0;
+		maxLength = 0;
+	}
+	int Size() const { return size; }
+	int Capacity() const { return (int)capacity; }
+	//Entries in their home slot, the others count as collisions
+	int SlotsUsed() const { return homeCount; }
+	int MaxLength() const { return maxLength; }
+	size_t MemoryUsage() const { return slots.capacity() * sizeof(unsigned long long); }
+	//Adds key with value or lowers the value of key, returns whether the state has to be evaluated
+	bool Visit(HashKey const& key, int value) {
+		if ((unsigned long long)size * 5 >= (unsigned long long)capacity * 4) { Grow(); }
+		unsigned long long tag = Fingerprint(key) & ~ValueMask;
+		if (tag == 0) { tag = ValueMask + 1; }
+		unsigned long long word = tag | (unsigned long long)min(value, (int)ValueMask);
+		unsigned int i = Home(tag);
+		int length = 1;
+		while (slots[i] != 0) {
+			if ((slots[i] & ~ValueMask) == tag) {
+				if (slots[i] <= word) { return false; }
+				slots[i] = word;
+				return true;
+			}
+			if (++i == capacity) { i = 0; }
+			length++;
+		}
+		slots[i] = word;
+		size++;
+		if (length == 1) { homeCount++; }
+		if (length > maxLength) { maxLength = length; }
+		return true;
+	}
+	//A state skipped for a fingerprint collision can hide the solution or the shorter solution, so the conservative policy doesn't report either as proven
+	int Result(int result) const {
+		if (!Conservative) { return result; }
+		if (result == Impossible) { return CouldNotComplete; }
+		if (result == SolvedMinimal) { return SolvedMayNotBeMinimal; }
+		return result;
+	}
+};
+
+//Locks mtx and counts in waits if another thread was holding it
+inline void LockCounted(mutex & mtx, atomic<int> & waits) {
+	if (!mtx.try_lock()) {
+		waits++;
+		mtx.lock();
+	}
+}
+
+//Closed set shared by the threads of SearchMinimalMultithreaded, split into stripes of ClosedMap that are locked independently
+class StripedClosedMap {
+private:
+	struct Stripe {
+		mutex Mtx;
+		ClosedMap Map;
+	};
+	vector<unique_ptr<Stripe>> stripes;
+	int stripeShift;
+	atomic<int> size;
+
+	Stripe & StripeOf(int hash) {
+		unsigned int mixed = (unsigned int)hash * 2654435761U;
+		return *stripes[stripeShift < 32 ? mixed >> stripeShift : 0];
+	}
+
+public:
+	atomic<int> LockWaits;
+
+	StripedClosedMap() : stripeShift(32), size(0), LockWaits(0) {}
+
+	//Empties the map and splits it into 2^stripePowerOf2 stripes of 2^powerOf2 chains with room for reserve entries each
+	void Reset(int stripePowerOf2, int powerOf2, int reserve) {
+		int count = 1 << stripePowerOf2;
+		stripes.resize(min((int)stripes.size(), count));
+		while ((int)stripes.size() < count) {
+			stripes.push_back(unique_ptr<Stripe>(new Stripe()));
+		}
+		for (size_t i = 0; i < stripes.size(); i++) {
+			stripes[i]->Map.Reset(powerOf2);
+			stripes[i]->Map.Reserve(reserve);
+		}
+		stripeShift = 32 - stripePowerOf2;
+		size.store(0);
+		LockWaits.store(0);
+	}
+	void Release() {
+		vector<unique_ptr<Stripe>>().swap(stripes);
+		size.store(0);
+	}
+	//Adds key with value or lowers the value of key, returns whether the state has to be evaluated
+	bool Add(HashKey const& key, int value) {
+		int hash = key.ComputeHash();
+		Stripe & stripe = StripeOf(hash);
+		LockCounted(stripe.Mtx, LockWaits);
+		int * result = stripe.Map.Add(key, hash, value);
+		bool better = result == NULL || *result > value;
+		if (result != NULL && better) { *result = value; }
+		stripe.Mtx.unlock();
+		if (result == NULL) { size++; }
+		return better;
+	}
+	int Size() const { return size.load(memory_order_relaxed); }
+	int Stripes() const { return (int)stripes.size(); }
+	int Capacity() const {
+		int capacity = 0;
+		for (size_t i = 0; i < stripes.size(); i++) { capacity += stripes[i]->Map.Capacity(); }
+		return capacity;
+	}
+	int SlotsUsed() const {
+		int slotsUsed = 0;
+		for (size_t i = 0; i < stripes.size(); i++) { slotsUsed += stripes[i]->Map.SlotsUsed(); }
+		return slotsUsed;
+	}
+	int MaxLength() const {
+		int maxLength = 0;
+		for (size_t i = 0; i < stripes.size(); i++) { maxLength = max(maxLength, stripes[i]->Map.MaxLength()); }
+		return maxLength;
+	}
+	size_t MemoryUsage() const {
+		size_t usage = stripes.capacity() * sizeof(unique_ptr<Stripe>);
+		for (size_t i = 0; i < stripes.size(); i++) { usage += sizeof(Stripe) + stripes[i]->Map.MemoryUsage(); }
+		return usage;
+	}
+};
+
+//Search memory that is kept between searches
+struct SearchArena {
+	ClosedMap Closed;
+	CompactClosedMap Compact;
+	StripedClosedMap Shared;
+	OpenStack Open[512];
+	//ClosedMode of SearchFast and SearchMinimal
+	int Mode;
+
+	SearchArena() : Mode(ClosedExact) {}
+	void Reset(int maxClosedCount);
+	void ClearOpen() {
+		for (int i = 0; i < 512; i++) { Open[i].clear(); }
+	}
+	void Release() {
+		Closed.Release();
+		Compact.Release();
+		Shared.Release();
+		for (int i = 0; i < 512; i++) { OpenStack().swap(Open[i]); }
+	}
+	size_t MemoryUsage() const {
+		size_t usage = Closed.MemoryUsage() + Compact.MemoryUsage() + Shared.MemoryUsage();
+		for (int i = 0; i < 512; i++) { usage += Open[i].capacity() * sizeof(shared_ptr<MoveNode>); }
+		return usage;
+	}
+	//Releases the memory if more than memoryCap bytes are kept, a negative cap keeps everything
+	void Trim(long long memoryCap) {
+		ClearOpen();
+		if (memoryCap >= 0 && (long long)MemoryUsage() > memoryCap) { Release(); }
+	}
+};
+
+//Counters of a search, filled in while searching and completed when it ends
+struct SearchStats {
+	int ClosedCount, ExpandedCount, OpenCount, PeakOpenCount;
+	int HashCapacity, HashSlotsUsed, HashMaxLength, HashCollisions;
+	int ClosedLockWaits, OpenLockWaits;
+	double Elapsed;
+
+	SearchStats() : ClosedCount(0), ExpandedCount(0), OpenCount(0), PeakOpenCount(0), HashCapacity(0), HashSlotsUsed(0), HashMaxLength(0), HashCollisions(0), ClosedLockWaits(0), OpenLockWaits(0), Elapsed(0) {}
+	void Pushed() {
+		if (++OpenCount > PeakOpenCount) { PeakOpenCount = OpenCount; }
+	}
+	void Popped() {
+		OpenCount--;
+		ExpandedCount++;
+	}
+	//Entries that were added to an occupied chain are counted as collisions
+	template<typename Map> void Finish(Map const& closed) {
+		ClosedCount = closed.Size();
+		HashCapacity = closed.Capacity();
+		HashSlotsUsed = closed.SlotsUsed();
+		HashMaxLength = closed.MaxLength();
+		HashCollisions = ClosedCount - HashSlotsUsed;
+	}
+};
+
+//Called with the current counters, a non zero return value cancels the search
+typedef int (*ProgressCallback)(void * context, SearchStats const& stats);
+
+//Cancel flag, deadline and progress callback of a search, shared with the thread requesting a cancel
+struct SearchLimit {
+	atomic<bool> Cancelled;
+	bool HasDeadline;
+	chrono::steady_clock::time_point Deadline;
+	ProgressCallback Progress;
+	void * ProgressContext;
+	int ProgressInterval;
+
+	SearchLimit() : Cancelled(false), HasDeadline(false), Progress(NULL), ProgressContext(NULL), ProgressInterval(0) {}
+	void Cancel() { Cancelled.store(true); }
+	void ResetCancel() { Cancelled.store(false); }
+	//A negative timeout removes the deadline
+	void SetTimeout(double seconds) {
+		HasDeadline = seconds >= 0;
+		if (HasDeadline) {
+			Deadline = chrono::steady_clock::now() + chrono::duration_cast<chrono::steady_clock::duration>(chrono::duration<double>(seconds));
+		}
+	}
+	//Calls progress every interval expansions, NULL removes the callback
+	void SetProgress(ProgressCallback progress, void * context, int interval) {
+		Progress = progress;
+		ProgressContext = context;
+		ProgressInterval = interval;
+	}
+};
+
+//Per thread view of a SearchLimit, only reads the clock every 64 checks
+struct LimitCheck {
+	SearchLimit const& Limit;
+	chrono::steady_clock::time_point Start;
+	int Countdown, SinceProgress;
+
+	LimitCheck(SearchLimit const& limit, chrono::steady_clock::time_point start) : Limit(limit), Start(start), Countdown(0), SinceProgress(0) {}
+	double Elapsed() const {
+		return chrono::duration<double>(chrono::steady_clock::now() - Start).count();
+	}
+	//Returns SolveCancelled or SolveTimedOut once the limit is reached, else 0
+	int Reached(SearchStats & stats) {
+		if (Limit.Progress != NULL && ++SinceProgress >= Limit.ProgressInterval) {
+			SinceProgress = 0;
+			stats.Elapsed = Elapsed();
+			if (Limit.Progress(Limit.ProgressContext, stats) != 0) { return SolveCancelled; }
+		}
+		if (Limit.Cancelled.load(memory_order_relaxed)) { return SolveCancelled; }
+		if (Limit.HasDeadline && --Countdown <= 0) {
+			Countdown = 64;
+			if (chrono::steady_clock::now() >= Limit.Deadline) { return SolveTimedOut; }
+		}
+		return 0;
+	}
+};
+
+inline int ClosedPowerOf2(int maxClosedCount) {
+	int powerOf2 = 1;
+	while (maxClosedCount > (1 << (powerOf2 + 2))) {
+		powerOf2++;
+	}
+	return powerOf2;
+}
+
+inline void SearchArena::Reset(int maxClosedCount) {
+	ClearOpen();
+	if (Mode == ClosedExact) {
+		Closed.Reset(ClosedPowerOf2(maxClosedCount));
+	} else {
+		Compact.Reset();
+		Compact.Conservative = Mode == ClosedCompactConservative;
+	}
+}
+
+//Restores the game to the state of node, starting from the root of the search, and makes any auto moves, returns the node of the resulting state
+//The root is a copy of the game when the search started, so a search continues from any position and not only from the deal
+inline shared_ptr<MoveNode> ReplayNode(Solitaire & s, Solitaire const& root, shared_ptr<MoveNode> firstNode, Move movesToMake[]) {
+	s = root;
+	int movesTotal = 0;
+	shared_ptr<MoveNode> node = firstNode;
+	while (node != NULL) {
+		movesToMake[movesTotal++] = node->Value;
+		node = node->Parent;
+	}
+	while (movesTotal > 0) {
+		s.MakeMove(movesToMake[--movesTotal]);
+	}
+
+	s.UpdateAvailableMoves();
+	while (s.MovesAvailableCount() == 1) {
+		Move move = s.GetMoveAvailable(0);
+		s.MakeMove(move);
+		firstNode = make_shared<MoveNode>(move, firstNode);
+		s.UpdateAvailableMoves();
+	}
+	return firstNode;
+}
+
+inline void SaveSolution(Solitaire & s, Move bestSolution[]) {
+	int movesMadeCount = s.MovesMadeCount();
+	for (int i = 0; i < movesMadeCount; i++) {
+		bestSolution[i] = s[i];
+	}
+	bestSolution[movesMadeCount].Count = 255;
+}
+
+inline void RestoreSolution(Solitaire & s, Solitaire const& root, Move bestSolution[]) {
+	s = root;
+	for (int i = s.MovesMadeCount(); bestSolution[i].Count < 255; i++) {
+		s.MakeMove(bestSolution[i]);
+	}
+}
+
+template<typename Map> inline void AddOpen(Solitaire & s, Map & closed, OpenStack open[], shared_ptr<MoveNode> const& parent, Move move, int movesAdded, int helper, SearchStats & stats) {
+	s.MakeMove(move);
+
+	if (closed.Visit(s.GameState(), movesAdded)) {
+		open[helper].push_back(make_shared<MoveNode>(move, parent));
+		stats.Pushed();
+	}
+
+	s.UndoMove();
+}
+
+template<typename Map> inline int SearchFast(Solitaire & s, int maxClosedCount, int twoShift, int threeShift, Map & closed, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	int maxFoundationCount = s.FoundationCount();
+	int bestSolutionMoveCount = 512;
+
+	OpenStack * open = arena.Open;
+	Move movesToMake[512];
+	Move bestSolution[512];
+	bestSolution[s.MovesMadeCount()].Count = 255;
+	Solitaire root = s;
+	int startMoves = s.MovesMadeNormalizedCount() + s.MinimumMovesLeft();
+	int threeClosed = maxClosedCount >> threeShift;
+	int twoClosed = maxClosedCount >> twoShift;
+	open[startMoves].push_back(NULL);
+	stats.Pushed();
+	LimitCheck check(limit, chrono::steady_clock::now());
+	int interrupted = 0;
+	while (closed.Size() < maxClosedCount) {
+		stats.ClosedCount = closed.Size();
+		if ((interrupted = check.Reached(stats)) != 0) { break; }
+
+		//Check for lowest score length
+		int index = startMoves;
+		while (index < 512 && open[index].size() == 0) { index++; }
+
+		//End solver if no more states
+		if (index >= 512) { break; }
+
+		//Get next state to evaluate
+		shared_ptr<MoveNode> firstNode = open[index].back();
+		open[index].pop_back();
+		stats.Popped();
+		firstNode = ReplayNode(s, root, firstNode, movesToMake);
+		int movesTotal = s.MovesMadeNormalizedCount();
+
+		//Check for best solution to foundations
+		if (s.FoundationCount() > maxFoundationCount || (s.FoundationCount() == maxFoundationCount && bestSolutionMoveCount > movesTotal)) {
+			bestSolutionMoveCount = movesTotal;
+			maxFoundationCount = s.FoundationCount();
+			SaveSolution(s, bestSolution);
+		} else if (maxFoundationCount == 52) {
+			//Dont check state if above or equal to current best solution
+			if (s.MinimumMovesLeft() + movesTotal >= bestSolutionMoveCount) { continue; }
+		}
+
+		//Keep the three best moves to be evaluated
+		Move bestMove1, bestMove2, bestMove3;
+		int bestMoveAdded1 = 512, bestMoveHelper1 = 512, bestMoveAdded2 = 512, bestMoveHelper2 = 512, bestMoveAdded3 = 512, bestMoveHelper3 = 512;
+		int movesAvailableCount = s.MovesAvailableCount();
+		for (int i = 0; i < movesAvailableCount; i++) {
+			Move move = s.GetMoveAvailable(i);
+			int movesAdded = s.MovesAdded(move);
+
+			s.MakeMove(move);
+
+			movesAdded += movesTotal;
+			movesAdded += s.MinimumMovesLeft();
+			if (maxFoundationCount < 52 || movesAdded < bestSolutionMoveCount) {
+				int helper = movesAdded;
+				helper += 52 - s.FoundationCount() + s.RoundCount();
+
+				if (helper < bestMoveHelper1) {
+					if (bestMoveHelper1 <= bestMoveHelper2) {
+						if (bestMoveHelper2 <= bestMoveHelper3) {
+							bestMove3 = bestMove2;
+							bestMoveAdded3 = bestMoveAdded2;
+							bestMoveHelper3 = bestMoveHelper2;
+						}
+						bestMove2 = bestMove1;
+						bestMoveAdded2 = bestMoveAdded1;
+						bestMoveHelper2 = bestMoveHelper1;
+					} else if (bestMoveHelper1 <= bestMoveHelper3) {
+						bestMove3 = bestMove1;
+						bestMoveAdded3 = bestMoveAdded1;
+						bestMoveHelper3 = bestMoveHelper1;
+					}
+					bestMove1 = move;
+					bestMoveAdded1 = movesAdded;
+					bestMoveHelper1 = helper;
+				} else if (helper < bestMoveHelper2) {
+					if (bestMoveHelper2 <= bestMoveHelper3) {
+						bestMove3 = bestMove2;
+						bestMoveAdded3 = bestMoveAdded2;
+						bestMoveHelper3 = bestMoveHelper2;
+					}
+					bestMove2 = move;
+					bestMoveAdded2 = movesAdded;
+					bestMoveHelper2 = helper;
+				} else if (helper < bestMoveHelper3) {
+					bestMove3 = move;
+					bestMoveAdded3 = movesAdded;
+					bestMoveHelper3 = helper;
+				}
+			}
+
+			s.UndoMove();
+		}
+
+		if (bestMoveHelper1 < 512) {
+			AddOpen(s, closed, open, firstNode, bestMove1, bestMoveAdded1, bestMoveHelper1, stats);
+		}
+		if (closed.Size() < twoClosed && bestMoveHelper2 < 512) {
+			AddOpen(s, closed, open, firstNode, bestMove2, bestMoveAdded2, bestMoveHelper2, stats);
+		}
+		if (closed.Size() < threeClosed && bestMoveHelper3 < 512) {
+			AddOpen(s, closed, open, firstNode, bestMove3, bestMoveAdded3, bestMoveHelper3, stats);
+		}
+	}
+
+	stats.Finish(closed);
+	stats.Elapsed = check.Elapsed();
+	arena.ClearOpen();
+	RestoreSolution(s, root, bestSolution);
+	if (interrupted != 0 && maxFoundationCount < 52) { return interrupted; }
+	return maxFoundationCount == 52 ? SolvedMayNotBeMinimal : CouldNotComplete;
+}
+
+template<typename Map> inline int SearchMinimal(Solitaire & s, int maxClosedCount, Map & closed, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	int maxFoundationCount = s.FoundationCount();
+	int bestSolutionMoveCount = 512;
+
+	OpenStack * open = arena.Open;
+	Move movesToMake[512];
+	Move bestSolution[512];
+	bestSolution[s.MovesMadeCount()].Count = 255;
+	Solitaire root = s;
+	int startMoves = s.MinimumMovesLeft() + s.MovesMadeNormalizedCount();
+	open[startMoves].push_back(NULL);
+	stats.Pushed();
+	LimitCheck check(limit, chrono::steady_clock::now());
+	int interrupted = 0;
+	while (closed.Size() < maxClosedCount) {
+		stats.ClosedCount = closed.Size();
+		if ((interrupted = check.Reached(stats)) != 0) { break; }
+
+		//Check for lowest score length
+		int index = startMoves;
+		while (index < 512 && open[index].size() == 0) { index++; }
+
+		//End solver if no more states
+		if (index >= 512) { break; }
+
+		//Get next state to evaluate
+		shared_ptr<MoveNode> firstNode = open[index].back();
+		open[index].pop_back();
+		stats.Popped();
+		firstNode = ReplayNode(s, root, firstNode, movesToMake);
+		int movesTotal = s.MovesMadeNormalizedCount();
+
+		//Check for best solution to foundations
+		if (s.FoundationCount() > maxFoundationCount || (s.FoundationCount() == maxFoundationCount && bestSolutionMoveCount > movesTotal)) {
+			bestSolutionMoveCount = movesTotal;
+			maxFoundationCount = s.FoundationCount();
+			SaveSolution(s, bestSolution);
+		} else if (maxFoundationCount == 52) {
+			//Dont check state if above or equal to current best solution
+			if (s.MinimumMovesLeft() + movesTotal >= bestSolutionMoveCount) { continue; }
+		}
+
+		//Make available moves and add them to be evaluated
+		int movesAvailableCount = s.MovesAvailableCount();
+		for (int i = 0; i < movesAvailableCount; i++) {
+			Move move = s.GetMoveAvailable(i);
+			int movesAdded = s.MovesAdded(move);
+
+			s.MakeMove(move);
+
+			movesAdded += movesTotal;
+			movesAdded += s.MinimumMovesLeft();
+			if (maxFoundationCount < 52 || movesAdded < bestSolutionMoveCount) {
+				int helper = movesAdded;
+				helper += 52 - s.FoundationCount() + s.RoundCount();
+				if (closed.Visit(s.GameState(), movesAdded)) {
+					open[helper].push_back(make_shared<MoveNode>(move, firstNode));
+					stats.Pushed();
+				}
+			}
+
+			s.UndoMove();
+		}
+	}
+
+	stats.Finish(closed);
+	stats.Elapsed = check.Elapsed();
+	arena.ClearOpen();
+	RestoreSolution(s, root, bestSolution);
+	if (interrupted != 0) { return maxFoundationCount == 52 ? SolvedMayNotBeMinimal : interrupted; }
+	return closed.Result(closed.Size() >= maxClosedCount ? (maxFoundationCount == 52 ? SolvedMayNotBeMinimal : CouldNotComplete) : (maxFoundationCount == 52 ? SolvedMinimal : Impossible));
+}
+
+//Searches with the closed set selected by the Mode of arena
+inline int SearchFast(Solitaire & s, int maxClosedCount, int twoShift, int threeShift, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	s.MakeAutoMoves();
+	if (s.MovesAvailableCount() == 0) { return s.FoundationCount() == 52 ? SolvedMinimal : Impossible; }
+
+	arena.Reset(maxClosedCount);
+	if (arena.Mode == ClosedExact) { return SearchFast(s, maxClosedCount, twoShift, threeShift, arena.Closed, arena, limit, stats); }
+	return SearchFast(s, maxClosedCount, twoShift, threeShift, arena.Compact, arena, limit, stats);
+}
+
+inline int SearchMinimal(Solitaire & s, int maxClosedCount, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	s.MakeAutoMoves();
+	if (s.MovesAvailableCount() == 0) { return s.FoundationCount() == 52 ? SolvedMinimal : Impossible; }
+
+	arena.Reset(maxClosedCount);
+	if (arena.Mode == ClosedExact) { return SearchMinimal(s, maxClosedCount, arena.Closed, arena, limit, stats); }
+	return SearchMinimal(s, maxClosedCount, arena.Compact, arena, limit, stats);
+}
+
+//State of a search shared by several threads, the open set and the best solution are guarded by Mtx
+//Fast searches only push the best three moves of a state like SearchFast, else every move is pushed like SearchMinimal
+struct SharedSearch {
+	OpenStack * Open;
+	Move BestSolution[512];
+	mutex Mtx;
+	StripedClosedMap & Closed;
+	int MaxFoundationCount, BestSolutionMoveCount, StartMoves, MaxClosedCount, Busy;
+	bool Fast;
+	int TwoClosed, ThreeClosed;
+	atomic<int> Interrupted, OpenLockWaits;
+
+	SearchStats Stats;
+	chrono::steady_clock::time_point Start;
+
+	SharedSearch(SearchArena & arena, int maxClosedCount) : Open(arena.Open), Closed(arena.Shared), MaxClosedCount(maxClosedCount), Busy(0), Fast(false), TwoClosed(0), ThreeClosed(0), Interrupted(0), OpenLockWaits(0), Start(chrono::steady_clock::now()) {}
+};
+
+//Child state of an expansion, pushed to the open set together with its siblings
+struct PendingNode {
+	shared_ptr<MoveNode> Node;
+	int Helper;
+};
+
+//Move of a fast search expansion that is one of the three best
+struct Candidate {
+	Move Value;
+	int MovesAdded, Helper;
+};
+
+//Keeps the three candidates with the lowest helper in best[0..3), earlier moves win ties
+inline void AddCandidate(Candidate best[], int & bestCount, Move move, int movesAdded, int helper) {
+	int i = bestCount < 3 ? bestCount++ : 3;
+	while (i > 0 && helper < best[i - 1].Helper) {
+		if (i < 3) { best[i] = best[i - 1]; }
+		i--;
+	}
+	if (i < 3) {
+		best[i].Value = move;
+		best[i].MovesAdded = movesAdded;
+		best[i].Helper = helper;
+	}
+}
+
+//Adds the state after move to the closed set and queues it if it has to be evaluated
+inline void AddPending(Solitaire & s, SharedSearch & shared, vector<PendingNode> & pending, shared_ptr<MoveNode> const& parent, Move move, int movesAdded, int helper) {
+	s.MakeMove(move);
+	if (shared.Closed.Add(s.GameState(), movesAdded)) {
+		PendingNode node;
+		node.Node = make_shared<MoveNode>(move, parent);
+		node.Helper = helper;
+		pending.push_back(node);
+	}
+	s.UndoMove();
+}
+
+//Takes states from the open set of shared until the search ends, any number of threads can run it at the same time
+inline void SharedWorker(Solitaire const& base, SharedSearch & shared, SearchLimit const& limit) {
+	Move movesToMake[512];
+	vector<PendingNode> pending;
+	Solitaire s = base;
+	LimitCheck check(limit, shared.Start);
+	while (shared.Closed.Size() < shared.MaxClosedCount && shared.Interrupted.load() == 0) {
+		LockCounted(shared.Mtx, shared.OpenLockWaits);
+		shared.Stats.ClosedCount = shared.Closed.Size();
+		int interrupted = check.Reached(shared.Stats);
+		if (interrupted != 0) {
+			shared.Interrupted.store(interrupted);
+			shared.Mtx.unlock();
+			break;
+		}
+
+		//Check for lowest score length
+		int index = shared.StartMoves;
+		while (index < 512 && shared.Open[index].size() == 0) { index++; }
+
+		//End solver if no more states and no other thread can add any
+		if (index >= 512) {
+			bool done = shared.Busy == 0;
+			shared.Mtx.unlock();
+			if (done) { break; }
+			this_thread::sleep_for(chrono::microseconds(100));
+			continue;
+		}
+
+		//Get next state to evaluate
+		shared_ptr<MoveNode> firstNode = shared.Open[index].back();
+		shared.Open[index].pop_back();
+		shared.Stats.Popped();
+		shared.Busy++;
+		shared.Mtx.unlock();
+
+		firstNode = ReplayNode(s, base, firstNode, movesToMake);
+		int movesTotal = s.MovesMadeNormalizedCount();
+		bool expand = true;
+
+		//Check for best solution to foundations
+		if (s.FoundationCount() > shared.MaxFoundationCount || (s.FoundationCount() == shared.MaxFoundationCount && shared.BestSolutionMoveCount > movesTotal)) {
+			LockCounted(shared.Mtx, shared.OpenLockWaits);
+			if (s.FoundationCount() > shared.MaxFoundationCount || (s.FoundationCount() == shared.MaxFoundationCount && shared.BestSolutionMoveCount > movesTotal)) {
+				shared.BestSolutionMoveCount = movesTotal;
+				shared.MaxFoundationCount = s.FoundationCount();
+				SaveSolution(s, shared.BestSolution);
+			}
+			shared.Mtx.unlock();
+		} else if (shared.MaxFoundationCount == 52) {
+			//Dont check state if above or equal to current best solution
+			expand = s.MinimumMovesLeft() + movesTotal < shared.BestSolutionMoveCount;
+		}
+
+		//Make available moves and collect the ones to be evaluated
+		Candidate best[3];
+		int bestCount = 0;
+		int movesAvailableCount = expand ? s.MovesAvailableCount() : 0;
+		for (int i = 0; i < movesAvailableCount; i++) {
+			Move move = s.GetMoveAvailable(i);
+			int movesAdded = s.MovesAdded(move);
+
+			s.MakeMove(move);
+
+			movesAdded += movesTotal;
+			movesAdded += s.MinimumMovesLeft();
+			if (shared.MaxFoundationCount < 52 || movesAdded < shared.BestSolutionMoveCount) {
+				int helper = movesAdded;
+				helper += 52 - s.FoundationCount() + s.RoundCount();
+				if (shared.Fast) {
+					AddCandidate(best, bestCount, move, movesAdded, helper);
+				} else if (shared.Closed.Add(s.GameState(), movesAdded)) {
+					PendingNode node;
+					node.Node = make_shared<MoveNode>(move, firstNode);
+					node.Helper = helper;
+					pending.push_back(node);
+				}
+			}
+
+			s.UndoMove();
+		}
+		for (int i = 0; i < bestCount && best[i].Helper < 512; i++) {
+			if ((i == 1 && shared.Closed.Size() >= shared.TwoClosed) || (i == 2 && shared.Closed.Size() >= shared.ThreeClosed)) { continue; }
+			AddPending(s, shared, pending, firstNode, best[i].Value, best[i].MovesAdded, best[i].Helper);
+		}
+
+		LockCounted(shared.Mtx, shared.OpenLockWaits);
+		for (size_t i = 0; i < pending.size(); i++) {
+			shared.Open[pending[i].Helper].push_back(pending[i].Node);
+			shared.Stats.Pushed();
+		}
+		shared.Busy--;
+		shared.Mtx.unlock();
+		pending.clear();
+	}
+}
+
+//Bytes of the shared closed set per closed state, including its share of the chain heads
+const int SharedBytesPerState = sizeof(ClosedEntry) + sizeof(int);
+
+//Sizes the shared closed set of arena for maxClosedCount states split into stripes, returns the number of states that may be closed
+//A positive memoryBudget limits the closed states to the ones that fit into it and reserves their memory up front
+inline int ResetShared(SearchArena & arena, int maxClosedCount, long long memoryBudget, int stripes) {
+	if (memoryBudget > 0) {
+		long long budgetCount = memoryBudget / SharedBytesPerState;
+		if (budgetCount < maxClosedCount) { maxClosedCount = budgetCount > 0 ? (int)budgetCount : 1; }
+	}
+	int stripePowerOf2 = 0;
+	while ((1 << stripePowerOf2) < stripes && stripePowerOf2 < 16) { stripePowerOf2++; }
+	int perStripe = (maxClosedCount >> stripePowerOf2) + 1;
+	int reserve = memoryBudget > 0 ? perStripe + (perStripe >> 3) : 0;
+	arena.Shared.Reset(stripePowerOf2, ClosedPowerOf2(perStripe), reserve);
+	return maxClosedCount;
+}
+
+//Prepares a shared search from the current state of s in arena, s must have moves available
+inline unique_ptr<SharedSearch> StartShared(Solitaire & s, int maxClosedCount, long long memoryBudget, int stripes, SearchArena & arena) {
+	arena.ClearOpen();
+	maxClosedCount = ResetShared(arena, maxClosedCount, memoryBudget, stripes);
+	unique_ptr<SharedSearch> shared(new SharedSearch(arena, maxClosedCount));
+	shared->MaxFoundationCount = s.FoundationCount();
+	shared->BestSolutionMoveCount = 512;
+	shared->BestSolution[s.MovesMadeCount()].Count = 255;
+	shared->StartMoves = s.MinimumMovesLeft() + s.MovesMadeNormalizedCount();
+	shared->Open[shared->StartMoves].push_back(NULL);
+	shared->Stats.Pushed();
+	return shared;
+}
+
+//Completes the statistics of a shared search once all threads left it and restores its best solution from root to s, returns the result
+inline int FinishShared(Solitaire & s, Solitaire const& root, SharedSearch & shared, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	int closedCount = shared.Closed.Size();
+	int maxFoundationCount = shared.MaxFoundationCount;
+	int interrupted = shared.Interrupted.load();
+	stats = shared.Stats;
+	stats.Finish(shared.Closed);
+	stats.ClosedLockWaits = shared.Closed.LockWaits.load();
+	stats.OpenLockWaits = shared.OpenLockWaits.load();
+	stats.Elapsed = LimitCheck(limit, shared.Start).Elapsed();
+	arena.ClearOpen();
+	RestoreSolution(s, root, shared.BestSolution);
+	if (shared.Fast) {
+		if (interrupted != 0 && maxFoundationCount < 52) { return interrupted; }
+		return maxFoundationCount == 52 ? SolvedMayNotBeMinimal : CouldNotComplete;
+	}
+	if (interrupted != 0) { return maxFoundationCount == 52 ? SolvedMayNotBeMinimal : interrupted; }
+	return closedCount >= shared.MaxClosedCount ? (maxFoundationCount == 52 ? SolvedMayNotBeMinimal : CouldNotComplete) : (maxFoundationCount == 52 ? SolvedMinimal : Impossible);
+}
+
+inline int SearchMinimalMultithreaded(Solitaire & s, int numThreads, int maxClosedCount, long long memoryBudget, int stripes, SearchArena & arena, SearchLimit const& limit, SearchStats & stats) {
+	s.MakeAutoMoves();
+	if (s.MovesAvailableCount() == 0) { return s.FoundationCount() == 52 ? SolvedMinimal : Impossible; }
+
+	unique_ptr<SharedSearch> shared = StartShared(s, maxClosedCount, memoryBudget, stripes, arena);
+	Solitaire root = s;
+
+	vector<thread> threads;
+	for (int i = 0; i < numThreads; i++) {
+		threads.push_back(thread(SharedWorker, cref(root), ref(*shared), cref(limit)));
+	}
+	for (int i = 0; i < numThreads; i++) {
+		threads[i].join();
+	}
+	return FinishShared(s, root, *shared, arena, limit, stats);
+}
+
+//Solves the Shuffle1 deals of seeds[0..count), or the valid deals of deals[0..count * DealSize) if deals is not NULL,
+//on numThreads threads, each with its own copy of base
+inline void SolveBatch(Solitaire const& base, int const * seeds, unsigned char const * deals, int count, int drawCount, int mode, int maxClosedCount, int twoShift, int threeShift, int numThreads,
+	signed char * results, unsigned short * moveCounts, unsigned short * normalizedCounts, int * closedCounts) {
+	atomic<int> next(0);
+	SearchLimit limit;
+	auto run = [&]() {
+		Solitaire s = base;
+		SearchArena arena;
+		SearchStats stats;
+		int i;
+		while ((i = next++) < count) {
+			if (deals != NULL) {
+				SetDeal(s, deals + i * DealSize);
+			} else {
+				s.Shuffle1(seeds[i]);
+			}
+			s.ResetGame(drawCount);
+			stats = SearchStats();
+			int result = mode == ModeMinimal ? SearchMinimal(s, maxClosedCount, arena, limit, stats) : SearchFast(s, maxClosedCount, twoShift, threeShift, arena, limit, stats);
+			results[i] = (signed char)result;
+			moveCounts[i] = (unsigned short)s.MovesMadeCount();
+			normalizedCounts[i] = (unsigned short)s.MovesMadeNormalizedCount();
+			closedCounts[i] = stats.ClosedCount;
+		}
+	};
+
+	if (numThreads > count) { numThreads = count; }
+	if (numThreads <= 1) {
+		run();
+		return;
+	}
+	vector<thread> threads;
+	for (int i = 0; i < numThreads; i++) {
+		threads.push_back(thread(run));
+	}
+	for (int i = 0; i < numThreads; i++) {
+		threads[i].join();
+	}
+}
+
+//Result of one deal of a SolveEngine, Moves holds 4 bytes per move like the moves buffer of the wrapper
+struct EngineResult {
+	int Index, Result, MoveCount, NormalizedCount, ClosedCount, Threads;
+	double Elapsed;
+	string Moves;
+};
+
+//A deal that is searched by one or more threads of a SolveEngine
+struct EngineJob {
+	int Index;
+	Solitaire Root;
+	unique_ptr<SearchArena> Arena;
+	unique_ptr<SharedSearch> Search;
+	int Threads, MaxThreads;
+	chrono::steady_clock::time_point Start;
+};
+
+//Solves the Shuffle1 deals of many seeds on a fixed number of threads and reports each deal as soon as it is finished
+//Every deal starts on a single thread. A thread without a new deal to start joins the deal with the fewest threads among the ones
+//running for at least stealAfter seconds and takes states from its open set, so long searches get the threads of finished ones
+class SolveEngine {
+private:
+	Solitaire base;
+	vector<int> seeds;
+	int drawCount, mode, maxClosedCount, twoShift, threeShift, numThreads, stripes;
+	chrono::steady_clock::duration stealAfter;
+	SearchLimit limit;
+	mutex mtx;
+	condition_variable changed;
+	int next, running;
+	vector<shared_ptr<EngineJob>> jobs;
+	vector<unique_ptr<SearchArena>> arenas;
+	deque<EngineResult> results;
+	vector<thread> threads;
+
+	//Returns the running deal idle threads should join or NULL, mtx held
+	shared_ptr<EngineJob> Steal() {
+		chrono::steady_clock::time_point now = chrono::steady_clock::now();
+		shared_ptr<EngineJob> best;
+		for (size_t i = 0; i < jobs.size(); i++) {
+			EngineJob & job = *jobs[i];
+			if (now - job.Start < stealAfter) { continue; }
+			if (best == NULL || job.Threads < best->Threads) { best = jobs[i]; }
+		}
+		return best;
+	}
+
+	static void Pack(Solitaire & s, EngineResult & result) {
+		result.MoveCount = s.MovesMadeCount();
+		result.NormalizedCount = s.MovesMadeNormalizedCount();
+		result.Moves.resize(result.MoveCount * 4);
+		for (int i = 0; i < result.MoveCount; i++) {
+			Move move = s[i];
+			result.Moves[i * 4] = (char)move.From;
+			result.Moves[i * 4 + 1] = (char)move.To;
+			result.Moves[i * 4 + 2] = (char)move.Count;
+			result.Moves[i * 4 + 3] = (char)move.Extra;
+		}
+	}
+
+	//Deals seeds[index] and prepares its search, returns NULL if it needs no search
+	shared_ptr<EngineJob> StartJob(int index, unique_ptr<SearchArena> arena) {
+		shared_ptr<EngineJob> job = make_shared<EngineJob>();
+		job->Index = index;
+		job->Start = chrono::steady_clock::now();
+		Solitaire & s = job->Root;
+		s = base;
+		s.Shuffle1(seeds[index]);
+		s.ResetGame(drawCount);
+		s.MakeAutoMoves();
+		if (s.MovesAvailableCount() == 0) {
+			EngineResult result;
+			result.Index = index;
+			result.Result = s.FoundationCount() == 52 ? SolvedMinimal : Impossible;
+			result.ClosedCount = 0;
+			result.Threads = 1;
+			result.Elapsed = 0;
+			Pack(s, result);
+			lock_guard<mutex> lock(mtx);
+			arenas.push_back(move(arena));
+			results.push_back(result);
+			changed.notify_all();
+			return NULL;
+		}
+		job->Search = StartShared(s, maxClosedCount, 0, stripes, *arena);
+		job->Search->Fast = mode != ModeMinimal;
+		job->Search->TwoClosed = maxClosedCount >> twoShift;
+		job->Search->ThreeClosed = maxClosedCount >> threeShift;
+		job->Arena = move(arena);
+		job->Threads = 1;
+		job->MaxThreads = 1;
+		return job;
+	}
+
+	//Reports a deal once its last thread left it, mtx held
+	void FinishJob(shared_ptr<EngineJob> const& job) {
+		Solitaire s;
+		SearchStats stats;
+		EngineResult result;
+		result.Index = job->Index;
+		result.Result = FinishShared(s, job->Root, *job->Search, *job->Arena, limit, stats);
+		result.ClosedCount = stats.ClosedCount;
+		result.Threads = job->MaxThreads;
+		result.Elapsed = stats.Elapsed;
+		Pack(s, result);
+		job->Search.reset();
+		arenas.push_back(move(job->Arena));
+		jobs.erase(find(jobs.begin(), jobs.end(), job));
+		results.push_back(result);
+	}
+
+	void Run() {
+		while (true) {
+			shared_ptr<EngineJob> job;
+			unique_ptr<SearchArena> arena;
+			int index = -1;
+			{
+				unique_lock<mutex> lock(mtx);
+				while (!limit.Cancelled.load()) {
+					if (next < (int)seeds.size()) {
+						index = next++;
+						break;
+					}
+					job = Steal();
+					if (job != NULL) {
+						job->Threads++;
+						job->MaxThreads = max(job->MaxThreads, job->Threads);
+						break;
+					}
+					if (jobs.empty()) { break; }
+					changed.wait_for(lock, chrono::milliseconds(1));
+				}
+				if (index < 0 && job == NULL) {
+					running--;
+					changed.notify_all();
+					return;
+				}
+				if (index >= 0) {
+					if (arenas.empty()) {
+						arena.reset(new SearchArena());
+					} else {
+						arena = move(arenas.back());
+						arenas.pop_back();
+					}
+				}
+			}
+			if (index >= 0) {
+				job = StartJob(index, move(arena));
+				if (job == NULL) { continue; }
+				lock_guard<mutex> lock(mtx);
+				jobs.push_back(job);
+			}
+			SharedWorker(job->Root, *job->Search, limit);
+			lock_guard<mutex> lock(mtx);
+			if (--job->Threads == 0) {
+				FinishJob(job);
+				changed.notify_all();
+			}
+		}
+	}
+
+public:
+	SolveEngine(Solitaire const& base, int const * seeds, int count, int drawCount, int mode, int maxClosedCount, int twoShift, int threeShift, int numThreads, double stealAfter) :
+		base(base), seeds(seeds, seeds + count), drawCount(drawCount), mode(mode), maxClosedCount(maxClosedCount), twoShift(twoShift), threeShift(threeShift),
+		numThreads(numThreads > 0 ? numThreads : 1), stripes(16 * (numThreads > 0 ? numThreads : 1)),
+		stealAfter(chrono::duration_cast<chrono::steady_clock::duration>(chrono::duration<double>(stealAfter))), next(0), running(0) {}
+	~SolveEngine() {
+		Cancel();
+		Join();
+	}
+	void Start() {
+		running = numThreads;
+		for (int i = 0; i < numThreads; i++) {
+			threads.push_back(thread(&SolveEngine::Run, this));
+		}
+	}
+	//Waits for the next finished deal, returns false once all deals were reported or the engine was cancelled and has stopped
+	bool Next(EngineResult & result) {
+		unique_lock<mutex> lock(mtx);
+		changed.wait(lock, [this]() { return !results.empty() || running == 0; });
+		if (results.empty()) { return false; }
+		result = results.front();
+		results.pop_front();
+		return true;
+	}
+	//Interrupts the running deals, which are reported with SolveCancelled, and skips the deals not started yet
+	void Cancel() { limit.Cancel(); }
+	void Join() {
+		for (size_t i = 0; i < threads.size(); i++) {
+			if (threads[i].joinable()) { threads[i].join(); }
+		}
+	}
+};
+#endif
@@ -0,0 +1,552 @@
+"""
+Provides the SolveServer class, a daemon that serves solved games, solves and
+hints to the processes of a host over a UNIX socket from one shared pool of
+workers, and the SolveClient class that talks to it.
+
+Run the server with ``python -m pyksolve.server PATH``.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from . import solver
+from .cache import SolutionCache
+from .deferred import DeferredSolver
+from .hint import HintCache
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+SOLVED = (solver.SolveResult.SolvedMinimal,
+          solver.SolveResult.SolvedMayNotBeMinimal)
+
+# seed passed to Solitaire.shuffle1 or deal array
+Deal = Union[int, bytes]
+Move = Tuple[int, int, int, int]
+
+_log = logging.getLogger(__name__)
+
+
+def _draw_count(request: Dict[str, Any]) -> int:
+    draw_count = request.get('draw_count', 1)
+    if not isinstance(draw_count, int) or not 0 < draw_count < 25:
+        raise ValueError('Expected draw_count to lie between 1 and 24.')
+    return draw_count
+
+
+def _seed(request: Dict[str, Any]) -> int:
+    seed = request['seed']
+    if not isinstance(seed, int) or not 0 <= seed < 2 ** 31:
+        raise ValueError('Expected seed to lie between 0 and 2 ** 31 - 1.')
+    return seed
+
+
+def _deal(request: Dict[str, Any]) -> bytes:
+    """Deal array of a request, given as `seed` or hex encoded `deal`."""
+    if 'seed' in request:
+        return bytes(solver.shuffle_deals([_seed(request)]))
+    return bytes.fromhex(request['deal'])
+
+
+def _moves(request: Dict[str, Any]) -> bytes:
+    moves = bytes.fromhex(request.get('moves', ''))
+    if len(moves) % solver.MOVE_SIZE:
+        raise ValueError(f'Expected a multiple of {solver.MOVE_SIZE} bytes '
+                         f'of moves.')
+    return moves
+
+
+class SolveServer:
+    """
+    Serves the processes of a host over a UNIX socket, so they share one
+    :class:`pyksolve.deferred.DeferredSolver` with its buckets of solved
+    games, one pool of `solve_threads` solvers, one
+    :class:`pyksolve.cache.SolutionCache` and one
+    :class:`pyksolve.hint.HintCache` instead of running their own.
+
+    Identical requests that arrive while a search for them runs wait for that
+    search instead of starting another. Solves are keyed by the canonical
+    deal (see :func:`pyksolve.solver.canonical_deal`), so deals that only
+    differ by the names of the suits share one search.
+
+    The protocol is one JSON object per line in each direction. A request
+    holds an `op` and an optional `id` that is copied into its response. The
+    requests of a connection are served concurrently, their responses may
+    arrive in any order. Bytes are hex encoded, a deal is given either as the
+    `seed` passed to :meth:`pyksolve.solver.Solitaire.shuffle1` or as `deal`
+    in the format of :meth:`pyksolve.solver.Solitaire.deal_array`. A failed
+    request is answered with an `error` message. The ops are:
+
+    - `get_solved` with `draw_count` -> `seed`, `diagram` and `moves`, see
+      :meth:`pyksolve.deferred.DeferredSolver.get_solved`.
+    - `get_solved_packed` with `draw_count` -> `seed` and packed `moves`.
+    - `solve` with a deal, `draw_count`, `minimal` and `max_closed`, at most
+      the one of the server -> `result` (a
+      :class:`pyksolve.solver.SolveResult` value) and packed `moves`.
+    - `hint` with a deal, `draw_count` and the packed `moves` played so far
+      -> `move` or `null`, see :meth:`pyksolve.hint.HintCache.hint`.
+    - `metrics` -> see :meth:`SolveServer.metrics`.
+
+    Args:
+        path: ``str`` -> path of the UNIX socket.
+        draw_counts: ``Tuple[int, ...]`` -> draw counts of the buckets.
+        cache_num: ``int`` -> solved games per bucket.
+        threads: ``int`` -> workers that fill the buckets.
+        solve_threads: ``int`` -> workers that run solve requests.
+        max_closed: ``int`` -> default and max max_closed_count of a search.
+        store: ``Optional[str]`` -> path of a
+            :class:`pyksolve.store.SolvedStore` of the buckets.
+        cache_entries: ``int`` -> deals kept in the solution cache.
+        hint_deals: ``int`` -> deals kept in the hint cache.
+        mode: ``int`` -> file mode of the socket. Defaults to access by the
+            owner only.
+        hint_threads: ``int`` -> workers that run hint requests, separate
+            from the solve workers so hint searches don't hold up solves.
+        hint_timeout: ``Optional[float]`` -> maximum seconds of a hint
+            search.
+    """
+    def __init__(self, path: str, draw_counts: Tuple[int, ...] = (1, 3),
+                 cache_num: int = 5, threads: int = 3, solve_threads: int = 2,
+                 max_closed: int = 1_000_000, store: Optional[str] = None,
+                 cache_entries: int = 65536, hint_deals: int = 1024,
+                 mode: int = 0o600, hint_threads: int = 1,
+                 hint_timeout: Optional[float] = 1.0) -> None:
+        if solve_threads < 1:
+            raise ValueError('Expected positive value for argument '
+                             'solve_threads.')
+        if hint_threads < 1:
+            raise ValueError('Expected positive value for argument '
+                             'hint_threads.')
+        if max_closed < 1:
+            raise ValueError('Expected positive value for argument max_closed.')
+        self._path = path
+        self._mode = mode
+        self._deferred_args = dict(draw_counts=tuple(draw_counts),
+                                   cache_num=cache_num, threads=threads,
+                                   max_closed=max_closed, store=store)
+        self._deferred: Optional[DeferredSolver] = None
+        self._max_closed = max_closed
+        self._solution_cache = SolutionCache(cache_entries)
+        self._hints = HintCache(max_deals=hint_deals, max_closed=max_closed,
+                                timeout=hint_timeout)
+        self._executor = concurrent.futures.ThreadPoolExecutor(solve_threads)
+        self._hint_executor = concurrent.futures.ThreadPoolExecutor(
+            hint_threads)
+        self._stopping = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._solvers: List[solver.Solitaire] = []
+        self._pending: Dict[tuple, asyncio.Future] = {}
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._metrics = {'requests': 0, 'errors': 0, 'coalesced': 0,
+                         'solves': 0, 'hints': 0}
+
+    async def start(self) -> None:
+        """Start the workers and listen on the socket."""
+        if self._server is not None:
+            raise RuntimeError('Server already started.')
+        self._deferred = DeferredSolver(solution_cache=self._solution_cache,
+                                        **self._deferred_args)
+        self._server = await asyncio.start_unix_server(self._handle,
+                                                       path=self._path)
+        os.chmod(self._path, self._mode)
+
+    async def stop(self) -> None:
+        """
+        Stop listening, close all connections, cancel running searches, skip
+        queued ones and stop the workers.
+        """
+        if self._server is None:
+            return
+        self._stopping = True
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        with self._lock:
+            for sol in self._solvers:
+                sol.cancel()
+        self._hints.cancel()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._deferred.stop)
+        await loop.run_in_executor(None, self._executor.shutdown)
+        await loop.run_in_executor(None, self._hint_executor.shutdown)
+        await self._server.wait_closed()
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Counts of the server and its components since start.
+
+        Returns:
+            ``Dict[str, Any]`` -> the `server` counts of `requests`, `errors`,
+            `solves` and `hints` and the number of requests `coalesced` into
+            a running search, the `workers` and `policy` metrics of the
+            :class:`pyksolve.deferred.DeferredSolver`, the `solution_cache`
+            and the `hints` metrics.
+        """
+        return {'server': dict(self._metrics),
+                'workers': self._deferred.metrics(),
+                'policy': self._deferred.policy.metrics(),
+                'solution_cache': self._solution_cache.metrics(),
+                'hints': self._hints.metrics()}
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter) -> None:
+        """Serve the requests of one connection until it is closed."""
+        self._writers.add(writer)
+        tasks: Set[asyncio.Future] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError):  # Reset or line too long
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _respond(self, line: bytes,
+                       writer: asyncio.StreamWriter) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Expected a JSON object.')
+            request_id = request.get('id')
+            response = await self._dispatch(request)
+        except KeyError as err:
+            self._metrics['errors'] += 1
+            response = {'error': f'Missing field {err}.'}
+        except (ValueError, TypeError) as err:
+            self._metrics['errors'] += 1
+            response = {'error': str(err)}
+        except Exception as err:  # Still answer, the client waits for it
+            _log.exception('Failed to serve request %r.', line)
+            self._metrics['errors'] += 1
+            response = {'error': f'Internal error {err!r}.'}
+        if request_id is not None:
+            response['id'] = request_id
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get('op')
+        self._metrics['requests'] += 1
+        if op == 'get_solved':
+            seed, diagram, moves = await self._deferred.get_solved_async(
+                request['draw_count'])
+            return {'seed': seed, 'diagram': diagram, 'moves': moves}
+        if op == 'get_solved_packed':
+            seed, moves = await self._deferred.get_solved_packed_async(
+                request['draw_count'])
+            return {'seed': seed, 'moves': moves.hex()}
+        if op == 'solve':
+            self._metrics['solves'] += 1
+            draw_count = _draw_count(request)
+            minimal = bool(request.get('minimal', False))
+            max_closed = request.get('max_closed') or self._max_closed
+            if not isinstance(max_closed, int) or max_closed < 1:
+                raise ValueError('Expected positive max_closed.')
+            max_closed = min(max_closed, self._max_closed)
+            canonical, perm = solver.canonical_deal(_deal(request))
+            result, moves = await self._coalesce(
+                self._executor, ('solve', canonical, draw_count, minimal, max_closed),
+                self._solve, canonical, draw_count, minimal, max_closed)
+            return {'result': result,
+                    'moves': solver.permute_moves(moves, perm,
+                                                  inverse=True).hex()}
+        if op == 'hint':
+            self._metrics['hints'] += 1
+            draw_count = _draw_count(request)
+            if 'seed' in request:
+                deal = _seed(request)
+            else:
+                deal = solver.format_deals(_deal(request)).decode().strip()
+            moves = _moves(request)
+            move = await self._coalesce(self._hint_executor,
+                                        ('hint', deal, draw_count, moves),
+                                        self._hint, deal, draw_count, moves)
+            return {'move': None if move is None else list(move)}
+        if op == 'metrics':
+            return self.metrics()
+        raise ValueError(f'Unknown op {op!r}.')
+
+    async def _coalesce(self, executor: concurrent.futures.Executor,
+                        key: tuple, func: Callable, *args) -> Any:
+        """Run `func` in `executor` or wait for the running call of `key`."""
+        fut = self._pending.get(key)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = loop.run_in_executor(executor, func, *args)
+            self._pending[key] = fut
+            fut.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self._metrics['coalesced'] += 1
+        return await asyncio.shield(fut)
+
+    def _solve(self, deal: bytes, draw_count: int, minimal: bool,
+               max_closed: int) -> Tuple[int, bytes]:
+        """Solve a deal with the solver of the pool thread."""
+        if self._stopping:
+            return solver.SolveResult.Cancelled.value, b''
+        sol = getattr(self._local, 'sol', None)
+        if sol is None:
+            sol = self._local.sol = solver.Solitaire()
+            sol.solution_cache = self._solution_cache
+            with self._lock:
+                self._solvers.append(sol)
+        sol.load_deal_array(deal)
+        sol.reset_game(draw_count)
+        if minimal:
+            res = sol.solve_minimal(max_closed_count=max_closed)
+        else:
+            res = sol.solve_fast(max_closed_count=max_closed)
+        return res.value, sol.moves_buffer() if res in SOLVED else b''
+
+    def _hint(self, deal: Union[int, str], draw_count: int,
+              moves: bytes) -> Optional[Move]:
+        """Hint of the hint cache, `None` once stopping."""
+        if self._stopping:
+            return None
+        return self._hints.hint(deal, draw_count, moves)
+
+
+class SolveClient:
+    """
+    Client of a :class:`SolveServer` with the methods of
+    :class:`pyksolve.deferred.DeferredSolver` to get solved games, plus
+    :meth:`SolveClient.solve` and :meth:`SolveClient.hint`. Requests of
+    different threads are sent one after another over one connection. Errors
+    reported by the server are raised as `ValueError`.
+
+    Args:
+        path: ``str`` -> path of the UNIX socket of the server.
+        timeout: ``Optional[float]`` -> seconds to wait for a response.
+    """
+    def __init__(self, path: str, timeout: Optional[float] = None) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._file = self._sock.makefile('rwb')
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def __enter__(self) -> 'SolveClient':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _call(self, op: str, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self._next_id += 1
+            kwargs.update(op=op, id=self._next_id)
+            self._file.write(json.dumps(kwargs).encode('utf-8') + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError('Server closed the connection.')
+        response = json.loads(line)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response
+
+    @staticmethod
+    def _deal(deal: Deal) -> Dict[str, Any]:
+        if isinstance(deal, int):
+            return {'seed': deal}
+        return {'deal': bytes(deal).hex()}
+
+    def get_solved(self, draw_count: int) -> Tuple[int, str, str]:
+        """
+        Get a solved game with the specified draw count, see
+        :meth:`pyksolve.deferred.DeferredSolver.get_solved`.
+
+        Args:
+            draw_count: ``int`` -> draw count the server caches games for.
+
+        Returns:
+            Tuple of (seed, game_diagram before solved, moves_made).
+        """
+        response = self._call('get_solved', draw_count=draw_count)
+        return response['seed'], response['diagram'], response['moves']
+
+    def get_solved_packed(self, draw_count: int) -> Tuple[int, bytes]:
+        """
+        Get a solved game with the specified draw count, see
+        :meth:`pyksolve.deferred.DeferredSolver.get_solved_packed`.
+
+        Args:
+            draw_count: ``int`` -> draw count the server caches games for.
+
+        Returns:
+            Tuple of (seed, packed moves).
+        """
+        response = self._call('get_solved_packed', draw_count=draw_count)
+        return response['seed'], bytes.fromhex(response['moves'])
+
+    def solve(self, deal: Deal, draw_count: int = 1, minimal: bool = False,
+              max_closed: Optional[int] = None
+              ) -> Tuple[solver.SolveResult, bytes]:
+        """
+        Solve a deal on the server.
+
+        Args:
+            deal: ``Union[int, bytes]`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1` or deal in the
+                format of :meth:`pyksolve.solver.Solitaire.deal_array`.
+            draw_count: ``int`` -> the draw count.
+            minimal: ``bool`` -> search a minimal solution.
+            max_closed: ``Optional[int]`` -> max_closed_count of the search.
+                Defaults to and is capped by the one of the server.
+
+        Returns:
+            ``Tuple[SolveResult, bytes]`` -> the result and the packed moves
+            of the solution, empty if none was found.
+        """
+        response = self._call('solve', draw_count=draw_count,
+                              minimal=minimal, max_closed=max_closed,
+                              **self._deal(deal))
+        return (solver.SolveResult(response['result']),
+                bytes.fromhex(response['moves']))
+
+    def hint(self, deal: Deal, draw_count: int,
+             moves: bytes = b'') -> Optional[Move]:
+        """
+        Next move of a solution from the current position, see
+        :meth:`pyksolve.hint.HintCache.hint`.
+
+        Args:
+            deal: ``Union[int, bytes]`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1` or deal in the
+                format of :meth:`pyksolve.solver.Solitaire.deal_array`.
+            draw_count: ``int`` -> the draw count.
+            moves: ``bytes-like`` -> packed moves played so far.
+
+        Returns:
+            ``Optional[Tuple[int, int, int, int]]`` -> the next move or `None`.
+        """
+        response = self._call('hint', draw_count=draw_count,
+                              moves=bytes(moves).hex(), **self._deal(deal))
+        move = response['move']
+        return None if move is None else tuple(move)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Metrics of the server, see :meth:`SolveServer.metrics`.
+
+        Returns:
+            ``Dict[str, Any]``
+        """
+        response = self._call('metrics')
+        del response['id']
+        return response
+
+    def close(self) -> None:
+        """Close the connection, the server keeps running."""
+        self._file.close()
+        self._sock.close()
+
+    def stop(self) -> None:
+        """Same as :meth:`SolveClient.close`."""
+        self.close()
+
+
+async def _serve(server: SolveServer) -> None:
+    """Run `server` until SIGINT or SIGTERM."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await server.start()
+    try:
+        await stop.wait()
+    finally:
+        await server.stop()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog='python -m pyksolve.server',
+        description='Serve solved games, solves and hints to the processes '
+                    'of this host over a UNIX socket.')
+    parser.add_argument('path', help='path of the UNIX socket')
+    parser.add_argument('--draw-counts', type=int, nargs='+', default=[1, 3],
+                        help='draw counts of the solved games (default: 1 3)')
+    parser.add_argument('--cache-num', type=int, default=5,
+                        help='solved games per draw count (default: 5)')
+    parser.add_argument('--threads', type=int, default=3,
+                        help='workers solving games (default: 3)')
+    parser.add_argument('--solve-threads', type=int, default=2,
+                        help='workers for solve requests (default: 2)')
+    parser.add_argument('--max-closed', type=int, default=1_000_000,
+                        help='max_closed_count per search (default: 1000000)')
+    parser.add_argument('--store', help='solved store of the solved games')
+    parser.add_argument('--cache-entries', type=int, default=65536,
+                        help='deals in the solution cache (default: 65536)')
+    parser.add_argument('--hint-deals', type=int, default=1024,
+                        help='deals in the hint cache (default: 1024)')
+    parser.add_argument('--mode', type=lambda value: int(value, 8),
+                        default=0o600,
+                        help='octal file mode of the socket (default: 600)')
+    parser.add_argument('--hint-threads', type=int, default=1,
+                        help='workers for hint requests (default: 1)')
+    parser.add_argument('--hint-timeout', type=float, default=1.0,
+                        help='seconds per hint search (default: 1.0)')
+    args = parser.parse_args(argv)
+    server = SolveServer(args.path, tuple(args.draw_counts), args.cache_num,
+                         args.threads, args.solve_threads, args.max_closed,
+                         args.store, args.cache_entries, args.hint_deals,
+                         args.mode, args.hint_threads, args.hint_timeout)
+    asyncio.run(_serve(server))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
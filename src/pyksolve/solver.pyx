@@ -4,7 +4,14 @@
 Provides the wrapped main function of "KlondikeSolver.cpp".
 """
 
+import array
+import asyncio
+from collections import namedtuple
+import concurrent.futures
 from enum import Enum
+import os
+import threading
+import time
 
 from cython.operator cimport dereference as deref
 from libcpp.memory cimport unique_ptr
@@ -13,6 +20,43 @@ from libcpp.string cimport string
 from .cppsolitaire cimport SolveResult as _SolveResult
 from .cppsolitaire cimport Solitaire as _Solitaire
 from .cppsolitaire cimport Move as _Move
+from .cppsearch cimport ClosedCompact as _ClosedCompact
+from .cppsearch cimport ClosedCompactConservative as _ClosedCompactConservative
+from .cppsearch cimport ClosedExact as _ClosedExact
+from .cppsearch cimport SearchArena as _SearchArena
+from .cppsearch cimport SearchFast as _SearchFast
+from .cppsearch cimport SearchLimit as _SearchLimit
+from .cppsearch cimport SearchMinimal as _SearchMinimal
+from .cppsearch cimport (
+    SearchMinimalMultithreaded as _SearchMinimalMultithreaded)
+from .cppsearch cimport SearchStats as _SearchStats
+from .cppsearch cimport ProgressCallback as _ProgressCallback
+from .cppsearch cimport SolveBatch as _SolveBatch
+from .cppsearch cimport EngineResult as _EngineResult
+from .cppsearch cimport SolveEngine as _SolveEngine
+from .cppdeal cimport CanonicalDeal as _CanonicalDeal
+from .cppdeal cimport DealHashes as _DealHashes
+from .cppdeal cimport DealPysol as _DealPysol
+from .cppdeal cimport DealSize as _DealSize
+from .cppdeal cimport DealSolitaire as _DealSolitaire
+from .cppdeal cimport FormatDeal as _FormatDeal
+from .cppdeal cimport GetDeal as _GetDeal
+from .cppdeal cimport IsDealtPosition as _IsDealtPosition
+from .cppdeal cimport IsValidDeal as _IsValidDeal
+from .cppdeal cimport MaxMovesMade as _MaxMovesMade
+from .cppdeal cimport MoveSize as _MoveSize
+from .cppdeal cimport ParseDeals as _ParseDeals
+from .cppdeal cimport RecordSize as _RecordSize
+from .cppdeal cimport SetDeal as _SetDeal
+from .cppdeal cimport ShuffleDeals as _ShuffleDeals
+from .cppdeal cimport SuitPermutations as _SuitPermutations
+from .cppstate cimport GetState as _GetState
+from .cppstate cimport SetState as _SetState
+from .cppstate cimport StateEmpty as _StateEmpty
+from .cppstate cimport StateFaceUp as _StateFaceUp
+from .cppstate cimport StateHeaderSize as _StateHeaderSize
+from .cppstate cimport StatePileSlots as _StatePileSlots
+from .cppstate cimport StateSize as _StateSize
 
 
 __author__ = 'Tiziano Bettio'
@@ -41,23 +85,865 @@ SOFTWARE."""
 
 class SolveResult(Enum):
     """
-    Solve result enum.
+    Solve result enum. `TimedOut` and `Cancelled` are returned by solves that
+    were interrupted before finding any solution.
     """
+    Cancelled = -4
+    TimedOut = -3
     CouldNotComplete = -2
     SolvedMayNotBeMinimal = -1
     Impossible = 0
     SolvedMinimal = 1
 
 
+class SolveMode(Enum):
+    """
+    Solve mode enum, selects which solve method :func:`solve_batch` uses.
+    """
+    Fast = 0
+    Minimal = 1
+
+
+class ClosedMode(Enum):
+    """
+    Closed set enum, selects how :meth:`Solitaire.solve_fast` and
+    :meth:`Solitaire.solve_minimal` remember the game states they evaluated,
+    see :attr:`Solitaire.closed_mode`.
+
+    `Exact` stores each state in a hash map entry of 36 bytes. `Compact` only
+    stores a 54 bit fingerprint of each state together with its move count in
+    8 bytes, 10 to 15 bytes per state with the free slots of the table, so a
+    larger `max_closed_count` fits in the same memory. Two states with the
+    same fingerprint are taken for the same, which skips the second one, with
+    a chance of about `closed_count ** 2 / 2 ** 55` per search.
+    `CompactConservative` stores the same, but doesn't report results such a
+    collision could have caused: `Impossible` is returned as
+    `CouldNotComplete` and `SolvedMinimal` as `SolvedMayNotBeMinimal`.
+    Solutions found are valid in all modes.
+    """
+    Exact = _ClosedExact
+    Compact = _ClosedCompact
+    CompactConservative = _ClosedCompactConservative
+
+
+MOVE_SIZE = _MoveSize
+"""``int`` -> Number of bytes per move in the packed move format."""
+
+
+STATE_SIZE = _StateSize
+"""
+``int`` -> Number of bytes of a state array, see
+:meth:`Solitaire.state_array`.
+"""
+STATE_HEADER_SIZE = _StateHeaderSize
+"""``int`` -> Offset of the first pile in a state array."""
+STATE_PILE_SLOTS = _StatePileSlots
+"""``int`` -> Number of card slots per pile in a state array."""
+STATE_FACE_UP = _StateFaceUp
+"""``int`` -> Flag of a face up card in a state array."""
+STATE_EMPTY = _StateEmpty
+"""``int`` -> Value of an unused card slot in a state array."""
+DEAL_SIZE = _DealSize
+"""``int`` -> Number of bytes of a deal, see :meth:`Solitaire.deal_array`."""
+DEAL_FORMATS = ('solitaire', 'pysol')
+"""``Tuple[str, str]`` -> Text formats of :func:`parse_deals`."""
+SUIT_PERMUTATIONS = tuple(tuple(_SuitPermutations[p][i] for i in range(4))
+                          for p in range(8))
+"""
+``Tuple[Tuple[int, int, int, int], ...]`` -> The permutations of the suits
+(clubs, diamonds, spades, hearts) that keep the rules, i.e. that map the red
+suits to the red or to the black suits together. Entry `i` of a permutation
+is the suit that suit `i` is mapped to.
+"""
+
+
+def encode_moves(moves):
+    """
+    Pack moves into the format returned by :meth:`Solitaire.moves_buffer`.
+
+    Each move is stored as :data:`MOVE_SIZE` unsigned bytes: source pile,
+    destination pile, card count and extra. Piles are numbered 0 (waste),
+    1-7 (tableau), 8 (stock) and 9-12 (foundations clubs, diamonds, spades,
+    hearts). Extra is the number of cards to draw for moves from the waste
+    and a flag whether the source pile gets flipped otherwise.
+
+    Args:
+        moves: ``Iterable[Tuple[int, int, int, int]]`` -> (source,
+            destination, count, extra) for each move.
+
+    Returns:
+        ``bytes``
+    """
+    buf = bytearray()
+    for move in moves:
+        if len(move) != MOVE_SIZE:
+            raise ValueError(f'Expected {MOVE_SIZE} values per move.')
+        buf.extend(move)
+    return bytes(buf)
+
+
+def decode_moves(buffer):
+    """
+    Unpack moves in the format returned by :meth:`Solitaire.moves_buffer`,
+    see :func:`encode_moves`.
+
+    Args:
+        buffer: ``bytes-like`` -> packed moves.
+
+    Returns:
+        ``List[Tuple[int, int, int, int]]`` -> (source, destination, count,
+        extra) for each move.
+    """
+    data = bytes(buffer)
+    if len(data) % MOVE_SIZE:
+        raise ValueError(f'Expected a multiple of {MOVE_SIZE} bytes.')
+    return [tuple(data[i:i + MOVE_SIZE])
+            for i in range(0, len(data), MOVE_SIZE)]
+
+
+def shuffle_deals(seeds, method=1, out=None, num_threads=1):
+    """
+    Generate the card sets of :meth:`Solitaire.shuffle1` or
+    :meth:`Solitaire.shuffle2` for many seeds at once, bit-identical to
+    :meth:`Solitaire.deal_array` after shuffling, without a :class:`Solitaire`
+    and with the GIL released.
+
+    Args:
+        seeds: ``Iterable[int]`` -> the seeds. Unlike for
+            :meth:`Solitaire.shuffle1`, `-1` is not allowed.
+        method: ``int`` -> `1` for `Shuffle1` or `2` for `Shuffle2`.
+        out: ``Optional[writable bytes-like]`` -> buffer of at least
+            ``len(seeds) * DEAL_SIZE`` bytes to write to, e.g. a
+            ``numpy.uint8`` array of shape `(len(seeds), DEAL_SIZE)`,
+            instead of allocating a new array.
+        num_threads: ``Optional[int]`` -> Number of threads to use. `None`
+            uses the number of CPUs.
+
+    Returns:
+        ``array.array('B')`` or `out` -> :data:`DEAL_SIZE` bytes per seed.
+    """
+    if method not in (1, 2):
+        raise ValueError('Expected method to be 1 or 2.')
+    seed_arr = array.array('i', seeds)
+    if method == 1 and -1 in seed_arr:
+        raise ValueError('Expected seeds other than -1.')
+    cdef int count = len(seed_arr)
+    if out is None:
+        out = array.array('B', bytes(count * _DealSize))
+    cdef unsigned char[::1] view = memoryview(out).cast('B')
+    if view.shape[0] < count * _DealSize:
+        raise ValueError(f'Expected a buffer of at least '
+                         f'{count * _DealSize} bytes.')
+    if count == 0:
+        return out
+    cdef int[::1] seed_view = seed_arr
+    cdef int c_method = method
+    cdef int c_threads = num_threads or os.cpu_count() or 1
+    with nogil:
+        _ShuffleDeals(&seed_view[0], count, c_method, &view[0], c_threads)
+    return out
+
+
+def canonical_deal(deal):
+    """
+    Get the canonical form of a deal in the format of
+    :meth:`Solitaire.deal_array`, the smallest of the deals it maps to under
+    :data:`SUIT_PERMUTATIONS`. Deals with the same canonical form are the same
+    game up to the names of the suits, and a solution of one solves the other
+    after renaming the foundations, see :func:`permute_moves`.
+
+    Args:
+        deal: ``bytes-like`` -> :data:`DEAL_SIZE` bytes.
+
+    Returns:
+        ``Tuple[bytes, int]`` -> the canonical deal and the index of the
+        permutation that maps `deal` to it.
+    """
+    cdef const unsigned char[::1] view = memoryview(deal).cast('B')
+    if view.shape[0] != _DealSize or not _IsValidDeal(&view[0]):
+        raise ValueError('Invalid deal.')
+    canonical = bytearray(_DealSize)
+    cdef unsigned char[::1] out = canonical
+    cdef int perm = _CanonicalDeal(&view[0], &out[0])
+    return bytes(canonical), perm
+
+
+def deal_hashes(deals):
+    """
+    Hash deals by their canonical form (see :func:`canonical_deal`), with the
+    GIL released. Deals that differ only by a permutation of
+    :data:`SUIT_PERMUTATIONS` get the same hash.
+
+    Args:
+        deals: ``bytes-like`` -> :data:`DEAL_SIZE` bytes per deal.
+
+    Returns:
+        ``array.array('Q')`` -> a 64 bit hash per deal.
+    """
+    cdef const unsigned char[::1] view = memoryview(deals).cast('B')
+    cdef Py_ssize_t size = view.shape[0]
+    cdef int count = size // _DealSize
+    if size % _DealSize:
+        raise ValueError(f'Expected a multiple of {_DealSize} bytes.')
+    hashes = array.array('Q', bytes(8 * count))
+    if count == 0:
+        return hashes
+    cdef unsigned long long[::1] out = hashes
+    with nogil:
+        _DealHashes(&view[0], count, &out[0])
+    return hashes
+
+
+def permute_moves(moves, perm, inverse=False):
+    """
+    Rename the foundations of packed moves (see :func:`encode_moves`) by a
+    permutation of the suits, so that the solution of a deal solves the deal
+    the permutation maps it to.
+
+    Args:
+        moves: ``bytes-like`` -> packed moves.
+        perm: ``int`` -> index into :data:`SUIT_PERMUTATIONS`.
+        inverse: ``bool`` -> apply the inverse permutation.
+
+    Returns:
+        ``bytes``
+    """
+    suits = SUIT_PERMUTATIONS[perm]
+    table = bytearray(range(256))
+    for suit, mapped in enumerate(suits):
+        if inverse:
+            table[9 + mapped] = 9 + suit
+        else:
+            table[9 + suit] = 9 + mapped
+    buf = bytearray(moves)
+    if len(buf) % MOVE_SIZE:
+        raise ValueError(f'Expected a multiple of {MOVE_SIZE} bytes.')
+    buf[0::MOVE_SIZE] = buf[0::MOVE_SIZE].translate(table)
+    buf[1::MOVE_SIZE] = buf[1::MOVE_SIZE].translate(table)
+    return bytes(buf)
+
+
+cdef int _deal_format(fmt) except -1:
+    if fmt == 'solitaire':
+        return _DealSolitaire
+    if fmt == 'pysol':
+        return _DealPysol
+    raise ValueError(f'Expected fmt to be in {DEAL_FORMATS}.')
+
+
+def parse_deals(data, out, fmt='solitaire', offset=0):
+    """
+    Parse and validate text records of deals into :data:`DEAL_SIZE` bytes
+    each, see :meth:`Solitaire.deal_array`, with the GIL released.
+
+    A `"solitaire"` record holds the 156 digits of
+    :meth:`Solitaire.get_solitaire`, a `"pysol"` record the 8 lines of
+    :meth:`Solitaire.get_pysol`. Records are separated by blanks.
+
+    Args:
+        data: ``bytes-like`` -> the text, e.g. a ``mmap.mmap``.
+        out: ``writable bytes-like`` -> buffer that receives up to
+            ``len(out) // DEAL_SIZE`` deals.
+        fmt: ``str`` -> one of :data:`DEAL_FORMATS`.
+        offset: ``int`` -> position in `data` to start at.
+
+    Returns:
+        ``Tuple[int, int]`` -> number of deals written to `out` and the
+        offset to continue at. Parsing stops early at the end of `data` or
+        before a record that is not a valid deal.
+
+    Raises:
+        ValueError: if the record at `offset` is not a valid deal, with the
+            offset of the record as second argument.
+    """
+    cdef int c_format = _deal_format(fmt)
+    cdef const unsigned char[::1] text = memoryview(data).cast('B')
+    cdef unsigned char[::1] deals = memoryview(out).cast('B')
+    cdef size_t pos = offset
+    cdef size_t size = text.shape[0]
+    cdef int max_deals = deals.shape[0] // _DealSize
+    cdef int count = 0
+    if offset < 0 or pos > size:
+        raise ValueError('Offset out of range.')
+    if max_deals and pos < size:
+        with nogil:
+            count = _ParseDeals(<const char*>&text[0], size, pos, c_format,
+                                &deals[0], max_deals)
+    if count < 0:
+        raise ValueError(f'Invalid {fmt} record at offset {pos}.', pos)
+    return count, pos
+
+
+def format_deals(deals, fmt='solitaire'):
+    """
+    Format deals as text records that :func:`parse_deals` reads back, each
+    followed by a newline, with the GIL released.
+
+    Args:
+        deals: ``bytes-like`` -> :data:`DEAL_SIZE` bytes per deal.
+        fmt: ``str`` -> one of :data:`DEAL_FORMATS`.
+
+    Returns:
+        ``bytes``
+    """
+    cdef int c_format = _deal_format(fmt)
+    cdef const unsigned char[::1] view = memoryview(deals).cast('B')
+    cdef Py_ssize_t size = view.shape[0]
+    cdef Py_ssize_t count = size // _DealSize
+    cdef Py_ssize_t i
+    cdef bint valid = True
+    if size % _DealSize:
+        raise ValueError(f'Expected a multiple of {_DealSize} bytes.')
+    if count == 0:
+        return b''
+    text = bytearray(count * _RecordSize(c_format))
+    cdef unsigned char[::1] out = text
+    cdef Py_ssize_t pos = 0
+    with nogil:
+        for i in range(count):
+            if not _IsValidDeal(&view[i * _DealSize]):
+                valid = False
+                break
+            pos += _FormatDeal(&view[i * _DealSize], c_format,
+                               <char*>&out[pos])
+    if not valid:
+        raise ValueError(f'Invalid deal at index {i}.')
+    return bytes(text)
+
+
+BatchResult = namedtuple(
+    'BatchResult',
+    ['results', 'move_counts', 'normalized_counts', 'closed_counts'])
+BatchResult.__doc__ = """
+Result arrays of :func:`solve_batch`, one entry per seed. All fields are
+``array.array`` instances that can be wrapped without copying, e.g. with
+``numpy.frombuffer``.
+
+Attributes:
+    results: ``array.array('b')`` -> :class:`SolveResult` values.
+    move_counts: ``array.array('H')`` -> moves made count.
+    normalized_counts: ``array.array('H')`` -> moves made normalized count.
+    closed_counts: ``array.array('i')`` -> number of game states evaluated.
+"""
+
+
+DealResult = namedtuple(
+    'DealResult',
+    ['index', 'seed', 'result', 'move_count', 'normalized_count',
+     'closed_count', 'threads', 'elapsed', 'moves'])
+DealResult.__doc__ = """
+Result of one deal of :func:`solve_stream`.
+
+Attributes:
+    index: ``int`` -> position of the seed in the seeds passed.
+    seed: ``int`` -> the seed.
+    result: :class:`SolveResult` -> the result of the search.
+    move_count: ``int`` -> moves made count.
+    normalized_count: ``int`` -> moves made normalized count.
+    closed_count: ``int`` -> number of game states evaluated.
+    threads: ``int`` -> largest number of threads that searched the deal at
+        the same time.
+    elapsed: ``float`` -> seconds spent searching.
+    moves: ``bytes`` -> packed moves, see :meth:`Solitaire.moves_buffer`.
+"""
+
+
+SolveStats = namedtuple(
+    'SolveStats',
+    ['closed_count', 'expanded_count', 'peak_open_count', 'hash_capacity',
+     'hash_slots_used', 'hash_max_chain', 'hash_occupancy', 'elapsed',
+     'hash_collisions', 'closed_lock_waits', 'open_lock_waits'])
+SolveStats.__doc__ = """
+Search statistics of a solve, see :attr:`Solitaire.last_stats`.
+
+Attributes:
+    closed_count: ``int`` -> number of game states evaluated.
+    expanded_count: ``int`` -> number of game states taken from the open set.
+    peak_open_count: ``int`` -> maximum size of the open set.
+    hash_capacity: ``int`` -> number of slots of the closed hash map.
+    hash_slots_used: ``int`` -> number of occupied slots of the hash map.
+    hash_max_chain: ``int`` -> length of the longest collision chain.
+    hash_occupancy: ``float`` -> fraction of occupied slots.
+    elapsed: ``float`` -> seconds spent searching.
+    hash_collisions: ``int`` -> number of states added to an occupied slot.
+    closed_lock_waits: ``int`` -> number of times a thread waited for a
+        stripe of the shared closed set, only counted by
+        :meth:`Solitaire.solve_minimal_multithreaded`.
+    open_lock_waits: ``int`` -> number of times a thread waited for the
+        shared open set, only counted by
+        :meth:`Solitaire.solve_minimal_multithreaded`.
+"""
+
+
+cdef bint _is_available(_Solitaire& sol, const unsigned char* move) noexcept:
+    cdef _Move other
+    cdef int i
+    sol.UpdateAvailableMoves()
+    for i in range(sol.MovesAvailableCount()):
+        other = sol.GetMoveAvailable(i)
+        if other.From == move[0] and other.To == move[1] \
+                and other.Count == move[2] and other.Extra == move[3]:
+            return True
+    return False
+
+
+cdef object _make_stats(const _SearchStats& stats):
+    return SolveStats(
+        stats.ClosedCount, stats.ExpandedCount, stats.PeakOpenCount,
+        stats.HashCapacity, stats.HashSlotsUsed, stats.HashMaxLength,
+        stats.HashSlotsUsed / stats.HashCapacity if stats.HashCapacity else 0.0,
+        stats.Elapsed, stats.HashCollisions, stats.ClosedLockWaits,
+        stats.OpenLockWaits)
+
+
+cdef int _call_progress(void* context,
+                        const _SearchStats& stats) noexcept with gil:
+    cdef Solitaire sol = <Solitaire>context
+    try:
+        sol._progress(_make_stats(stats))
+    except BaseException as e:
+        sol._progress_error = e
+        return 1
+    return 0
+
+
+def solve_batch(seeds, draw_count=1, mode=SolveMode.Fast,
+                max_closed_count=None, num_threads=None, two_shift=0,
+                three_shift=0):
+    """
+    Solves the games dealt by :meth:`Solitaire.shuffle1` for many seeds at once.
+    The GIL is released once for the whole batch and the games are spread over
+    `num_threads` native threads, each solving one game at a time.
+
+    Args:
+        seeds: ``Iterable[int]`` -> seeds to pass to `Shuffle1`.
+        draw_count: ``int`` -> Number of cards drawn for each draw move.
+        mode: :class:`SolveMode` -> Solve method to use. Defaults to
+            `SolveMode.Fast`.
+        max_closed_count: ``Optional[int]`` -> Maximum number of game states
+            to evaluate per game before terminating. Defaults to `5,000,000`.
+        num_threads: ``Optional[int]`` -> Number of threads to use. Defaults to
+            the number of CPUs.
+        two_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+        three_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+
+    Returns:
+        :class:`BatchResult`
+    """
+    seed_arr = array.array('i', seeds)
+    return _solve_batch(seed_arr, None, len(seed_arr), draw_count, mode,
+                        max_closed_count, num_threads, two_shift, three_shift)
+
+
+def solve_deals(deals, draw_count=1, mode=SolveMode.Fast,
+                max_closed_count=None, num_threads=None, two_shift=0,
+                three_shift=0):
+    """
+    Like :func:`solve_batch`, for deals in the format of
+    :meth:`Solitaire.deal_array` instead of seeds, e.g. as read by
+    :func:`pyksolve.io.iter_deal_chunks`.
+
+    Args:
+        deals: ``bytes-like`` -> :data:`DEAL_SIZE` bytes per deal.
+        draw_count: ``int`` -> Number of cards drawn for each draw move.
+        mode: :class:`SolveMode` -> Solve method to use. Defaults to
+            `SolveMode.Fast`.
+        max_closed_count: ``Optional[int]`` -> Maximum number of game states
+            to evaluate per game before terminating. Defaults to `5,000,000`.
+        num_threads: ``Optional[int]`` -> Number of threads to use. Defaults to
+            the number of CPUs.
+        two_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+        three_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+
+    Returns:
+        :class:`BatchResult`, one entry per deal.
+    """
+    view = memoryview(deals).cast('B')
+    if len(view) % _DealSize:
+        raise ValueError(f'Expected a multiple of {_DealSize} bytes.')
+    return _solve_batch(None, view, len(view) // _DealSize, draw_count, mode,
+                        max_closed_count, num_threads, two_shift, three_shift)
+
+
+cdef object _solve_batch(seed_arr, deal_data, int count, draw_count, mode,
+                         max_closed_count, num_threads, two_shift,
+                         three_shift):
+    mode = SolveMode(mode)
+    results = array.array('b', bytes(count))
+    move_counts = array.array('H', bytes(2 * count))
+    normalized_counts = array.array('H', bytes(2 * count))
+    closed_counts = array.array('i', bytes(4 * count))
+    if count == 0:
+        return BatchResult(results, move_counts, normalized_counts,
+                           closed_counts)
+    cdef int[::1] seed_view
+    cdef const unsigned char[::1] deal_view
+    cdef const int* seed_ptr = NULL
+    cdef const unsigned char* deal_ptr = NULL
+    cdef int i
+    if deal_data is None:
+        seed_view = seed_arr
+        seed_ptr = &seed_view[0]
+    else:
+        deal_view = deal_data
+        deal_ptr = &deal_view[0]
+        for i in range(count):
+            if not _IsValidDeal(deal_ptr + i * _DealSize):
+                raise ValueError(f'Invalid deal at index {i}.')
+    cdef signed char[::1] result_view = results
+    cdef unsigned short[::1] move_view = move_counts
+    cdef unsigned short[::1] normalized_view = normalized_counts
+    cdef int[::1] closed_view = closed_counts
+    cdef int c_draw_count = draw_count
+    cdef int c_mode = mode.value
+    cdef int c_max_closed = max_closed_count or 5_000_000
+    cdef int c_two_shift = two_shift
+    cdef int c_three_shift = three_shift
+    cdef int c_threads = num_threads or os.cpu_count() or 1
+    cdef unique_ptr[_Solitaire] base
+    base.reset(new _Solitaire())
+    deref(base).Initialize()
+    with nogil:
+        _SolveBatch(deref(base), seed_ptr, deal_ptr, count, c_draw_count,
+                    c_mode, c_max_closed, c_two_shift, c_three_shift,
+                    c_threads, &result_view[0], &move_view[0],
+                    &normalized_view[0], &closed_view[0])
+    return BatchResult(results, move_counts, normalized_counts, closed_counts)
+
+
+def solve_stream(seeds, draw_count=1, mode=SolveMode.Fast,
+                 max_closed_count=None, num_threads=None, two_shift=0,
+                 three_shift=0, steal_after=0.05):
+    """
+    Solves the games dealt by :meth:`Solitaire.shuffle1` for many seeds on a
+    shared pool of native threads and yields each game as soon as it is
+    finished.
+
+    Every game starts on a single thread. A thread that finds no game left
+    to start joins the game that has been searched for at least
+    `steal_after` seconds by the fewest threads and takes game states from
+    its open set. Easy games thus finish on one thread each, while the
+    threads they free up are spent on the hard ones. Unlike
+    :func:`solve_batch`, games are reported in the order they finish.
+
+    Closing the returned iterator, e.g. by leaving a ``with`` block, cancels
+    the games still running and skips the ones not started yet.
+
+    Args:
+        seeds: ``Iterable[int]`` -> seeds to pass to `Shuffle1`.
+        draw_count: ``int`` -> Number of cards drawn for each draw move.
+        mode: :class:`SolveMode` -> Solve method to use. Defaults to
+            `SolveMode.Fast`.
+        max_closed_count: ``Optional[int]`` -> Maximum number of game states
+            to evaluate per game before terminating. Defaults to `5,000,000`.
+        num_threads: ``Optional[int]`` -> Number of threads to use. Defaults to
+            the number of CPUs.
+        two_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+        three_shift: ``int`` -> see :meth:`Solitaire.solve_fast`.
+        steal_after: ``float`` -> Seconds a game is searched before idle
+            threads join it.
+
+    Returns:
+        ``Iterator[DealResult]``
+    """
+    return _SolveStream(array.array('i', seeds), draw_count, SolveMode(mode),
+                        max_closed_count or 5_000_000,
+                        num_threads or os.cpu_count() or 1, two_shift,
+                        three_shift, steal_after)
+
+
+cdef class _SolveStream:
+    """Iterator of :func:`solve_stream`."""
+    cdef unique_ptr[_SolveEngine] engine
+    cdef object seeds
+
+    def __cinit__(self, seeds, int draw_count, mode, int max_closed_count,
+                  int num_threads, int two_shift, int three_shift,
+                  double steal_after):
+        cdef int[::1] seed_view
+        cdef unique_ptr[_Solitaire] base
+        cdef int count = len(seeds)
+        self.seeds = seeds
+        base.reset(new _Solitaire())
+        deref(base).Initialize()
+        if count:
+            seed_view = seeds
+            self.engine.reset(new _SolveEngine(
+                deref(base), &seed_view[0], count, draw_count, mode.value,
+                max_closed_count, two_shift, three_shift, num_threads,
+                steal_after))
+            deref(self.engine).Start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        cdef _EngineResult result
+        cdef bint found
+        if not self.engine:
+            raise StopIteration
+        with nogil:
+            found = deref(self.engine).Next(result)
+        if not found:
+            self.close()
+            raise StopIteration
+        return DealResult(result.Index, self.seeds[result.Index],
+                          SolveResult(result.Result), result.MoveCount,
+                          result.NormalizedCount, result.ClosedCount,
+                          result.Threads, result.Elapsed, result.Moves)
+
+    def close(self):
+        """Cancel the running games and wait for the threads to stop."""
+        if not self.engine:
+            return
+        with nogil:
+            deref(self.engine).Cancel()
+            deref(self.engine).Join()
+        self.engine.reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __dealloc__(self):
+        if self.engine:
+            with nogil:
+                self.engine.reset()
+
+
+def _timeout(timeout, deadline):
+    """Combine `timeout` and `deadline` -> seconds left, negative for none."""
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    if timeout is None:
+        return -1.0
+    return max(timeout, 0.0)
+
+
+_async_lock = threading.Lock()
+_async_executor = None
+
+
+def _executor():
+    """Shared pool of the async solves, one thread per CPU."""
+    global _async_executor
+    with _async_lock:
+        if _async_executor is None:
+            _async_executor = concurrent.futures.ThreadPoolExecutor(
+                os.cpu_count() or 1, thread_name_prefix='pyksolve-async')
+        return _async_executor
+
+
+def _run_async(sol, func, *args):
+    """
+    Run `func` in the shared pool -> future of the running event loop that
+    completes with its result through a loop callback. Cancelling the future
+    drops `func` if it is still queued and cancels the solve of `sol` while
+    `func` is running.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    lock = threading.Lock()
+    running = [False]
+    cancelled = [False]
+
+    def _on_done(f):
+        if f.cancelled():
+            with lock:
+                cancelled[0] = True
+                if running[0]:
+                    sol.cancel()
+                else:
+                    job.cancel()
+
+    def _complete(result, exc):
+        if fut.done():
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+
+    def _target():
+        with lock:
+            if cancelled[0]:
+                return
+            running[0] = True
+        result = exc = None
+        try:
+            result = func(*args)
+        except BaseException as e:
+            exc = e
+        with lock:
+            running[0] = False
+            sol._reset_cancel()
+        try:
+            loop.call_soon_threadsafe(_complete, result, exc)
+        except RuntimeError:  # Event loop is closed
+            pass
+
+    job = _executor().submit(_target)
+    fut.add_done_callback(_on_done)
+    return fut
+
+
 cdef class Solitaire:
     """
     Wrapper around the Solitaire C++ class from Klondike-Solver.
     """
     cdef unique_ptr[_Solitaire] thisptr
+    cdef unique_ptr[_SearchLimit] limit
+    cdef unique_ptr[_SearchArena] arena
+    cdef long long _memory_cap
+    cdef _SearchStats stats
+    cdef object _progress
+    cdef object _progress_error
+    cdef object _solution_cache
 
     def __cinit__(self):
         self.thisptr.reset(new _Solitaire())
         deref(self.thisptr).Initialize()
+        self.limit.reset(new _SearchLimit())
+        self.arena.reset(new _SearchArena())
+        self._memory_cap = 0
+
+    def cancel(self):
+        """
+        Stops the running solve of this instance as soon as possible. Can be
+        called from any thread. If no solve is running, the next solve is
+        stopped right away. The interrupted solve returns
+        `SolveResult.Cancelled`, unless it had already found a solution.
+        """
+        deref(self.limit).Cancel()
+
+    def _reset_cancel(self):
+        deref(self.limit).ResetCancel()
+
+    def set_progress_callback(self, callback, interval=100_000):
+        """
+        Sets a callback that is called with the :class:`SolveStats` of the
+        running solve every `interval` expanded game states. The callback runs
+        in the solving thread while the search waits. An exception raised by
+        the callback cancels the solve and is raised by the solve method.
+
+        Args:
+            callback: ``Optional[Callable[[SolveStats], None]]`` -> The
+                callback, `None` removes it.
+            interval: ``int`` -> Number of expanded game states between calls.
+        """
+        if callback is None:
+            self._progress = None
+            deref(self.limit).SetProgress(NULL, NULL, 0)
+            return
+        if interval < 1:
+            raise ValueError('Expected positive value for argument interval.')
+        self._progress = callback
+        deref(self.limit).SetProgress(<_ProgressCallback>_call_progress,
+                                      <void*>self, interval)
+
+    @property
+    def solution_cache(self):
+        """
+        ``Optional[SolutionCache]`` -> Cache of results by canonical deal,
+        see :class:`pyksolve.cache.SolutionCache`, that :meth:`solve_fast`,
+        :meth:`solve_minimal` and :meth:`solve_minimal_multithreaded` and
+        their awaitable variants consult before searching from the dealt
+        position, and add their results to. A cached solution is loaded as if
+        it had been found by the search, :attr:`last_stats` is then empty.
+        Defaults to `None`.
+        """
+        return self._solution_cache
+
+    @solution_cache.setter
+    def solution_cache(self, value):
+        self._solution_cache = value
+
+    cdef object _cache_deal(self):
+        """Deal to look up in the solution cache, `None` if not at the deal."""
+        if self._solution_cache is None \
+                or deref(self.thisptr).MovesMadeCount() \
+                or not _IsDealtPosition(deref(self.thisptr)):
+            return None
+        return bytes(self.deal_array())
+
+    cdef object _cache_lookup(self, deal, bint minimal):
+        """Load a cached result -> its :class:`SolveResult` or `None`."""
+        if deal is None:
+            return None
+        found = self._solution_cache.lookup(deal, self.draw_count, minimal)
+        if found is None:
+            return None
+        result, moves = found
+        if moves and not self.load_moves(moves):
+            return None
+        self.stats = _SearchStats()
+        return result
+
+    cdef object _cache_add(self, deal, result, bint minimal):
+        if deal is not None:
+            self._solution_cache.add(deal, self.draw_count, result,
+                                     self.moves_buffer(), minimal)
+        return result
+
+    @property
+    def memory_cap(self):
+        """
+        ``Optional[int]`` -> Maximum number of bytes of search memory (closed
+        hash map and open set) that is kept for the next solve. Kept memory is
+        reset instead of reallocated by the next solve. If a solve leaves more
+        memory behind, it is released. `None` keeps all memory. Defaults to
+        `0`, which releases the memory after each solve.
+        """
+        return None if self._memory_cap < 0 else self._memory_cap
+
+    @memory_cap.setter
+    def memory_cap(self, value):
+        if value is None:
+            self._memory_cap = -1
+        elif value < 0:
+            raise ValueError('Expected non negative value for memory_cap.')
+        else:
+            self._memory_cap = value
+
+    @property
+    def closed_mode(self):
+        """
+        :class:`ClosedMode` -> Closed set of :meth:`solve_fast` and
+        :meth:`solve_minimal` and their awaitable variants,
+        :meth:`solve_minimal_multithreaded` always uses `ClosedMode.Exact`.
+        Must not be set while a solve of this instance is running. Defaults
+        to `ClosedMode.Exact`.
+        """
+        return ClosedMode(deref(self.arena).Mode)
+
+    @closed_mode.setter
+    def closed_mode(self, value):
+        deref(self.arena).Mode = ClosedMode(value).value
+
+    @property
+    def memory_usage(self):
+        """``int`` -> Number of bytes of search memory kept by this instance."""
+        return deref(self.arena).MemoryUsage()
+
+    def release_memory(self):
+        """
+        Releases the kept search memory. Must not be called while a solve of
+        this instance is running.
+        """
+        deref(self.arena).Release()
+
+    @property
+    def last_stats(self):
+        """:class:`SolveStats` -> Search statistics of the last solve."""
+        return _make_stats(self.stats)
+
+    cdef _raise_progress_error(self):
+        if self._progress_error is not None:
+            error, self._progress_error = self._progress_error, None
+            raise error
 
     def shuffle1(self, deal_number=-1):
         """
@@ -104,49 +990,102 @@ cdef class Solitaire:
     cdef void _reset_game(self, int draw_count):
         deref(self.thisptr).ResetGame(draw_count)
 
-    def solve_minimal_multithreaded(self, num_threads, max_closed_count=None):
+    def solve_minimal_multithreaded(self, num_threads, max_closed_count=None,
+                                    timeout=None, deadline=None,
+                                    memory_budget=None, stripes=None):
         """
         Attempts to find a minimal solution, using multiple threads.
 
+        The threads share one closed set that is split into independently
+        locked stripes, see :attr:`last_stats` for the collision and lock
+        contention counters.
+
         Args:
             num_threads: ``int`` -> Number of threads to use.
             max_closed_count: ``Optional[int]`` -> Maximum number of game states
                 to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
+            memory_budget: ``Optional[int]`` -> Bytes of the shared closed set.
+                Lowers max_closed_count to the number of states that fit and
+                allocates their memory up front.
+            stripes: ``Optional[int]`` -> Number of stripes of the shared
+                closed set, rounded up to a power of 2. Defaults to 16 per
+                thread.
 
         Returns:
             :class:`SolveResult` -> The result of the attempt.
         """
-        return SolveResult(self._solve_minimal_multithreaded(
-            num_threads, max_closed_count or 5_000_000))
+        if memory_budget is not None and memory_budget < 1:
+            raise ValueError('Expected positive value for argument '
+                             'memory_budget.')
+        if stripes is not None and stripes < 1:
+            raise ValueError('Expected positive value for argument stripes.')
+        deal = self._cache_deal()
+        cached = self._cache_lookup(deal, True)
+        if cached is not None:
+            return cached
+        res = self._solve_minimal_multithreaded(
+            num_threads, max_closed_count or 5_000_000,
+            _timeout(timeout, deadline), memory_budget or 0,
+            stripes or 16 * num_threads)
+        self._raise_progress_error()
+        return self._cache_add(deal, SolveResult(res), True)
 
     cdef int _solve_minimal_multithreaded(
-            self, int num_threads, int max_closed_count):
+            self, int num_threads, int max_closed_count, double timeout,
+            long long memory_budget, int stripes):
         cdef int res
+        self.stats = _SearchStats()
+        deref(self.limit).SetTimeout(timeout)
         with nogil:
-            res = deref(self.thisptr).SolveMinimalMultithreaded(num_threads,
-                max_closed_count)
+            res = _SearchMinimalMultithreaded(deref(self.thisptr), num_threads,
+                max_closed_count, memory_budget, stripes, deref(self.arena),
+                deref(self.limit), self.stats)
+            deref(self.limit).ResetCancel()
+            deref(self.arena).Trim(self._memory_cap)
         return res
 
-    def solve_minimal(self, max_closed_count=None):
+    def solve_minimal(self, max_closed_count=None, timeout=None,
+                      deadline=None):
         """
         Attempts to find a minimal solution.
 
         Args:
             max_closed_count: ``Optional[int]`` -> Maximum number of game states
                 to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
 
         Returns:
             :class:`SolveResult` -> The result of the attempt.
         """
-        return SolveResult(self._solve_minimal(max_closed_count or 5_000_000))
+        deal = self._cache_deal()
+        cached = self._cache_lookup(deal, True)
+        if cached is not None:
+            return cached
+        res = self._solve_minimal(max_closed_count or 5_000_000,
+                                  _timeout(timeout, deadline))
+        self._raise_progress_error()
+        return self._cache_add(deal, SolveResult(res), True)
 
-    cdef int _solve_minimal(self, int max_closed_count):
+    cdef int _solve_minimal(self, int max_closed_count, double timeout):
         cdef int res
+        self.stats = _SearchStats()
+        deref(self.limit).SetTimeout(timeout)
         with nogil:
-            res = deref(self.thisptr).SolveMinimal(max_closed_count)
+            res = _SearchMinimal(deref(self.thisptr), max_closed_count,
+                deref(self.arena), deref(self.limit), self.stats)
+            deref(self.limit).ResetCancel()
+            deref(self.arena).Trim(self._memory_cap)
         return res
 
-    def solve_fast(self, two_shift=0, three_shift=0, max_closed_count=None):
+    def solve_fast(self, two_shift=0, three_shift=0, max_closed_count=None,
+                   timeout=None, deadline=None):
         """
         Attempts to find a fast but possibly not minimal solution.
 
@@ -155,21 +1094,117 @@ cdef class Solitaire:
             three_shift: ``Optional[int]`` ->
             max_closed_count: ``Optional[int]`` -> Maximum number of game states
                 to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
 
         Returns:
             :class:`SolveResult` -> The result of the attempt.
         """
-        return SolveResult(self._solve_fast(
-            two_shift, three_shift, max_closed_count or 5_000_000))
+        deal = self._cache_deal()
+        cached = self._cache_lookup(deal, False)
+        if cached is not None:
+            return cached
+        res = self._solve_fast(two_shift, three_shift,
+                               max_closed_count or 5_000_000,
+                               _timeout(timeout, deadline))
+        self._raise_progress_error()
+        return self._cache_add(deal, SolveResult(res), False)
 
-    cdef int _solve_fast(
-            self, int two_shift, int three_shift, int max_closed_count):
+    cdef int _solve_fast(self, int two_shift, int three_shift,
+                         int max_closed_count, double timeout):
         cdef int res
+        self.stats = _SearchStats()
+        deref(self.limit).SetTimeout(timeout)
         with nogil:
-            res = deref(self.thisptr).SolveFast(max_closed_count, two_shift,
-                three_shift)
+            res = _SearchFast(deref(self.thisptr), max_closed_count, two_shift,
+                three_shift, deref(self.arena),
+                deref(self.limit), self.stats)
+            deref(self.limit).ResetCancel()
+            deref(self.arena).Trim(self._memory_cap)
         return res
 
+    async def solve_minimal_multithreaded_async(self, num_threads,
+                                                max_closed_count=None,
+                                                timeout=None, deadline=None,
+                                                memory_budget=None,
+                                                stripes=None):
+        """
+        Awaitable variant of :meth:`Solitaire.solve_minimal_multithreaded`.
+        The solve runs in a shared pool of one thread per CPU without the GIL
+        and completes through a callback in the running event loop.
+        Cancelling the call cancels the search. The instance must not be used
+        until the call completes.
+
+        Args:
+            num_threads: ``int`` -> Number of threads to use.
+            max_closed_count: ``Optional[int]`` -> Maximum number of game states
+                to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
+            memory_budget: ``Optional[int]`` -> Bytes of the shared closed set.
+            stripes: ``Optional[int]`` -> Number of stripes of the shared
+                closed set.
+
+        Returns:
+            :class:`SolveResult` -> The result of the attempt.
+        """
+        return await _run_async(self, self.solve_minimal_multithreaded,
+                                num_threads, max_closed_count, timeout,
+                                deadline, memory_budget, stripes)
+
+    async def solve_minimal_async(self, max_closed_count=None, timeout=None,
+                                  deadline=None):
+        """
+        Awaitable variant of :meth:`Solitaire.solve_minimal`. The solve runs in
+        a shared pool of one thread per CPU without the GIL and completes
+        through a callback in the running event loop. Cancelling the call
+        cancels the search. The instance must not be used until the call
+        completes.
+
+        Args:
+            max_closed_count: ``Optional[int]`` -> Maximum number of game states
+                to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
+
+        Returns:
+            :class:`SolveResult` -> The result of the attempt.
+        """
+        return await _run_async(self, self.solve_minimal, max_closed_count,
+                                timeout, deadline)
+
+    async def solve_fast_async(self, two_shift=0, three_shift=0,
+                               max_closed_count=None, timeout=None,
+                               deadline=None):
+        """
+        Awaitable variant of :meth:`Solitaire.solve_fast`. The solve runs in a
+        shared pool of one thread per CPU without the GIL and completes
+        through a callback in the running event loop. Cancelling the call
+        cancels the search. The instance must not be used until the call
+        completes.
+
+        Args:
+            two_shift: ``Optional[int]`` ->
+            three_shift: ``Optional[int]`` ->
+            max_closed_count: ``Optional[int]`` -> Maximum number of game states
+                to evaluate before terminating. Defaults to `5,000,000`.
+            timeout: ``Optional[float]`` -> Maximum number of seconds to search
+                before terminating.
+            deadline: ``Optional[float]`` -> :func:`time.monotonic` value at
+                which to terminate the search.
+
+        Returns:
+            :class:`SolveResult` -> The result of the attempt.
+        """
+        return await _run_async(self, self.solve_fast, two_shift, three_shift,
+                                max_closed_count, timeout, deadline)
+
     @property
     def moves_made_count(self):
         """``int`` -> Output of "MovesMadeCount()"."""
@@ -284,3 +1319,166 @@ cdef class Solitaire:
             ``str`` -> The moves delimited by single spaces.
         """
         return deref(self.thisptr).MovesMade().decode('utf-8')
+
+    def state_array(self, out=None):
+        """
+        Get the current piles in a fixed layout of :data:`STATE_SIZE` bytes,
+        without building any text.
+
+        Bytes 0-12 hold the number of cards of each pile, numbered as in
+        :func:`encode_moves`, byte 13 the draw count, byte 14 the round count
+        and byte 15 is reserved. Pile `i` starts at byte
+        ``STATE_HEADER_SIZE + i * STATE_PILE_SLOTS`` and lists its cards from
+        the bottom up. A card is ``suit * 13 + rank - 1`` (suits clubs,
+        diamonds, spades, hearts; ranks 1-13) with :data:`STATE_FACE_UP` set
+        if the card is face up. Unused slots hold :data:`STATE_EMPTY`.
+
+        Args:
+            out: ``Optional[writable bytes-like]`` -> buffer of at least
+                :data:`STATE_SIZE` bytes to write to, e.g. a row of a
+                ``numpy.uint8`` array, instead of allocating a new array.
+
+        Returns:
+            ``array.array('B')`` or `out` -> the state.
+        """
+        cdef unsigned char[::1] view
+        if out is None:
+            out = array.array('B', bytes(_StateSize))
+        view = out
+        if view.shape[0] < _StateSize:
+            raise ValueError(f'Expected a buffer of at least {_StateSize} '
+                             f'bytes.')
+        _GetState(deref(self.thisptr), &view[0])
+        return out
+
+    def load_state_array(self, state):
+        """
+        Replace the piles with a state as returned by :meth:`state_array`.
+        The moves made are cleared, so solving continues from the loaded
+        position and solutions only contain the moves made from there.
+        :meth:`reset_game` still deals the last shuffled or loaded card set.
+        Move counts assume a full stock at the loaded position.
+
+        Args:
+            state: ``bytes-like`` -> :data:`STATE_SIZE` bytes.
+
+        Returns:
+            ``bool`` -> whether the state was valid. The game is unchanged if
+            it wasn't.
+        """
+        cdef const unsigned char[::1] view = memoryview(state).cast('B')
+        if view.shape[0] < _StateSize:
+            return False
+        return _SetState(deref(self.thisptr), &view[0])
+
+    def deal_array(self, out=None):
+        """
+        Get the last shuffled or loaded card set as :data:`DEAL_SIZE` bytes,
+        the card ``suit * 13 + rank - 1`` (as in :meth:`state_array`) at each
+        position of the card set that :meth:`reset_game` deals.
+
+        Args:
+            out: ``Optional[writable bytes-like]`` -> buffer of at least
+                :data:`DEAL_SIZE` bytes to write to instead of allocating a
+                new array.
+
+        Returns:
+            ``array.array('B')`` or `out` -> the deal.
+        """
+        cdef unsigned char[::1] view
+        if out is None:
+            out = array.array('B', bytes(_DealSize))
+        view = out
+        if view.shape[0] < _DealSize:
+            raise ValueError(f'Expected a buffer of at least {_DealSize} '
+                             f'bytes.')
+        _GetDeal(deref(self.thisptr), &view[0])
+        return out
+
+    def load_deal_array(self, deal):
+        """
+        Load a card set as returned by :meth:`deal_array`. Call
+        :meth:`reset_game` to deal it.
+
+        Args:
+            deal: ``bytes-like`` -> :data:`DEAL_SIZE` bytes.
+
+        Returns:
+            ``bool`` -> whether the deal was valid. The card set is unchanged
+            if it wasn't.
+        """
+        cdef const unsigned char[::1] view = memoryview(deal).cast('B')
+        if view.shape[0] < _DealSize:
+            return False
+        return _SetDeal(deref(self.thisptr), &view[0])
+
+    def moves_buffer(self):
+        """
+        Get the moves made to solve in the packed format described in
+        :func:`encode_moves`. Unlike :meth:`moves_made`, the moves can be
+        loaded back with :meth:`load_moves` without knowing the draw count.
+
+        Returns:
+            ``bytes`` -> :data:`MOVE_SIZE` bytes per move.
+        """
+        cdef int count = deref(self.thisptr).MovesMadeCount()
+        cdef string buf
+        cdef _Move move
+        cdef int i
+        buf.resize(_MoveSize * count)
+        for i in range(count):
+            move = deref(self.thisptr)[i]
+            buf[i * _MoveSize] = move.From
+            buf[i * _MoveSize + 1] = move.To
+            buf[i * _MoveSize + 2] = move.Count
+            buf[i * _MoveSize + 3] = move.Extra
+        return buf
+
+    def load_moves(self, buffer):
+        """
+        Reset the game and make the moves of a packed buffer as returned by
+        :meth:`moves_buffer`, e.g. to get :meth:`moves_made` or
+        :meth:`get_move_info` for a stored solution.
+
+        Args:
+            buffer: ``bytes-like`` -> packed moves.
+
+        Returns:
+            ``bool`` -> whether the buffer was valid, i.e. each move is one of
+            the moves available after the ones before it. The game is left
+            reset if it wasn't.
+        """
+        deref(self.thisptr).ResetGame()
+        if not self.make_moves(buffer):
+            deref(self.thisptr).ResetGame()
+            return False
+        return True
+
+    def make_moves(self, buffer):
+        """
+        Make the moves of a packed buffer from the current position, like
+        :meth:`load_moves` without resetting the game first.
+
+        Args:
+            buffer: ``bytes-like`` -> packed moves.
+
+        Returns:
+            ``bool`` -> whether the buffer was valid. If it wasn't, the moves
+            before the first one that isn't available are made.
+        """
+        cdef const unsigned char[::1] view = bytes(buffer)
+        cdef int size = view.shape[0]
+        cdef _Move move
+        cdef int i
+        if size % _MoveSize or size // _MoveSize \
+                > _MaxMovesMade - deref(self.thisptr).MovesMadeCount():
+            return False
+        for i in range(0, size, _MoveSize):
+            if not _is_available(deref(self.thisptr), &view[i]):
+                return False
+            move.From = view[i]
+            move.To = view[i + 1]
+            move.Count = view[i + 2]
+            move.Extra = view[i + 3]
+            deref(self.thisptr).MakeMove(move)
+        return True
@@ -0,0 +1,128 @@
+#ifndef PyksolveState_h
+#define PyksolveState_h
+/*
+ * Fixed layout byte export and import of the piles of a Solitaire.
+ *
+ * Solitaire keeps its piles and counters private without accessors, so they
+ * are reached through explicit template instantiation, which is exempt from
+ * access checking, instead of patching the upstream sources.
+ *
+ * Layout of the StateSize bytes:
+ *   [0, 13)   number of cards of each pile in Piles order (WASTE, TABLEAU1-7,
+ *             STOCK, FOUNDATION1C-FOUNDATION4H)
+ *   13        draw count
+ *   14        round count
+ *   15        reserved, 0
+ *   [16, 328) StatePileSlots slots per pile, the cards from the bottom up.
+ *             A card is its Value (Suit * 13 + Rank - 1) with StateFaceUp set
+ *             if it is face up, unused slots hold StateEmpty.
+ */
+#include<cstring>
+#include"Solitaire.h"
+using namespace std;
+
+const int StatePileSlots = 24;
+const int StateHeaderSize = 16;
+const int StateSize = StateHeaderSize + 13 * StatePileSlots;
+const unsigned char StateFaceUp = 0x80;
+const unsigned char StateEmpty = 0xff;
+
+template<typename Tag, typename Tag::Type Member>
+struct PrivateMember {
+	friend typename Tag::Type Get(Tag) { return Member; }
+};
+
+struct SolitairePiles { typedef Pile(Solitaire::*Type)[13]; friend Type Get(SolitairePiles); };
+struct SolitaireRoundCount { typedef int Solitaire::*Type; friend Type Get(SolitaireRoundCount); };
+struct SolitaireFoundationCount { typedef int Solitaire::*Type; friend Type Get(SolitaireFoundationCount); };
+struct SolitaireMovesMadeCount { typedef int Solitaire::*Type; friend Type Get(SolitaireMovesMadeCount); };
+struct SolitaireMovesAvailableCount { typedef int Solitaire::*Type; friend Type Get(SolitaireMovesAvailableCount); };
+
+template struct PrivateMember<SolitairePiles, &Solitaire::piles>;
+template struct PrivateMember<SolitaireRoundCount, &Solitaire::roundCount>;
+template struct PrivateMember<SolitaireFoundationCount, &Solitaire::foundationCount>;
+template struct PrivateMember<SolitaireMovesMadeCount, &Solitaire::movesMadeCount>;
+template struct PrivateMember<SolitaireMovesAvailableCount, &Solitaire::movesAvailableCount>;
+
+//Writes the piles of s to state[0..StateSize)
+inline void GetState(Solitaire & s, unsigned char * state) {
+	Pile * piles = s.*Get(SolitairePiles());
+	memset(state, StateEmpty, StateSize);
+	for (int i = 0; i < 13; i++) {
+		Pile & pile = piles[i];
+		unsigned char * cards = state + StateHeaderSize + i * StatePileSlots;
+		int downSize = pile.DownSize();
+		int upSize = pile.UpSize();
+		//The stock keeps its face down cards on the up side
+		unsigned char faceUp = i == STOCK ? 0 : StateFaceUp;
+		state[i] = (unsigned char)(downSize + upSize);
+		for (int j = 0; j < downSize; j++) {
+			cards[j] = pile.Down(j).Value;
+		}
+		for (int j = 0; j < upSize; j++) {
+			cards[downSize + j] = pile.Up(j).Value | faceUp;
+		}
+	}
+	state[13] = (unsigned char)s.DrawCount();
+	state[14] = (unsigned char)s.RoundCount();
+	state[15] = 0;
+}
+
+//Checks that state holds each card once in a position reachable in a game
+inline bool IsValidState(unsigned char const * state) {
+	int used[52] = {};
+	int total = 0;
+	if (state[13] < 1 || state[13] > 24) { return false; }
+	for (int i = 0; i < 13; i++) {
+		int size = state[i];
+		if (size > StatePileSlots) { return false; }
+		unsigned char const * cards = state + StateHeaderSize + i * StatePileSlots;
+		bool faceUp = false;
+		for (int j = 0; j < size; j++) {
+			int value = cards[j] & ~StateFaceUp;
+			bool up = (cards[j] & StateFaceUp) != 0;
+			if (value >= 52 || used[value] == 1) { return false; }
+			used[value] = 1;
+			if (i == STOCK) {
+				if (up) { return false; }
+			} else if (i >= FOUNDATION1C) {
+				if (!up || value != (i - FOUNDATION1C) * 13 + j) { return false; }
+			} else if (i == WASTE || faceUp) {
+				if (!up) { return false; }
+			}
+			faceUp = up;
+		}
+		if (i >= TABLEAU1 && i <= TABLEAU7 && size > 0 && !faceUp) { return false; }
+		total += size;
+	}
+	return total == 52;
+}
+
+//Replaces the piles of s with state, clears the moves made and returns false if state is invalid
+inline bool SetState(Solitaire & s, unsigned char const * state) {
+	if (!IsValidState(state)) { return false; }
+	Pile * piles = s.*Get(SolitairePiles());
+	int foundationCount = 0;
+	for (int i = 0; i < 13; i++) {
+		Pile & pile = piles[i];
+		unsigned char const * cards = state + StateHeaderSize + i * StatePileSlots;
+		pile.Reset();
+		for (int j = 0; j < state[i]; j++) {
+			Card card;
+			card.Set(cards[j] & ~StateFaceUp);
+			if (i == STOCK || (cards[j] & StateFaceUp) != 0) {
+				pile.AddUp(card);
+			} else {
+				pile.AddDown(card);
+			}
+		}
+		if (i >= FOUNDATION1C) { foundationCount += state[i]; }
+	}
+	s.SetDrawCount(state[13]);
+	s.*Get(SolitaireRoundCount()) = state[14];
+	s.*Get(SolitaireFoundationCount()) = foundationCount;
+	s.*Get(SolitaireMovesMadeCount()) = 0;
+	s.*Get(SolitaireMovesAvailableCount()) = 0;
+	return true;
+}
+#endif
@@ -0,0 +1,210 @@
+"""
+Provides the SolvedStore class, a compact append-only file of solved games
+keyed by (seed, draw_count) that is memory-mapped for fast access.
+"""
+
+import mmap
+import os
+import random
+import struct
+import threading
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+MAGIC = b'PYKS'
+FORMAT_VERSION = 3
+_HEADER = struct.Struct('<4sH2x')
+# seed, draw_count, solve result, moves_made_count,
+# moves_made_normalized_count (-1 if unknown), length of packed moves
+_RECORD = struct.Struct('<IBbHhH')
+
+Record = Tuple[int, int, bytes, int]
+
+
+class SolvedStore:
+    """
+    Append-only store of solved games. Each record holds the solve result, the
+    number of moves made, the normalized number of moves made and the packed
+    moves (see :meth:`pyksolve.solver.Solitaire.moves_buffer`) of a game,
+    keyed by (seed, draw_count). Existing records are read from a memory map
+    of the file, new records are appended to the end of the file.
+
+    A record that was cut short (e.g. by a crash while writing) is dropped when
+    the store is opened. Adding a key that is already stored is a no-op.
+    The methods are thread safe.
+
+    Args:
+        path: ``str`` -> path of the store file, created if it doesn't exist.
+    """
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[int, int], int] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._mapped = 0
+        self._file = open(path, 'a+b')
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION))
+            self._file.flush()
+        self._remap()
+        magic, version = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._file.close()
+            raise ValueError(f'"{path}" is not a solved store file.')
+        self._end = self._scan()
+        if self._end < self._mapped:
+            self._mmap.close()
+            self._file.truncate(self._end)
+            self._remap()
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped = len(self._mmap)
+
+    def _scan(self) -> int:
+        """Index all complete records -> offset after the last one."""
+        pos = _HEADER.size
+        while pos + _RECORD.size <= self._mapped:
+            seed, draw_count, _, _, _, length = _RECORD.unpack_from(self._mmap,
+                                                                     pos)
+            if pos + _RECORD.size + length > self._mapped:
+                break
+            self._index[(seed, draw_count)] = pos
+            pos += _RECORD.size + length
+        return pos
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Tuple[int, int]) -> bool:
+        return key in self._index
+
+    def get(self, seed: int, draw_count: int) -> Optional[Record]:
+        """
+        Look up a stored game.
+
+        Args:
+            seed: ``int`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1`.
+            draw_count: ``int`` -> draw count the game was solved with.
+
+        Returns:
+            ``Optional[Tuple[int, int, bytes, int]]`` -> (solve result,
+            moves_made_count, packed moves, moves_made_normalized_count) or
+            `None` if not stored.
+        """
+        with self._lock:
+            pos = self._index.get((seed, draw_count))
+            if pos is None:
+                return None
+            if pos >= self._mapped:
+                self._remap()
+            _, _, result, count, normalized, length = _RECORD.unpack_from(
+                self._mmap, pos)
+            start = pos + _RECORD.size
+            moves = self._mmap[start:start + length]
+        return result, count, moves, normalized
+
+    def add(self, seed: int, draw_count: int, result: int, move_count: int,
+            moves: bytes, normalized_count: int = -1) -> bool:
+        """
+        Append a solved game to the store.
+
+        Args:
+            seed: ``int`` -> seed passed to
+                :meth:`pyksolve.solver.Solitaire.shuffle1`.
+            draw_count: ``int`` -> draw count the game was solved with.
+            result: ``int`` -> value of the
+                :class:`pyksolve.solver.SolveResult`.
+            move_count: ``int`` -> number of moves made.
+            moves: ``bytes`` -> the packed moves made.
+            normalized_count: ``int`` -> moves_made_normalized_count, -1 if
+                unknown.
+
+        Returns:
+            ``bool`` -> whether the game was added.
+        """
+        data = bytes(moves)
+        with self._lock:
+            if (seed, draw_count) in self._index:
+                return False
+            self._file.write(_RECORD.pack(seed, draw_count, result, move_count,
+                                          normalized_count, len(data)))
+            self._file.write(data)
+            self._index[(seed, draw_count)] = self._end
+            self._end += _RECORD.size + len(data)
+        return True
+
+    def flush(self) -> None:
+        """Flush appended records to disk."""
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def seeds(self, draw_count: int) -> List[int]:
+        """
+        All stored seeds for a draw count.
+
+        Args:
+            draw_count: ``int`` -> the draw count.
+
+        Returns:
+            ``List[int]``
+        """
+        with self._lock:
+            return [k[0] for k in self._index if k[1] == draw_count]
+
+    def sample(self, draw_count: int, k: int) -> List[int]:
+        """
+        Up to `k` random distinct stored seeds for a draw count.
+
+        Args:
+            draw_count: ``int`` -> the draw count.
+            k: ``int`` -> maximum number of seeds.
+
+        Returns:
+            ``List[int]``
+        """
+        seeds = self.seeds(draw_count)
+        return random.sample(seeds, min(k, len(seeds)))
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        with self._lock:
+            return iter(list(self._index))
+
+    def close(self) -> None:
+        """Flush and close the store."""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._mmap.close()
+            self._file.close()
@@ -0,0 +1,58 @@
+"""
+Unit tests for the benchmark module.
+"""
+
+import json
+
+from pyksolve import benchmark
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def test_benchmark(tmp_path):
+    """
+    Test a small benchmark run, the JSON output and the comparison.
+    """
+    assert benchmark.corpus(5) == benchmark.corpus(5)
+    report = benchmark.run(deals=2, draw_counts=(1,),
+                           modes=('fast', 'stream', 'deferred'),
+                           max_closed=10_000,
+                           thread_counts=(1,))
+    names = [case['name'] for case in report['cases']]
+    assert names == ['fast-dc1-s0.0', 'fast-dc1-s1.1', 'fast-dc1-s2.4',
+                     'stream-dc1-t1', 'deferred-dc1-t1']
+    for case in report['cases']:
+        assert case['latency']['p50'] <= case['latency']['max']
+    assert report['cases'][-2]['deals_per_second'] > 0
+    assert report['cases'][-1]['refill_per_second'] > 0
+    out = tmp_path / 'report.json'
+    assert benchmark.main(['--deals', '2', '--draw-counts', '1', '--modes',
+                           'minimal', '--max-closed', '10000', '-o',
+                           str(out)]) == 0
+    saved = json.loads(out.read_text())
+    rows = benchmark.compare(saved, saved)
+    assert rows == [{'name': 'minimal-dc1', 'p50_ratio': 1.0,
+                     'mean_ratio': 1.0, 'solved_rate_change': 0.0}]
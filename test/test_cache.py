@@ -0,0 +1,98 @@
+"""
+Unit tests for the cache module.
+"""
+
+from pyksolve import cache
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def _permuted(deal, perm):
+    """Deal with its suits renamed by a permutation."""
+    suits = solver.SUIT_PERMUTATIONS[perm]
+    return bytes(suits[v // 13] * 13 + v % 13 for v in deal)
+
+
+def test_canonical_deal():
+    """
+    Test that deals of the same game up to suits hash the same.
+    """
+    deals = bytes(solver.shuffle_deals([1, 2]))
+    deal = deals[:solver.DEAL_SIZE]
+    permuted = b''.join(_permuted(deal, p) for p in range(8))
+    assert len(set(permuted[i:i + solver.DEAL_SIZE] for i in
+                   range(0, len(permuted), solver.DEAL_SIZE))) == 8
+    canonical, perm = solver.canonical_deal(deal)
+    assert _permuted(deal, perm) == canonical
+    assert len(set(solver.deal_hashes(permuted))) == 1
+    hashes = solver.deal_hashes(deals)
+    assert hashes[0] == solver.deal_hashes(permuted)[0]
+    assert hashes[0] != hashes[1]
+
+
+def test_solution_cache():
+    """
+    Test that a solution is reused for a deal with renamed suits.
+    """
+    solution_cache = cache.SolutionCache(max_entries=2)
+    sol = solver.Solitaire()
+    sol.solution_cache = solution_cache
+    sol.shuffle1(1023536416)
+    sol.reset_game(1)
+    res = sol.solve_fast(max_closed_count=250_000)
+    assert res == solver.SolveResult.SolvedMayNotBeMinimal
+    assert sol.last_stats.closed_count > 0
+    deal = bytes(sol.deal_array())
+    assert len(solution_cache) == 1
+
+    for perm in range(8):
+        assert sol.load_deal_array(_permuted(deal, perm))
+        sol.reset_game(1)
+        assert sol.solve_fast() == res
+        assert sol.last_stats.closed_count == 0
+        assert sol.foundation_count == 52
+    assert solution_cache.metrics() == {'hits': 8, 'misses': 1}
+
+    # A fast result doesn't answer minimal lookups
+    assert solution_cache.lookup(deal, 1, minimal=True) is None
+    assert solution_cache.lookup(deal, 3) is None
+    moves = b'\x00\x09\x01\x00'
+    assert solution_cache.add(deal, 1, solver.SolveResult.SolvedMinimal,
+                              moves, minimal=True)
+    assert not solution_cache.add(deal, 1, res, b'')
+    canonical, perm = solver.canonical_deal(deal)
+    assert solution_cache.lookup(canonical, 1, minimal=True) == \
+        (solver.SolveResult.SolvedMinimal, solver.permute_moves(moves, perm))
+
+    # Eviction of the least recently used deal
+    for seed in (1, 2):
+        other = bytes(solver.shuffle_deals([seed]))
+        solution_cache.add(other, 1, solver.SolveResult.Impossible, b'')
+    assert len(solution_cache) == 2
+    assert solution_cache.lookup(deal, 1) is None
+    assert solution_cache.lookup(other, 1) == \
+        (solver.SolveResult.Impossible, b'')
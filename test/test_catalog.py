@@ -0,0 +1,85 @@
+"""
+Unit tests for the catalog module.
+"""
+
+import random
+
+import pytest
+
+from pyksolve import catalog
+from pyksolve import scan
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def test_catalog():
+    """
+    Test adding, counting, querying and sampling deals of a band.
+    """
+    c = catalog.Catalog()
+    assert c.add(5, 1, catalog.NOT_MINIMAL, 130)
+    assert c.add(6, 1, catalog.MINIMAL, 120)
+    assert c.add(7, 1, catalog.NOT_MINIMAL, 140)
+    assert c.add(8, 3, catalog.MINIMAL, 125)
+    assert not c.add(5, 1, catalog.NOT_MINIMAL, 130)
+    with pytest.raises(ValueError):
+        c.add(9, 1, solver.SolveResult.Impossible.value, 0)
+    assert len(c) == 4
+    assert c.count(1) == 3
+    assert c.count(1, 125, 140) == 2
+    assert c.count(1, minimal=True) == 1
+    assert c.count(2) == 0
+    assert c.query(1) == [(6, 120, catalog.MINIMAL),
+                          (5, 130, catalog.NOT_MINIMAL),
+                          (7, 140, catalog.NOT_MINIMAL)]
+    assert c.query(1, 121, 139) == [(5, 130, catalog.NOT_MINIMAL)]
+    rng = random.Random(0)
+    assert c.sample(1, 0, 100, rng=rng) is None
+    assert c.sample(3, rng=rng) == (8, 125, catalog.MINIMAL)
+    seen = {c.sample(1, 125, 140, rng=rng)[0] for _ in range(50)}
+    assert seen == {5, 7}
+    assert c.sample(1, 135, 140, remove=True) == (7, 140, catalog.NOT_MINIMAL)
+    assert c.count(1) == 2
+    assert c.remove(5, 1, catalog.NOT_MINIMAL, 130)
+    assert not c.remove(5, 1, catalog.NOT_MINIMAL, 130)
+    assert c.query(1) == [(6, 120, catalog.MINIMAL)]
+
+
+def test_catalog_from_scan(tmp_path):
+    """
+    Test building a catalog from a scan file.
+    """
+    path = str(tmp_path / 'seeds.pks')
+    scan.scan(path, 10, 30, (1,), processes=1, max_closed=20_000)
+    f = scan.ScanFile(path)
+    c = catalog.Catalog.from_scan(f)
+    solved = [(seed, ) + f.get(seed, 1) for seed in range(10, 30)
+              if f.get(seed, 1)[0] in (catalog.MINIMAL, catalog.NOT_MINIMAL)]
+    f.close()
+    assert len(c) == len(solved) > 0
+    for seed, result, _, normalized in solved:
+        assert (seed, normalized, result) in c.query(1, normalized, normalized)
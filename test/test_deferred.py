@@ -2,7 +2,14 @@
 Unit tests for the deferred module.
 """
 
+import asyncio
+
+import pytest
+
+from pyksolve import catalog
 from pyksolve import deferred
+from pyksolve import solver
+from pyksolve import store
 
 __author__ = 'Tiziano Bettio'
 __license__ = 'MIT'
@@ -35,6 +42,9 @@ def test_deferred_solver():
     Test the functionality of the deferred_solver.
     """
     d = deferred.DeferredSolver(draw_counts=(1, 2, 3), cache_num=1, threads=3)
+    assert not d.wait_filled(timeout=0)
+    assert d.wait_filled()
+    assert all(len(v) == 1 for v in d._state.solved.values())
     seed, diagram, moves = d.get_solved(1)
     assert seed > 0
     assert diagram != ''
@@ -48,3 +58,197 @@ def test_deferred_solver():
     assert diagram != ''
     assert moves != ''
     d.stop()
+    for thread in d._threads:
+        assert not thread.is_alive()
+    metrics = d.metrics()
+    assert len(metrics) == 3
+    assert sum(m['solved'] for m in metrics) >= 3
+    assert all(m['jobs'] == 0 or m['states_per_second'] > 0 for m in metrics)
+    assert all(m['memory_usage'] == 0 for m in metrics)
+    stages = d.policy.metrics()
+    assert stages[0]['runs'] == sum(m['jobs'] for m in metrics)
+    assert sum(s['solved'] for s in stages) >= 3
+
+
+def test_deferred_solver_memory_cap():
+    """
+    Test that the workers keep their search memory up to the memory cap.
+    """
+    for memory_cap in (None, 1 << 30):
+        d = deferred.DeferredSolver(draw_counts=(1,), cache_num=1, threads=1,
+                                    memory_cap=memory_cap)
+        d.get_solved_packed(1)
+        d.stop()
+        usage = d.metrics()[0]['memory_usage']
+        assert 0 < usage <= (memory_cap or usage)
+    with pytest.raises(ValueError):
+        deferred.DeferredSolver(memory_cap=-1)
+
+
+def test_deferred_solver_process_backend():
+    """
+    Test the functionality of the deferred_solver with worker processes.
+    """
+    d = deferred.DeferredSolver(draw_counts=(1, 3), cache_num=1, threads=2,
+                                backend='process',
+                                closed_mode=solver.ClosedMode.Compact)
+    seed, diagram, moves = d.get_solved(3)
+    assert seed > 0
+    assert diagram != ''
+    assert moves != ''
+    processes = list(d._processes)
+    d.stop()
+    assert sum(m['solved'] for m in d.metrics()) >= 1
+    assert sum(s['solved'] for s in d.policy.metrics()) >= 1
+    for process in processes:
+        assert not process.is_alive()
+
+
+def test_deferred_solver_async():
+    """
+    Test get_solved_async, also with a cancelled waiter.
+    """
+    d = deferred.DeferredSolver(draw_counts=(1,), cache_num=1, threads=2)
+
+    async def run():
+        waiter = asyncio.ensure_future(d.get_solved_async(1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await asyncio.gather(d.get_solved_async(1),
+                                    d.get_solved_async(1))
+
+    for seed, diagram, moves in asyncio.run(run()):
+        assert seed > 0
+        assert diagram != ''
+        assert moves != ''
+    d.stop()
+
+
+def test_bucket_scheduling():
+    """
+    Test that jobs are scheduled for the most depleted bucket and only between
+    the low and high watermarks.
+    """
+    state = deferred._JobState({1: 2, 3: 4}, {1: 0, 3: 2}, 10)
+    state.solved[1].extend([(1, 1, ''), (2, 1, '')])
+    state.solved[3].append((3, 3, ''))
+    assert state.next_job() == 3
+    state.in_flight[3] += 3
+    assert state.next_job() is None
+    state.pop(1)
+    assert state.next_job() is None
+    state.pop(1)
+    assert state.next_job() == 1
+
+
+def test_catalog_jobs():
+    """
+    Test that deals drawn from the catalog are served once and that jobs
+    explore random seeds once the band holds too few unserved deals.
+    """
+    state = deferred._JobState({1: 1}, {1: 0}, 10)
+    state.catalog = catalog.Catalog()
+    state.bands = {1: (100, 110)}
+    state.catalog.add(5, 1, catalog.MINIMAL, 105)
+    for result in (None, (5, 1, b'', catalog.NOT_MINIMAL, 130, 120, b'')):
+        state.in_flight[1] += 1
+        assert state.next_seed(1) == 5
+        state.job_done(5, 1, result)
+        assert state.catalog.query(1) == [(5, 105, catalog.MINIMAL)]
+    assert [r[0] for r in state.solved[1]] == [5]
+    assert state.next_seed(1) != 5
+    state.in_flight[1] += 1
+    state.job_done(7, 1, (7, 1, b'', catalog.NOT_MINIMAL, 110, 108, b''))
+    assert len(state.catalog) == 2
+    assert [r[0] for r in state.solved[1]] == [5, 7]
+
+
+def test_deferred_solver_store(tmp_path):
+    """
+    Test warm starting the deferred_solver from a store.
+    """
+    path = str(tmp_path / 'solved.pyks')
+    sol = solver.Solitaire()
+    sol.shuffle1(1023536416)
+    sol.reset_game(3)
+    res = sol.solve_fast(0, 0, 1_000_000).value
+    count = sol.moves_made_count
+    normalized = sol.moves_made_normalized_count
+    buf = sol.moves_buffer()
+    s = store.SolvedStore(path)
+    s.add(1023536416, 3, res, count, buf, normalized)
+    s.close()
+    d = deferred.DeferredSolver(draw_counts=(1, 3), cache_num=1, threads=1,
+                                store=path)
+    seed, diagram, moves = d.get_solved(3)
+    assert seed == 1023536416
+    assert diagram != ''
+    assert moves == sol.moves_made()
+    seed, moves = d.get_solved_packed(1)
+    d.stop()
+    s = store.SolvedStore(path)
+    assert s.get(seed, 1)[2] == moves
+    sol.shuffle1(seed)
+    sol.reset_game(1)
+    assert sol.load_moves(moves)
+    assert s.get(seed, 1)[3] == sol.moves_made_normalized_count
+    s.close()
+
+    path = str(tmp_path / 'band.pyks')
+    s = store.SolvedStore(path)
+    s.add(1023536416, 3, res, count, buf, normalized)
+    sol.shuffle1(2)
+    sol.reset_game(3)
+    res = sol.solve_fast(0, 0, 1_000_000).value
+    s.add(2, 3, res, sol.moves_made_count, sol.moves_buffer(),
+          sol.moves_made_normalized_count)
+    s.close()
+    band = (min(normalized, sol.moves_made_normalized_count),
+            max(normalized, sol.moves_made_normalized_count))
+    c = catalog.Catalog()
+    d = deferred.DeferredSolver(draw_counts=(3,), cache_num=1, threads=1,
+                                store=path, catalog=c, move_range=band)
+    assert len(c) == 2
+    served = {d.get_solved_packed(3)[0]}
+    # The second deal is served from the store instead of solving it again
+    assert d.metrics()[0]['jobs'] == 0
+    served.add(d.get_solved_packed(3)[0])
+    assert served == {1023536416, 2}
+    d.stop()
+
+
+def test_deferred_solver_catalog():
+    """
+    Test serving a move count band from a catalog and refilling it.
+    """
+    c = catalog.Catalog()
+    d = deferred.DeferredSolver(draw_counts=(1,), cache_num=2, threads=2,
+                                max_closed=200_000, catalog=c,
+                                move_range=(0, 132))
+    served = set()
+    for _ in range(3):
+        seed, state, moves = d.get_solved_state(1)
+        served.add(seed)
+        sol = solver.Solitaire()
+        sol.shuffle1(seed)
+        sol.reset_game(1)
+        assert sol.state_array() == state
+        sol.load_moves(moves)
+        assert sol.moves_made_normalized_count <= 132
+    d.stop()
+    cataloged = {deal[0] for deal in c.query(1, 0, 132)}
+    assert served <= cataloged
+
+
+def test_deferred_solver_catalog_explores():
+    """
+    Test that a catalog-backed solver serves distinct seeds and grows the
+    catalog.
+    """
+    c = catalog.Catalog()
+    d = deferred.DeferredSolver(draw_counts=(1,), cache_num=3, threads=2,
+                                max_closed=200_000, catalog=c)
+    served = [d.get_solved_packed(1)[0] for _ in range(8)]
+    d.stop()
+    assert len(set(served)) == 8
+    assert len(c) >= 8
@@ -0,0 +1,90 @@
+"""
+Unit tests for the escalation module.
+"""
+
+from pyksolve import escalation
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def _outcome(*stages):
+    """Outcome of (result, seconds) per stage."""
+    empty = solver.SolveStats(*[0] * len(solver.SolveStats._fields))
+    return [(result, empty._replace(elapsed=seconds))
+            for result, seconds in stages]
+
+
+def test_escalation_policy():
+    """
+    Test that only deals a stage couldn't complete are escalated.
+    """
+    policy = escalation.EscalationPolicy(
+        [escalation.Stage(max_closed=2000),
+         escalation.Stage(max_closed=250_000)], explore=0.0)
+    sol = solver.Solitaire()
+    sol.shuffle1(1023536416)
+    sol.reset_game(1)
+    outcome = policy.solve(sol)
+    assert [result for result, _ in outcome] == \
+        [solver.SolveResult.CouldNotComplete,
+         solver.SolveResult.SolvedMayNotBeMinimal]
+    assert sol.foundation_count == 52
+    solution = sol.moves_buffer()
+    sol.shuffle1(1023536416)
+    sol.reset_game(1)
+    assert sol.load_moves(solution)
+    assert sol.foundation_count == 52
+    metrics = policy.metrics()
+    assert [m['runs'] for m in metrics] == [1, 1]
+    assert [m['solved'] for m in metrics] == [0, 1]
+    assert metrics[1]['solved_per_second'] > 0
+
+
+def test_escalation_depth():
+    """
+    Test that the depth follows the solved deals per second.
+    """
+    cnc = solver.SolveResult.CouldNotComplete
+    solved = solver.SolveResult.SolvedMayNotBeMinimal
+    policy = escalation.EscalationPolicy(
+        [escalation.Stage(max_closed=1000),
+         escalation.Stage(max_closed=100_000)], min_samples=4, explore=0.0)
+    for _ in range(3):
+        policy.record(_outcome((solved, 0.1)))
+        policy.record(_outcome((cnc, 0.1), (cnc, 10.0)))
+    assert policy.depth() == 2
+    policy.record(_outcome((cnc, 0.1), (cnc, 10.0)))
+    # Half of the deals solve in 0.1s, escalating never pays off
+    assert policy.depth() == 1
+
+    # Deals the first stage couldn't complete are solved cheaply
+    policy = escalation.EscalationPolicy(policy.stages, min_samples=4,
+                                         explore=0.0)
+    for _ in range(4):
+        policy.record(_outcome((solved, 0.1)))
+        policy.record(_outcome((cnc, 0.1), (solved, 0.1)))
+    assert policy.depth() == 2
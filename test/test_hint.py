@@ -0,0 +1,107 @@
+"""
+Unit tests for the hint module.
+"""
+
+import threading
+
+import pytest
+
+from pyksolve import hint
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def _play(cache, seed, moves):
+    """Follow the hints from the position after moves to the end."""
+    sol = solver.Solitaire()
+    while True:
+        move = cache.hint(seed, 1, moves)
+        if move is None:
+            break
+        moves += solver.encode_moves([move])
+    sol.shuffle1(seed)
+    sol.reset_game(1)
+    assert sol.load_moves(moves)
+    return sol.foundation_count
+
+
+def test_hint():
+    """
+    Test hints from cached solutions, transpositions and searches.
+    """
+    cache = hint.HintCache(max_deals=2)
+    assert _play(cache, 1023536416, b'') == 52
+    metrics = cache.metrics()
+    assert metrics['searches'] == 1
+    assert metrics['hits'] > 50
+
+    # Leave the cached solution with the moves of a minimal solution
+    sol = solver.Solitaire()
+    sol.shuffle1(1023536416)
+    sol.reset_game(1)
+    sol.solve_minimal(5_000_000)
+    minimal = sol.moves_buffer()
+    fast = cache._entries[(1023536416, 1)].paths[0]
+    i = 0
+    while minimal[i:i + 4] == fast[i:i + 4]:
+        i += 4
+    assert _play(cache, 1023536416, minimal[:i + 4]) == 52
+    assert cache.metrics()['searches'] + cache.metrics()['transpositions'] \
+        > metrics['searches'] + metrics['transpositions']
+
+    cache.add_solution(1023536416, 1, minimal)
+    assert cache.hint(1023536416, 1, minimal[:40]) == tuple(minimal[40:44])
+    assert cache.hint(1023536416, 1, minimal) is None
+    with pytest.raises(ValueError):
+        cache.add_solution(1023536416, 1, minimal[:40])
+    assert cache.hint(1023536416, 1, bytes([1, 9, 12, 0] * 60)) is None
+    assert cache.hint(1023536416, 1, minimal[:-1]) is None
+    assert cache.hint('invalid card set', 1) is None
+    assert cache.hint('another one', 1) is None
+    assert len(cache) == 1
+    cache.hint(1, 1)
+    cache.hint(2, 1)
+    assert len(cache) == 2
+    assert (1023536416, 1) not in cache._entries
+
+
+def test_hint_concurrent():
+    """
+    Test that hints for a position being searched wait for that search.
+    """
+    cache = hint.HintCache()
+    results = []
+    threads = [threading.Thread(
+        target=lambda: results.append(cache.hint(1023536416, 1)))
+        for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4 and len(set(results)) == 1
+    assert results[0] is not None
+    assert cache.metrics()['searches'] == 1
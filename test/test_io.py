@@ -0,0 +1,144 @@
+"""
+Unit tests for the io module.
+"""
+
+import pytest
+
+from pyksolve import io
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def _deals(seeds):
+    """Deal arrays and text records of the Shuffle1 deals of seeds."""
+    sol = solver.Solitaire()
+    deals = bytearray()
+    records = {'solitaire': [], 'pysol': []}
+    for seed in seeds:
+        sol.shuffle1(seed)
+        deals += sol.deal_array()
+        records['solitaire'].append(sol.get_solitaire())
+        records['pysol'].append(sol.get_pysol())
+    return bytes(deals), records
+
+
+def test_deal_array():
+    """
+    Test the deal_array and load_deal_array methods.
+    """
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    deal = s.deal_array()
+    assert len(deal) == solver.DEAL_SIZE
+    assert sorted(deal) == list(range(52))
+    text = s.get_solitaire()
+    t = solver.Solitaire()
+    assert t.load_deal_array(deal)
+    assert t.get_solitaire() == text
+    assert not t.load_deal_array(bytes(solver.DEAL_SIZE))
+    assert t.get_solitaire() == text
+
+
+def test_round_trip(tmp_path):
+    """
+    Test writing and reading both formats against the single deal methods.
+    """
+    deals, records = _deals(range(100))
+    for fmt in io.FORMATS:
+        path = tmp_path / f'{fmt}.txt'
+        items = [deals[i:i + solver.DEAL_SIZE]
+                 for i in range(0, len(deals), solver.DEAL_SIZE)]
+        assert io.write_deals(path, items, fmt, chunk_deals=7) == 100
+        text = path.read_text()
+        if fmt == 'pysol':
+            assert text.split('\n\n')[:-1] == records[fmt]
+        else:
+            assert text.split() == records[fmt]
+        chunks = list(io.iter_deal_chunks(path, fmt, chunk_deals=30))
+        assert [len(c) // solver.DEAL_SIZE for c in chunks] == [30, 30, 30, 10]
+        assert b''.join(chunks) == deals
+        assert b''.join(io.iter_deals(path, fmt)) == deals
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+    assert list(io.iter_deals(path)) == []
+
+
+def test_parse_deals():
+    """
+    Test validation and offsets of parse_deals.
+    """
+    deals, records = _deals([1, 2])
+    text = ('\r\n'.join(records['solitaire']) + '\n').encode()
+    out = bytearray(solver.DEAL_SIZE * 4)
+    assert solver.parse_deals(text, out) == (2, len(text))
+    assert out[:len(deals)] == deals
+    assert solver.parse_deals(text, out, offset=len(text)) == (0, len(text))
+    assert solver.parse_deals(text, bytearray(solver.DEAL_SIZE)) == (1, 156)
+    duplicate = records['solitaire'][0][:3] * 2 + records['solitaire'][0][6:]
+    bad = (records['solitaire'][1] + '\n' + duplicate).encode()
+    assert solver.parse_deals(bad, out) == (1, 157)
+    with pytest.raises(ValueError):
+        solver.parse_deals(bad, out, offset=157)
+    for record in ('Talon: ' + records['pysol'][0][7:].replace(' ', '', 1),
+                   records['pysol'][0].replace('<', '', 1),
+                   records['pysol'][0][:-1]):
+        with pytest.raises(ValueError):
+            solver.parse_deals(record.encode(), out, 'pysol')
+    with pytest.raises(ValueError):
+        solver.format_deals(bytes(solver.DEAL_SIZE))
+    with pytest.raises(ValueError):
+        solver.parse_deals(text, out, 'json')
+
+
+def test_invalid_file(tmp_path):
+    """
+    Test that the deals before an invalid record are read.
+    """
+    deals, records = _deals(range(5))
+    path = tmp_path / 'deals.txt'
+    path.write_text('\n'.join(records['solitaire']) + '\nend\n')
+    read = []
+    with pytest.raises(ValueError):
+        for chunk in io.iter_deal_chunks(path, chunk_deals=2):
+            read.append(chunk)
+    assert b''.join(read) == deals
+
+
+def test_solve_deals(tmp_path):
+    """
+    Test that deals read from a file solve like their seeds.
+    """
+    seeds = [1023536416, 1, 2]
+    deals, _ = _deals(seeds)
+    path = tmp_path / 'deals.txt'
+    io.write_deals(path, [deals], 'pysol')
+    chunk, = io.iter_deal_chunks(path, 'pysol')
+    assert solver.solve_deals(chunk, 1, solver.SolveMode.Fast, 20_000, 1) \
+        == solver.solve_batch(seeds, 1, solver.SolveMode.Fast, 20_000, 1)
+    with pytest.raises(ValueError):
+        solver.solve_deals(bytes(solver.DEAL_SIZE))
+    assert len(solver.solve_deals(b'').results) == 0
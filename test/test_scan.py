@@ -0,0 +1,72 @@
+"""
+Unit tests for the scan module.
+"""
+
+import pytest
+
+from pyksolve import scan
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def test_scan(tmp_path):
+    """
+    Test scanning a seed range, reading the scan file and resuming.
+    """
+    path = str(tmp_path / 'seeds.pks')
+    assert scan.scan(path, 10, 30, (1, 3), processes=1, chunk_size=6,
+                     max_closed=20_000) == 8
+    batch = solver.solve_batch(range(10, 30), 3, max_closed_count=20_000)
+    f = scan.ScanFile(path)
+    assert f.draw_counts == (1, 3)
+    assert f.scanned(1) == f.scanned(3) == len(f) == 20
+    for i in range(20):
+        assert f.get(10 + i, 3) == (batch.results[i], batch.move_counts[i],
+                                    batch.normalized_counts[i])
+    assert f.column(3, 'results') == batch.results
+    assert f.column(3, 'move_counts') == batch.move_counts
+    f.close()
+    assert scan.scan(path, 10, 30, (1, 3), processes=1, chunk_size=6,
+                     max_closed=20_000) == 0
+
+    # Lose the checkpoint of the second draw count 3 chunk
+    status = scan._columns(1, 20)[0]
+    with open(path, 'r+b') as fp:
+        fp.seek(status + 7)
+        fp.write(bytes(1))
+    f = scan.ScanFile(path)
+    assert f.get(17, 3) is None
+    assert f.column(3, 'results')[7] == scan.NOT_SCANNED
+    f.close()
+    assert scan.scan(path, 10, 30, (1, 3), processes=1, chunk_size=6,
+                     max_closed=20_000) == 1
+    f = scan.ScanFile(path)
+    assert f.get(17, 3) == (batch.results[7], batch.move_counts[7],
+                            batch.normalized_counts[7])
+    f.close()
+    with pytest.raises(ValueError):
+        scan.scan(path, 10, 31, (1, 3), processes=1)
@@ -0,0 +1,157 @@
+"""
+Unit tests for the server module.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pyksolve import server
+from pyksolve import solver
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def _check(deal, moves):
+    """Whether moves solve a deal with draw count 1."""
+    sol = solver.Solitaire()
+    if isinstance(deal, int):
+        sol.shuffle1(deal)
+    else:
+        assert sol.load_deal_array(deal)
+    sol.reset_game(1)
+    return sol.load_moves(moves) and sol.foundation_count == 52
+
+
+def test_server(tmp_path):
+    """
+    Test the requests of clients and that their searches are shared.
+    """
+    path = str(tmp_path / 'pyksolve.sock')
+    srv = server.SolveServer(path, draw_counts=(1,), cache_num=1, threads=1,
+                             max_closed=250_000)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(srv.start(), loop).result()
+    try:
+        seed = 1023536416
+        deal = bytes(solver.shuffle_deals([seed]))
+        permuted = bytes(
+            solver.SUIT_PERMUTATIONS[5][v // 13] * 13 + v % 13 for v in deal)
+        results = {}
+
+        def solve(key):
+            with server.SolveClient(path) as client:
+                results[key] = client.solve(key, 1)
+
+        clients = [threading.Thread(target=solve, args=(key,))
+                   for key in (seed, permuted)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        for key, (result, moves) in results.items():
+            assert result == solver.SolveResult.SolvedMayNotBeMinimal
+            assert _check(key, moves)
+
+        with server.SolveClient(path) as client:
+            solved_seed, moves = client.get_solved_packed(1)
+            assert _check(solved_seed, moves)
+            solved_seed, diagram, moves_made = client.get_solved(1)
+            assert diagram != '' and moves_made != ''
+            move = client.hint(deal, 1)
+            assert len(move) == 4
+            assert client.hint(seed, 1) == move
+            with pytest.raises(ValueError):
+                client.get_solved(3)
+            with pytest.raises(ValueError):
+                client.solve(b'\x00' * solver.DEAL_SIZE)
+            with pytest.raises(ValueError):
+                client.solve(2 ** 40)
+            with pytest.raises(ValueError):
+                client.hint(deal, 1, bytes([1, 9, 12]))
+            assert client.hint(deal, 1, bytes([1, 9, 12, 0] * 60)) is None
+            result, moves = client.solve(seed, 1, max_closed=2 ** 80)
+            assert result == solver.SolveResult.SolvedMayNotBeMinimal
+            metrics = client.metrics()
+        assert metrics['server']['solves'] == 5
+        assert metrics['server']['errors'] == 4
+        # The second solve waited for the first or found its solution cached
+        assert metrics['server']['coalesced'] \
+            + metrics['solution_cache']['hits'] >= 1
+
+        def fail(*args):
+            raise RuntimeError('Failed.')
+
+        srv._hints.hint = fail
+        with server.SolveClient(path) as client:
+            with pytest.raises(ValueError, match='RuntimeError'):
+                client.hint(seed, 1)
+    finally:
+        asyncio.run_coroutine_threadsafe(srv.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    assert not (tmp_path / 'pyksolve.sock').exists()
+
+
+def test_server_stop(tmp_path):
+    """
+    Test that stopping the server cancels a running hint search.
+    """
+    path = str(tmp_path / 'pyksolve.sock')
+    srv = server.SolveServer(path, draw_counts=(1,), cache_num=1, threads=1,
+                             max_closed=20_000_000, hint_timeout=None)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(srv.start(), loop).result()
+    errors = []
+
+    def hint():
+        try:
+            with server.SolveClient(path) as client:
+                client.hint(8, 1)
+        except (ConnectionError, ValueError) as err:
+            errors.append(err)
+
+    client = threading.Thread(target=hint)
+    client.start()
+    try:
+        while srv.metrics()['hints']['searches'] == 0:
+            time.sleep(0.01)
+        start = time.monotonic()
+    finally:
+        asyncio.run_coroutine_threadsafe(srv.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    assert time.monotonic() - start < 5
+    client.join()
+    assert len(errors) == 1
@@ -2,6 +2,13 @@
 Unit tests for the solver module.
 """
 
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
 from pyksolve import solver
 
 __author__ = 'Tiziano Bettio'
@@ -41,6 +48,31 @@ def test_shuffle1():
     assert s.shuffle1(-1) != -1
 
 
+def test_shuffle_deals():
+    """
+    Test that shuffle_deals matches the shuffle1 and shuffle2 methods.
+    """
+    seeds = [0, 1, 7187413, -2, 2 ** 31 - 1, -2 ** 31] + list(range(100, 111))
+    s = solver.Solitaire()
+    size = solver.DEAL_SIZE
+    for method, shuffle in ((1, s.shuffle1), (2, s.shuffle2)):
+        for num_threads in (1, 3):
+            deals = solver.shuffle_deals(seeds, method,
+                                         num_threads=num_threads)
+            assert len(deals) == len(seeds) * size
+            for i, seed in enumerate(seeds):
+                shuffle(seed)
+                assert s.deal_array() == deals[i * size:(i + 1) * size]
+    out = bytearray(3 * size)
+    assert solver.shuffle_deals([1, 2], out=out) is out
+    assert out[:2 * size] == solver.shuffle_deals([1, 2])
+    assert len(solver.shuffle_deals([])) == 0
+    with pytest.raises(ValueError):
+        solver.shuffle_deals([-1])
+    with pytest.raises(ValueError):
+        solver.shuffle_deals([1], out=bytearray(size - 1))
+
+
 def test_draw_count():
     """
     Test the draw_count property.
@@ -63,6 +95,19 @@ def test_solve_fast():
     assert s.moves_made_count == 74
 
 
+def test_solve_fast_async():
+    """
+    Test the solve_fast_async method.
+    """
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    s.reset_game()
+    res = asyncio.run(s.solve_fast_async(0, 0, 5_000_000))
+    assert res in (solver.SolveResult.SolvedMinimal,
+                   solver.SolveResult.SolvedMayNotBeMinimal)
+    assert s.moves_made_count == 74
+
+
 def test_solve_minimal():
     """
     Test the solve_minimal method.
@@ -85,6 +130,142 @@ def test_solve_minimal_multithreaded():
     assert s.solve_minimal_multithreaded(8) \
         == solver.SolveResult.SolvedMinimal
     assert s.moves_made_count == 73
+    stats = s.last_stats
+    assert stats.hash_collisions == stats.closed_count - stats.hash_slots_used
+    assert stats.closed_lock_waits >= 0 and stats.open_lock_waits >= 0
+    s.reset_game()
+    assert s.solve_minimal_multithreaded(4, memory_budget=1_000_000,
+                                         stripes=3) \
+        == solver.SolveResult.CouldNotComplete
+    assert s.last_stats.closed_count < 1_000_000 // 32
+
+
+def test_solve_timeout():
+    """
+    Test the timeout and deadline arguments of the solve methods.
+    """
+    s = solver.Solitaire()
+    for solve in (lambda: s.solve_fast(timeout=0),
+                  lambda: s.solve_minimal(deadline=time.monotonic() - 1),
+                  lambda: s.solve_minimal_multithreaded(2, timeout=0)):
+        s.shuffle1(1023536416)
+        s.reset_game()
+        assert solve() == solver.SolveResult.TimedOut
+    s.shuffle1(1023536416)
+    s.reset_game()
+    assert s.solve_minimal(timeout=60) == solver.SolveResult.SolvedMinimal
+
+
+def test_cancel():
+    """
+    Test cancelling a solve, also through the async variants.
+    """
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    s.reset_game()
+    s.cancel()
+    assert s.solve_minimal() == solver.SolveResult.Cancelled
+    s.reset_game()
+    assert s.solve_fast() == solver.SolveResult.SolvedMayNotBeMinimal
+
+    async def run():
+        task = asyncio.ensure_future(s.solve_minimal_async(50_000_000))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0)
+
+    s.shuffle1(2)
+    s.reset_game()
+    stats = s.last_stats
+    start = time.monotonic()
+    asyncio.run(run())
+    while s.last_stats == stats:
+        time.sleep(0.01)
+    assert time.monotonic() - start < 2
+    assert s.last_stats.closed_count < 50_000_000
+
+
+def test_solve_async_pool():
+    """
+    Test that async solves share a pool of one thread per CPU.
+    """
+    sols = []
+    for seed in range(1, 9):
+        s = solver.Solitaire()
+        s.shuffle1(seed)
+        s.reset_game()
+        sols.append(s)
+
+    async def run():
+        return await asyncio.gather(*(s.solve_fast_async(1, 1, 200_000)
+                                      for s in sols))
+
+    assert len(asyncio.run(run())) == 8
+    workers = [t for t in threading.enumerate()
+               if t.name.startswith('pyksolve-async')]
+    assert 0 < len(workers) <= (os.cpu_count() or 1)
+
+
+def test_last_stats():
+    """
+    Test the last_stats property and the progress callback.
+    """
+    s = solver.Solitaire()
+    calls = []
+    s.set_progress_callback(calls.append, 10_000)
+    s.shuffle1(1023536416)
+    s.reset_game()
+    s.solve_minimal(5_000_000)
+    stats = s.last_stats
+    assert stats.closed_count > 0
+    assert stats.expanded_count > stats.peak_open_count > 0
+    assert 0 < stats.hash_occupancy < 1
+    assert stats.elapsed > 0
+    assert len(calls) >= stats.expanded_count // 10_000 - 1 > 0
+    assert calls[-1].closed_count <= stats.closed_count
+
+    def fail(_):
+        raise KeyError('progress')
+
+    s.set_progress_callback(fail, 10)
+    s.reset_game()
+    try:
+        s.solve_fast()
+    except KeyError:
+        pass
+    else:
+        assert False, 'Expected the progress callback error to be raised.'
+    s.set_progress_callback(None)
+    s.reset_game()
+    assert s.solve_fast() == solver.SolveResult.SolvedMayNotBeMinimal
+
+
+def test_memory_cap():
+    """
+    Test keeping and releasing the search memory between solves.
+    """
+    s = solver.Solitaire()
+    assert s.memory_cap == 0
+    results = []
+    for cap in (0, None):
+        s.memory_cap = cap
+        for seed in (1, 2, 3):
+            s.shuffle1(seed)
+            s.reset_game()
+            results.append((s.solve_fast(1, 1, 100_000), s.moves_made_count))
+        if cap == 0:
+            assert s.memory_usage == 0
+    assert results[:3] == results[3:]
+    assert s.memory_usage > 0
+    s.memory_cap = 1
+    s.reset_game()
+    s.solve_fast(1, 1, 100_000)
+    assert s.memory_usage == 0
+    s.memory_cap = None
+    s.reset_game()
+    s.solve_fast(1, 1, 100_000)
+    s.release_memory()
+    assert s.memory_usage == 0
 
 
 def test_foundation_count():
@@ -100,3 +281,152 @@ def test_foundation_count():
     assert s.foundation_count == 52
     s.reset_game()
     assert s.foundation_count == 0
+
+
+def test_solve_batch():
+    """
+    Test the solve_batch function.
+    """
+    b = solver.solve_batch([1023536416, 1023536416], 1,
+                           solver.SolveMode.Minimal, 5_000_000, 2)
+    assert list(b.results) == [solver.SolveResult.SolvedMinimal.value] * 2
+    assert list(b.move_counts) == [73, 73]
+    assert b.closed_counts[0] > 0
+    b = solver.solve_batch([1023536416], 1, solver.SolveMode.Fast)
+    assert b.results[0] in (solver.SolveResult.SolvedMinimal.value,
+                            solver.SolveResult.SolvedMayNotBeMinimal.value)
+    assert b.move_counts[0] == 74
+    assert len(solver.solve_batch([]).results) == 0
+
+
+def test_solve_stream():
+    """
+    Test the solve_stream function.
+    """
+    seeds = [1023536416, 1, 2, 3]
+    b = solver.solve_batch(seeds, 1, solver.SolveMode.Fast, 100_000, 1)
+    results = sorted(solver.solve_stream(seeds, 1, solver.SolveMode.Fast,
+                                         100_000, 1))
+    assert [r.index for r in results] == [0, 1, 2, 3]
+    assert [r.seed for r in results] == seeds
+    assert [r.result.value for r in results] == list(b.results)
+    assert [r.move_count for r in results] == list(b.move_counts)
+    assert [r.closed_count for r in results] == list(b.closed_counts)
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    s.reset_game(1)
+    assert s.load_moves(results[0].moves)
+    assert s.foundation_count == 52
+    results = list(solver.solve_stream([1023536416, 1023536416], 1,
+                                       solver.SolveMode.Minimal, 5_000_000, 2,
+                                       steal_after=0))
+    assert sorted(r.index for r in results) == [0, 1]
+    assert [r.move_count for r in results] == [73, 73]
+    assert all(r.result == solver.SolveResult.SolvedMinimal for r in results)
+    with solver.solve_stream(range(100), 1, num_threads=2) as stream:
+        first = next(stream)
+    assert 0 <= first.index < 100
+    assert list(stream) == []
+    assert list(solver.solve_stream([])) == []
+
+
+def test_moves_buffer():
+    """
+    Test the moves_buffer and load_moves methods.
+    """
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    s.reset_game()
+    s.solve_minimal(5_000_000)
+    buf = s.moves_buffer()
+    assert len(buf) == 73 * solver.MOVE_SIZE
+    assert solver.encode_moves(solver.decode_moves(buf)) == buf
+    t = solver.Solitaire()
+    t.shuffle1(1023536416)
+    t.reset_game()
+    assert t.load_moves(buf)
+    assert t.moves_made() == s.moves_made()
+    assert t.foundation_count == 52
+    assert not t.load_moves(buf[:-1])
+    assert t.moves_made_count == 0
+    assert not t.load_moves(bytes([1, 9, 12, 0]))
+    assert not t.load_moves(bytes([1, 9, 12, 0] * 100 + [0, 8, 200, 0] * 100))
+    assert not t.load_moves(buf[:8] + bytes([13, 1, 1, 0]) + buf[12:])
+    assert t.foundation_count == 0
+    assert t.load_moves(buf)
+    assert t.load_moves(buf[:40])
+    assert not t.make_moves(bytes([1, 9, 12, 0]))
+    assert t.moves_made_count == 10
+    assert t.make_moves(buf[40:])
+    assert t.moves_made() == s.moves_made()
+
+
+def test_state_array():
+    """
+    Test the state_array and load_state_array methods.
+    """
+    s = solver.Solitaire()
+    s.shuffle1(1023536416)
+    s.reset_game(1)
+    state = s.state_array()
+    assert len(state) == solver.STATE_SIZE
+    assert list(state[:solver.STATE_HEADER_SIZE]) \
+        == [0, 1, 2, 3, 4, 5, 6, 7, 24, 0, 0, 0, 0, 1, 0, 0]
+    stock = solver.STATE_HEADER_SIZE + 8 * solver.STATE_PILE_SLOTS
+    assert not any(c & solver.STATE_FACE_UP for c in state[stock:stock + 24])
+    tableau7 = solver.STATE_HEADER_SIZE + 7 * solver.STATE_PILE_SLOTS
+    assert [c & solver.STATE_FACE_UP for c in state[tableau7:tableau7 + 7]] \
+        == [0] * 6 + [solver.STATE_FACE_UP]
+    assert state[tableau7 + 7] == solver.STATE_EMPTY
+    s.solve_fast(1, 1, 1_000_000)
+    moves = s.moves_buffer()
+    s.load_moves(moves[:30 * solver.MOVE_SIZE])
+    buf = bytearray(solver.STATE_SIZE)
+    assert s.state_array(buf) is buf
+    t = solver.Solitaire()
+    assert t.load_state_array(buf)
+    assert t.state_array() == s.state_array()
+    assert t.game_diagram() == s.game_diagram()
+    assert t.foundation_count == s.foundation_count
+    assert t.moves_made_count == 0
+    assert t.solve_fast(1, 1, 1_000_000) \
+        == solver.SolveResult.SolvedMayNotBeMinimal
+    assert t.foundation_count == 52
+    bad = bytearray(buf)
+    bad[solver.STATE_HEADER_SIZE] = bad[stock]
+    assert not t.load_state_array(bad)
+    assert not t.load_state_array(buf[:-1])
+    assert t.foundation_count == 52
+
+
+def test_closed_mode():
+    """
+    Test that the compact closed set searches like the exact one in less
+    memory.
+    """
+    runs = {}
+    for mode in solver.ClosedMode:
+        s = solver.Solitaire()
+        s.memory_cap = None
+        s.closed_mode = mode
+        assert s.closed_mode == mode
+        s.shuffle1(1023536416)
+        s.reset_game(3)
+        res = s.solve_fast(max_closed_count=200_000)
+        runs[mode] = (res, s.moves_buffer(), s.last_stats.closed_count,
+                      s.memory_usage)
+    exact = runs[solver.ClosedMode.Exact]
+    for mode in (solver.ClosedMode.Compact,
+                 solver.ClosedMode.CompactConservative):
+        assert runs[mode][:3] == exact[:3]
+        assert runs[mode][3] < exact[3]
+
+    s = solver.Solitaire()
+    s.closed_mode = solver.ClosedMode.CompactConservative
+    s.shuffle1(1023536416)
+    s.reset_game(1)
+    assert s.solve_minimal(max_closed_count=1_000_000) \
+        == solver.SolveResult.SolvedMayNotBeMinimal
+    assert s.moves_made_count == 73
+    with pytest.raises(ValueError):
+        s.closed_mode = 3
@@ -0,0 +1,55 @@
+"""
+Unit tests for the store module.
+"""
+
+from pyksolve import store
+
+__author__ = 'Tiziano Bettio'
+__license__ = 'MIT'
+__version__ = '0.0.15'
+__copyright__ = """
+Copyright (c) 2020 Tiziano Bettio
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+
+def test_solved_store(tmp_path):
+    """
+    Test adding, looking up and reopening a store.
+    """
+    path = str(tmp_path / 'solved.pyks')
+    s = store.SolvedStore(path)
+    assert s.add(1023536416, 1, 1, 73, b'\x07\x03\x01\x01')
+    assert not s.add(1023536416, 1, 1, 73, b'\x07\x03\x01\x01')
+    assert s.add(42, 3, -1, 120, b'')
+    assert s.get(1023536416, 1) == (1, 73, b'\x07\x03\x01\x01', -1)
+    assert s.get(1023536416, 3) is None
+    s.close()
+
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    s = store.SolvedStore(path)
+    assert len(s) == 2
+    assert (42, 3) in s
+    assert s.get(42, 3) == (-1, 120, b'', -1)
+    assert s.sample(3, 5) == [42]
+    assert s.add(7, 1, 1, 90, b'\x00\x01\x01\x00', 85)
+    assert s.get(7, 1) == (1, 90, b'\x00\x01\x01\x00', 85)
+    s.close()